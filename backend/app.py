@@ -1,21 +1,63 @@
 """
 Flask application factory for InsightForge Backend
 """
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from routes.dashboard import dashboard_bp
-from routes.auth import auth_bp
+from routes.auth import auth_bp, auth_sessions
 from routes.admin import admin_bp
+from connection import release_request_connection
+from utils.database import release_thread_connection
+from snapshots import refresh_snapshots, SNAPSHOT_REFRESH_INTERVAL
+from database import (
+    check_database_ready, refresh_database_stats, refresh_monthly_rollups, listen_for_invalidations,
+    DB_STATUS_REFRESH_INTERVAL, ROLLUP_REFRESH_INTERVAL, ANALYTICS_LISTEN_RETRY
+)
+from cache import ANALYTICS_CACHE_TTL
+from utils.background import start_job
+from utils.system_metrics import take_sample, SYSTEM_METRICS_INTERVAL
+from utils.platform_counters import refresh_platform_counters, PLATFORM_COUNTERS_RECONCILE_INTERVAL
+from utils.password_hasher import PasswordPoolBusy
+from utils.token_store import start_token_stores
 
-def create_app():
-    """Create and configure the Flask app"""
+def start_background_workers():
+    """Start the background jobs (each starts at most once per process; an interval of 0 disables it)"""
+    # Load token revocations before serving, so blocklist checks only read memory
+    start_token_stores()
+    # Keep kpi_snapshots current for dates touched by booking/review changes; the first
+    # pass runs at startup so hotels without history are backfilled
+    start_job('snapshot-refresher', refresh_snapshots, SNAPSHOT_REFRESH_INTERVAL, run_immediately=True)
+    # Refresh closed months in monthly_booking_rollups without blocking readers
+    start_job('monthly-rollups', refresh_monthly_rollups, ROLLUP_REFRESH_INTERVAL, run_immediately=True)
+    # Sample CPU, memory, disk, pools and DB latency for /api/admin/system/status
+    start_job('system-metrics', take_sample, SYSTEM_METRICS_INTERVAL, run_immediately=True)
+    # Keep /api/database-status statistics fresh off the request path (the first request computes them)
+    start_job('database-stats', refresh_database_stats, DB_STATUS_REFRESH_INTERVAL)
+    # Periodically rebuild the /api/admin/stats counters from the source tables
+    start_job('platform-counters', refresh_platform_counters, PLATFORM_COUNTERS_RECONCILE_INTERVAL)
+    # Drop a hotel's cached analytics as soon as its bookings, reviews or payments change;
+    # the listening session is reopened ANALYTICS_LISTEN_RETRY seconds after it fails
+    if ANALYTICS_CACHE_TTL > 0:
+        start_job('analytics-invalidation', listen_for_invalidations, ANALYTICS_LISTEN_RETRY, run_immediately=True)
+
+def create_app(start_workers=True):
+    """
+    Create and configure the Flask app
+    Pass start_workers=False when the caller decides which process runs the
+    background threads (e.g. run.py under the debug reloader)
+    """
     app = Flask(__name__)
     
     # Configure JWT
     app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'  # Change this in production
     jwt = JWTManager(app)
     
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        # In-memory lookup; revocations are synced from user_sessions in the background
+        return auth_sessions.is_revoked(jwt_payload.get('jti'))
+    
     # Configure CORS
     CORS(app, origins=[
         'http://localhost:5173', 
@@ -29,6 +71,22 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     
+    @app.errorhandler(PasswordPoolBusy)
+    def password_hashing_busy(error):
+        # Back-pressure from the bcrypt pool: tell the client when to retry
+        print(f"❌ Password hashing unavailable: {error}")
+        response = jsonify({'error': 'Server busy, please retry shortly'})
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, 503
+    
+    # Return request-bound PostgreSQL connections to the pool
+    app.teardown_appcontext(release_request_connection)
+    # Return the request thread's SQLite connection to the idle cache
+    app.teardown_appcontext(release_thread_connection)
+    
+    if start_workers:
+        start_background_workers()
+    
     @app.route('/')
     def index():
         return {
@@ -40,20 +98,26 @@ def create_app():
                 '/api/bookings-by-month',
                 '/api/room-type-distribution',
                 '/api/recent-activity',
+                '/api/dashboard-bundle',
+                '/api/health/live',
+                '/api/health/ready',
                 '/api/auth/login',
                 '/api/auth/verify',
                 '/api/admin/users'
             ]
         }
     
-    @app.route('/api/database-status')
-    def database_status():
-        """Check database connectivity"""
-        try:
-            from database import test_database_connection
-            status = test_database_connection()
-            return status
-        except Exception as e:
-            return {'error': str(e), 'status': 'error'}, 500
+    # /api/database-status (cached statistics) is served by the dashboard blueprint;
+    # load balancers should poll these probes instead
+    @app.route('/api/health/live')
+    def liveness():
+        """Liveness probe: the process is up and serving requests"""
+        return {'status': 'alive'}
+    
+    @app.route('/api/health/ready')
+    def readiness():
+        """Readiness probe: a pooled database connection answers SELECT 1"""
+        status = check_database_ready()
+        return status, 200 if status['status'] == 'ready' else 503
     
     return app
@@ -0,0 +1,240 @@
+"""
+In-process analytics result cache for InsightForge
+Memoizes dashboard queries per function, hotel and parameters with per-entry
+TTL, a memory budget enforced by LRU eviction and per-hotel invalidation
+"""
+
+import copy
+import functools
+import inspect
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+# Default entry lifetime in seconds (0 disables caching)
+ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', '30'))
+# Approximate memory budget for cached results in bytes
+ANALYTICS_CACHE_MAX_BYTES = int(os.getenv('ANALYTICS_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+
+# Set while a value is being computed on this thread if it must not be stored
+_compute_state = threading.local()
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at', 'hotel_id')
+
+    def __init__(self, value: Any, size: int, expires_at: float, hotel_id: Optional[int]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.hotel_id = hotel_id
+
+
+class AnalyticsCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and a byte budget
+
+    Concurrent misses on the same key are coalesced: one caller computes the
+    value while the others wait for it, so a burst of identical dashboard
+    requests runs the underlying query once.
+    """
+
+    def __init__(self, max_bytes: int = ANALYTICS_CACHE_MAX_BYTES, default_ttl: float = ANALYTICS_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._by_hotel: Dict[Optional[int], Set[Hashable]] = {}
+        self._in_flight: Dict[Hashable, threading.Event] = {}
+        self._generation = 0  # bumped by invalidation so in-flight results are not stored stale
+        self._bytes = 0
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'coalesced': 0,
+        }
+
+    def _remove_locked(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            keys = self._by_hotel.get(entry.hotel_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_hotel[entry.hotel_id]
+        return entry
+
+    def _lookup_locked(self, key: Hashable, now: float) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at <= now:
+            self._remove_locked(key)
+            self._counters['expirations'] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry.value
+
+    def _store_locked(self, key: Hashable, value: Any, ttl: float, hotel_id: Optional[int]):
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return  # Unpicklable results are simply not cached
+        if size > self.max_bytes:
+            return
+
+        self._remove_locked(key)
+        while self._entries and self._bytes + size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove_locked(oldest)
+            self._counters['evictions'] += 1
+
+        self._entries[key] = _Entry(value, size, time.monotonic() + ttl, hotel_id)
+        self._by_hotel.setdefault(hotel_id, set()).add(key)
+        self._bytes += size
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       ttl: Optional[float] = None, hotel_id: Optional[int] = None) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Args:
+            key: Cache key (function name plus call arguments)
+            compute: Zero-argument callable producing the value
+            ttl: Entry lifetime in seconds (defaults to default_ttl)
+            hotel_id: Hotel the value belongs to, used for invalidation
+
+        Returns:
+            A private copy of the value, safe for the caller to mutate
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return compute()
+
+        while True:
+            with self._lock:
+                found, value = self._lookup_locked(key, time.monotonic())
+                if found:
+                    self._counters['hits'] += 1
+                    return copy.deepcopy(value)
+                waiter = self._in_flight.get(key)
+                if waiter is None:
+                    self._counters['misses'] += 1
+                    done = self._in_flight[key] = threading.Event()
+                    generation = self._generation
+                    break
+                self._counters['coalesced'] += 1
+            # Another thread is computing this key; reuse its result once stored
+            waiter.wait()
+
+        outer_failed = getattr(_compute_state, 'failed', False)
+        _compute_state.failed = False
+        try:
+            value = compute()
+            with self._lock:
+                if generation == self._generation and not _compute_state.failed:
+                    self._store_locked(key, value, ttl, hotel_id)
+            return copy.deepcopy(value)
+        finally:
+            # A fallback inside a nested computation taints the enclosing one too
+            _compute_state.failed = outer_failed or _compute_state.failed
+            with self._lock:
+                del self._in_flight[key]
+            done.set()
+
+    def invalidate_hotel(self, hotel_id: Optional[int]) -> int:
+        """Drop every entry for one hotel; returns the number removed"""
+        with self._lock:
+            self._generation += 1
+            keys = list(self._by_hotel.get(hotel_id, ()))
+            for key in keys:
+                self._remove_locked(key)
+            self._counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self) -> int:
+        """Drop every entry; returns the number removed"""
+        with self._lock:
+            self._generation += 1
+            removed = len(self._entries)
+            self._entries.clear()
+            self._by_hotel.clear()
+            self._bytes = 0
+            self._counters['invalidations'] += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache usage statistics"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'default_ttl': self.default_ttl,
+                **self._counters,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+            }
+
+
+# Shared cache used by the analytics query functions
+analytics_cache = AnalyticsCache()
+
+
+def cached(ttl: Optional[float] = None, cache: AnalyticsCache = analytics_cache):
+    """
+    Decorator memoizing an analytics function in the shared cache
+    The key is the function name plus its bound arguments (defaults applied),
+    and a `hotel_id` argument, when present, tags the entry for invalidation
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = tuple(bound.arguments.items())
+            try:
+                key = (func.__qualname__,) + arguments
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs), ttl=ttl,
+                                        hotel_id=bound.arguments.get('hotel_id'))
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def mark_uncacheable():
+    """
+    Keep the value being computed on this thread out of the cache
+    Called when a query fails, so a fallback result served in its place is
+    not cached as if it were real data
+    """
+    _compute_state.failed = True
+
+
+def invalidate_hotel(hotel_id: Optional[int]) -> int:
+    """Drop cached analytics for a hotel after its bookings, reviews or payments change"""
+    return analytics_cache.invalidate_hotel(hotel_id)
+
+
+def clear_cache() -> int:
+    """Drop all cached analytics"""
+    return analytics_cache.clear()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get analytics cache statistics"""
+    return analytics_cache.stats()
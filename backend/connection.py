@@ -1,118 +1,173 @@
 """
 Database connection module for InsightForge
-Provides singleton pattern for PostgreSQL database connections
-Similar to the PHP PDO singleton pattern but adapted for Python and PostgreSQL
+Provides pooled PostgreSQL connections with a read-only autocommit path for
+queries and explicit transaction scopes for writes
 """
 
 import psycopg2
 import psycopg2.extras
 import os
 import threading
+from contextlib import contextmanager
 from typing import Optional
 from dotenv import load_dotenv
+from pool import ConnectionPool, PoolError, pool_settings_from_env
 
 # Load environment variables
 load_dotenv()
 
 class Database:
     """
-    Singleton database connection class for PostgreSQL
-    Provides thread-safe database connections with proper error handling
+    Pooled database access class for PostgreSQL
+    Reads borrow a read-only autocommit connection for the duration of one
+    query; writes run inside a transaction bound to the calling thread
     """
     
-    _instance = None
+    _read_pool: Optional[ConnectionPool] = None
+    _write_pool: Optional[ConnectionPool] = None
     _lock = threading.Lock()
+    _local = threading.local()  # Holds the thread's open transaction connection
+    
+    # Database configuration
+    _db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'insightforgedb'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'jradz123'),
+        'sslmode': os.getenv('DB_SSLMODE', 'prefer'),
+        'connect_timeout': 30,  # 30 seconds timeout
+        'application_name': 'InsightForge',
+    }
     
     def __init__(self):
-        """Private constructor - use getInstance() instead"""
-        if Database._instance is not None:
-            raise Exception("This class is a singleton! Use getInstance() method.")
-        
-        # Database configuration
-        self._db_config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'port': os.getenv('DB_PORT', '5432'),
-            'database': os.getenv('DB_NAME', 'insightforgedb'),
-            'user': os.getenv('DB_USER', 'postgres'),
-            'password': os.getenv('DB_PASSWORD', 'jradz123'),
-            'sslmode': os.getenv('DB_SSLMODE', 'prefer'),
-        }
-        
-        # Initialize connection
-        self._conn = None
-        self._connect()
+        """Not instantiable - use the class methods instead"""
+        raise Exception("Database is not instantiable! Use its class methods.")
+    
+    @staticmethod
+    def _configure_read(conn):
+        """Read connections never hold a transaction open between queries"""
+        conn.set_session(readonly=True, autocommit=True)
+    
+    @staticmethod
+    def _configure_write(conn):
+        """Write connections use explicit transaction control"""
+        conn.autocommit = False
     
-    def _connect(self):
-        """Establish database connection with proper configuration"""
+    @classmethod
+    def _get_pools(cls):
+        """Create the read and write pools on first use"""
+        if cls._write_pool is None:
+            with cls._lock:
+                if cls._write_pool is None:
+                    cls._read_pool = ConnectionPool(
+                        cls._db_config,
+                        configure=cls._configure_read,
+                        name='auth-read',
+                        **pool_settings_from_env('DB_READ_POOL')
+                    )
+                    cls._write_pool = ConnectionPool(
+                        cls._db_config,
+                        configure=cls._configure_write,
+                        name='auth-write',
+                        **pool_settings_from_env('DB_WRITE_POOL')
+                    )
+                    print(f"✅ Database pools ready: {cls._db_config['host']}:{cls._db_config['port']}/{cls._db_config['database']}")
+        return cls._read_pool, cls._write_pool
+    
+    @classmethod
+    def _current_transaction(cls):
+        """Connection of the transaction open on this thread, if any"""
+        return getattr(cls._local, 'conn', None)
+    
+    @classmethod
+    @contextmanager
+    def read_connection(cls):
+        """
+        Borrow a connection for read-only queries
+        Inside an open transaction the transaction's connection is reused so
+        reads see the thread's own uncommitted writes
+        """
+        conn = cls._current_transaction()
+        if conn is not None:
+            yield conn
+            return
+        
+        read_pool, _ = cls._get_pools()
         try:
-            self._conn = psycopg2.connect(
-                **self._db_config,
-                connect_timeout=30,  # 30 seconds timeout
-                application_name='InsightForge'
-            )
-            
-            # Configure connection
-            self._conn.autocommit = False  # Explicit transaction control
-            
-            print(f"✅ Database connected successfully: {self._db_config['host']}:{self._db_config['port']}/{self._db_config['database']}")
-            
-        except psycopg2.Error as e:
+            conn = read_pool.getconn()
+        except (PoolError, psycopg2.Error) as e:
             print(f"❌ Database connection failed: {e}")
             raise Exception(f"Database connection failed: {e}")
+        try:
+            yield conn
+        finally:
+            read_pool.putconn(conn)
     
     @classmethod
-    def getInstance(cls):
+    @contextmanager
+    def transaction(cls):
         """
-        Get singleton instance of database connection
-        Thread-safe implementation
+        Run a block inside a write transaction
+        Commits on success and rolls back on error; nested scopes join the
+        outer transaction
         """
-        if cls._instance is None:
-            with cls._lock:
-                # Double-check locking pattern
-                if cls._instance is None:
-                    cls._instance = cls()
-        
-        # Verify connection is still alive
-        if not cls._instance._is_connection_alive():
-            cls._instance._reconnect()
+        conn = cls._current_transaction()
+        if conn is not None:
+            yield conn
+            return
         
-        return cls._instance._conn
-    
-    def _is_connection_alive(self) -> bool:
-        """Check if database connection is still alive"""
+        conn = cls.begin_transaction()
         try:
-            with self._conn.cursor() as cursor:
-                cursor.execute("SELECT 1")
-            return True
-        except:
-            return False
+            yield conn
+        except Exception:
+            cls.rollback_transaction()
+            raise
+        else:
+            cls.commit_transaction()
     
-    def _reconnect(self):
-        """Reconnect to database if connection is lost"""
-        try:
-            if self._conn:
-                self._conn.close()
-        except:
-            pass
-        
-        self._connect()
+    @classmethod
+    def getInstance(cls):
+        """
+        Get the connection bound to the current thread
+        Opens a write transaction if none is active; it is returned to the
+        pool by commit_transaction(), rollback_transaction() or
+        release_connection() at request teardown
+        """
+        conn = cls._current_transaction()
+        if conn is None:
+            conn = cls.begin_transaction()
+        return conn
     
     @classmethod
     def get_connection(cls):
         """Alias for getInstance() for better readability"""
         return cls.getInstance()
     
+    @classmethod
+    def release_connection(cls):
+        """Roll back and return this thread's transaction connection, if any"""
+        if cls._current_transaction() is not None:
+            cls.rollback_transaction()
+    
     @classmethod
     def close_connection(cls):
-        """Close the database connection"""
-        if cls._instance and cls._instance._conn:
-            try:
-                cls._instance._conn.close()
-                print("✅ Database connection closed")
-            except psycopg2.Error as e:
-                print(f"❌ Error closing database: {e}")
-            finally:
-                cls._instance = None
+        """Close all pooled connections"""
+        with cls._lock:
+            for pool in (cls._read_pool, cls._write_pool):
+                if pool is not None:
+                    pool.close()
+            cls._read_pool = None
+            cls._write_pool = None
+        print("✅ Database connections closed")
+    
+    @classmethod
+    def get_pool_stats(cls) -> dict:
+        """Get statistics for the read and write pools"""
+        return {
+            'read': cls._read_pool.stats() if cls._read_pool else None,
+            'write': cls._write_pool.stats() if cls._write_pool else None,
+        }
     
     @classmethod
     def execute_query(cls, query: str, params: tuple = ()) -> list:
@@ -126,14 +181,14 @@ class Database:
         Returns:
             List of rows as dictionaries
         """
-        conn = cls.getInstance()
         try:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                # Convert RealDictRow to regular dict
-                return [dict(row) for row in rows]
+            with cls.read_connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    
+                    # Convert RealDictRow to regular dict
+                    return [dict(row) for row in rows]
                 
         except psycopg2.Error as e:
             print(f"❌ Query execution failed: {e}")
@@ -153,16 +208,13 @@ class Database:
         Returns:
             Number of affected rows
         """
-        conn = cls.getInstance()
         try:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
-                conn.commit()
-                
-                return cursor.rowcount
+            with cls.transaction() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.rowcount
                 
         except psycopg2.Error as e:
-            conn.rollback()
             print(f"❌ Update execution failed: {e}")
             print(f"Query: {query}")
             print(f"Params: {params}")
@@ -180,21 +232,19 @@ class Database:
         Returns:
             Last inserted row ID
         """
-        conn = cls.getInstance()
         try:
-            with conn.cursor() as cursor:
-                # For PostgreSQL, we need to add RETURNING id clause if not present
-                if 'RETURNING' not in query.upper():
-                    query += ' RETURNING id'
-                
-                cursor.execute(query, params)
-                result = cursor.fetchone()
-                conn.commit()
-                
-                return result[0] if result else None
+            with cls.transaction() as conn:
+                with conn.cursor() as cursor:
+                    # For PostgreSQL, we need to add RETURNING id clause if not present
+                    if 'RETURNING' not in query.upper():
+                        query += ' RETURNING id'
+                    
+                    cursor.execute(query, params)
+                    result = cursor.fetchone()
+                    
+                    return result[0] if result else None
                 
         except psycopg2.Error as e:
-            conn.rollback()
             print(f"❌ Insert execution failed: {e}")
             print(f"Query: {query}")
             print(f"Params: {params}")
@@ -202,32 +252,55 @@ class Database:
     
     @classmethod
     def begin_transaction(cls):
-        """Begin a database transaction"""
-        conn = cls.getInstance()
-        conn.autocommit = False
+        """Begin a transaction on a pooled write connection bound to this thread"""
+        conn = cls._current_transaction()
+        if conn is not None:
+            return conn
+        
+        _, write_pool = cls._get_pools()
+        try:
+            conn = write_pool.getconn()
+        except (PoolError, psycopg2.Error) as e:
+            print(f"❌ Database connection failed: {e}")
+            raise Exception(f"Database connection failed: {e}")
+        cls._local.conn = conn
+        return conn
+    
+    @classmethod
+    def _end_transaction(cls, commit: bool):
+        conn = cls._current_transaction()
+        if conn is None:
+            return
+        cls._local.conn = None
+        try:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            _, write_pool = cls._get_pools()
+            write_pool.putconn(conn)
     
     @classmethod
     def commit_transaction(cls):
-        """Commit the current transaction"""
-        conn = cls.getInstance()
-        conn.commit()
+        """Commit the current transaction and release its connection"""
+        cls._end_transaction(commit=True)
     
     @classmethod
     def rollback_transaction(cls):
-        """Rollback the current transaction"""
-        conn = cls.getInstance()
-        conn.rollback()
+        """Rollback the current transaction and release its connection"""
+        cls._end_transaction(commit=False)
     
     @classmethod
     def test_connection(cls) -> bool:
         """Test database connection and return status"""
         try:
-            conn = cls.getInstance()
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT version()")
-                version = cursor.fetchone()
-                print(f"✅ Database test successful - PostgreSQL version: {version[0]}")
-                return True
+            with cls.read_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT version()")
+                    version = cursor.fetchone()
+                    print(f"✅ Database test successful - PostgreSQL version: {version[0]}")
+                    return True
         except Exception as e:
             print(f"❌ Database test failed: {e}")
             return False
@@ -238,6 +311,10 @@ def get_db_connection():
     """Get database connection instance"""
     return Database.getInstance()
 
+def release_request_connection(exception=None):
+    """Return the request's connection to the pool (Flask teardown hook)"""
+    Database.release_connection()
+
 def execute_query(query: str, params: tuple = ()) -> list:
     """Execute SELECT query"""
     return Database.execute_query(query, params)
@@ -6,11 +6,19 @@ Handles PostgreSQL database connections and common queries
 import psycopg2
 import psycopg2.extras
 import os
-from datetime import datetime, date
-from typing import Dict, List, Any, Optional, Union
+import atexit
+import select
+import threading
+import time
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Sequence, Union
 from contextlib import contextmanager
 import json
 from dotenv import load_dotenv
+from pool import ConnectionPool, PoolError, pool_settings_from_env
+from cache import cached, invalidate_hotel, clear_cache, get_cache_stats, mark_uncacheable
+from utils.background import stopping
 
 # Load environment variables
 load_dotenv()
@@ -29,22 +37,71 @@ class DatabaseError(Exception):
     """Custom exception for database operations"""
     pass
 
+# Seconds a readiness probe waits for a pooled connection
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+# Seconds between background refreshes of /api/database-status statistics (0 disables)
+DB_STATUS_REFRESH_INTERVAL = float(os.getenv('DB_STATUS_REFRESH_INTERVAL', '30'))
+# Seconds between concurrent refreshes of the monthly_booking_rollups view (0 disables)
+ROLLUP_REFRESH_INTERVAL = float(os.getenv('ROLLUP_REFRESH_INTERVAL', '900'))
+
+_database_stats: Optional[Dict[str, Any]] = None
+
+# Shared connection pool, created lazily on first use
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def _configure_connection(conn):
+    """Analytics reads run outside explicit transactions"""
+    conn.autocommit = True
+
+def get_pool() -> ConnectionPool:
+    """Get the shared analytics connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_CONFIG,
+                    configure=_configure_connection,
+                    name='analytics',
+                    **pool_settings_from_env('DB_POOL')
+                )
+    return _pool
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool statistics"""
+    if _pool is None:
+        return {'name': 'analytics', 'size': 0, 'idle': 0, 'in_use': 0, 'initialized': False}
+    return {**_pool.stats(), 'initialized': True}
+
+def close_pool():
+    """Close all pooled connections (called at interpreter exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+atexit.register(close_pool)
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = None
+    """Context manager for pooled database connections"""
+    try:
+        pool = get_pool()
+        conn = pool.getconn()
+    except (PoolError, psycopg2.Error) as e:
+        mark_uncacheable()
+        raise DatabaseError(f"Database error: {e}")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
         yield conn
     except psycopg2.Error as e:
-        if conn:
-            conn.rollback()
+        mark_uncacheable()
         raise DatabaseError(f"Database error: {e}")
     finally:
-        if conn:
-            conn.close()
+        pool.putconn(conn)
 
-def execute_query(query: str, params: tuple = None, fetch_one: bool = False) -> Union[List[Dict], Dict, None]:
+def execute_query(query: str, params: Union[tuple, dict] = None, fetch_one: bool = False) -> Union[List[Dict], Dict, None]:
     """Execute a query and return results as dictionaries"""
     try:
         with get_db_connection() as conn:
@@ -61,8 +118,68 @@ def execute_query(query: str, params: tuple = None, fetch_one: bool = False) ->
                     return [dict(row) for row in results]
                 
     except Exception as e:
+        # Callers that fall back to defaults must not have those cached
+        mark_uncacheable()
         raise DatabaseError(f"Query execution error: {e}")
 
+# Rows fetched per round trip by stream_query's server-side cursors
+DB_STREAM_ITERSIZE = int(os.getenv('DB_STREAM_ITERSIZE', '2000'))
+
+def stream_query(query: str, params: Union[tuple, dict] = None, itersize: int = DB_STREAM_ITERSIZE,
+                 batch_size: Optional[int] = None) -> Iterator[Union[Dict, List[Dict]]]:
+    """
+    Stream a query's results through a named (server-side) cursor
+    
+    Rows are fetched `itersize` at a time as the caller iterates, so memory
+    stays constant however many rows the query returns. The pooled connection
+    is held until the generator is exhausted or closed; stopping early rolls
+    back the read transaction and releases it.
+    
+    Args:
+        query: SQL query to run
+        params: Query parameters
+        itersize: Rows fetched from the server per round trip
+        batch_size: Yield lists of up to this many rows instead of single rows
+    
+    Returns:
+        Generator of row dicts (or lists of row dicts when batch_size is set)
+    """
+    with get_db_connection() as conn:
+        # Server-side cursors only live inside a transaction
+        conn.autocommit = False
+        try:
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}",
+                             cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, params)
+                if batch_size:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield [dict(row) for row in rows]
+                else:
+                    for row in cursor:
+                        yield dict(row)
+        finally:
+            # Also runs when the caller abandons the generator; nothing was written
+            conn.rollback()
+            conn.autocommit = True
+
+@contextmanager
+def transaction():
+    """Context manager for a multi-statement transaction on a pooled connection"""
+    with get_db_connection() as conn:
+        conn.autocommit = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+
 def execute_update(query: str, params: tuple = None) -> int:
     """Execute an update query and return number of affected rows"""
     try:
@@ -74,74 +191,224 @@ def execute_update(query: str, params: tuple = None) -> int:
                     cursor.execute(query)
                 
                 conn.commit()
-                return cursor.rowcount
+                rowcount = cursor.rowcount
                 
     except Exception as e:
         raise DatabaseError(f"Update execution error: {e}")
+    
+    return rowcount
 
-def get_kpi_data(hotel_id: int = 1) -> Dict[str, Any]:
-    """Get latest KPI data for dashboard calculated from real booking data"""
+# Channel the bookings, reviews and payments triggers notify with a hotel id
+ANALYTICS_INVALIDATION_CHANNEL = 'hotel_analytics_changed'
+# Seconds between reconnect attempts when the listening connection fails
+ANALYTICS_LISTEN_RETRY = float(os.getenv('ANALYTICS_LISTEN_RETRY', '30'))
+
+def listen_for_invalidations():
+    """
+    Drop cached analytics for each hotel the database reports as changed
+    Holds one LISTEN session until the background jobs stop; a connection
+    error is raised so start_background_workers retries after ANALYTICS_LISTEN_RETRY
+    """
+    # A dedicated connection: LISTEN must stay registered between polls
+    conn = psycopg2.connect(**DB_CONFIG)
     try:
-        # Get current month's data
-        current_month_query = """
-            SELECT 
-                COUNT(*) as total_bookings,
-                COALESCE(SUM(b.total_amount), 0) as revenue,
-                COALESCE(AVG(b.room_rate), 0) as adr,
-                COALESCE(AVG(CASE WHEN r.rating IS NOT NULL THEN r.rating END), 0) as average_rating
-            FROM bookings b
-            LEFT JOIN reviews r ON b.id = r.booking_id
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            AND DATE_TRUNC('month', b.booking_date) = DATE_TRUNC('month', CURRENT_DATE)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {ANALYTICS_INVALIDATION_CHANNEL}")
+        # Changes made while nobody was listening were missed
+        clear_cache()
+        while not stopping():
+            if select.select([conn], [], [], 5) == ([], [], []):
+                continue
+            conn.poll()
+            hotel_ids = {int(notify.payload) for notify in conn.notifies if notify.payload.isdigit()}
+            conn.notifies.clear()
+            for hotel_id in hotel_ids:
+                invalidate_hotel(hotel_id)
+    finally:
+        conn.close()
+
+# Longest custom range accepted from `from`/`to` request parameters
+MAX_PERIOD_DAYS = int(os.getenv('MAX_PERIOD_DAYS', '1096'))
+
+class Period(NamedTuple):
+    """Half-open date range [start, end) used by the analytics queries"""
+    start: date
+    end: date
+    
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days
+    
+    @classmethod
+    def month(cls, offset: int = 0, today: Optional[date] = None) -> 'Period':
+        """Calendar month relative to today (0 = current, -1 = previous)"""
+        today = today or date.today()
+        index = today.year * 12 + today.month - 1 + offset
+        start = date(index // 12, index % 12 + 1, 1)
+        end = date((index + 1) // 12, (index + 1) % 12 + 1, 1)
+        return cls(start, end)
+    
+    @classmethod
+    def from_params(cls, args, default: Optional['Period'] = None) -> Optional['Period']:
         """
+        Parse `from`/`to` query parameters (ISO dates, both inclusive)
         
-        current_result = execute_query(current_month_query, (hotel_id,), fetch_one=True)
-        
-        # Get hotel's total rooms for occupancy calculation
-        hotel_query = """
-            SELECT total_rooms
-            FROM hotels
-            WHERE id = %s
-        """
+        Args:
+            args: Request arguments or any mapping with optional 'from' and 'to'
+            default: Period returned when neither parameter is given
         
-        hotel_result = execute_query(hotel_query, (hotel_id,), fetch_one=True)
-        total_rooms = hotel_result["total_rooms"] if hotel_result else 100
+        Returns:
+            The requested period, or `default`
         
-        # Calculate occupancy rate for current month
-        occupancy_query = """
-            SELECT 
-                COUNT(*) as occupied_room_nights
-            FROM (
-                SELECT DISTINCT 
-                    b.room_id,
-                    generate_series(b.check_in::date, (b.check_out - interval '1 day')::date, '1 day'::interval)::date as occupied_date
-                FROM bookings b
-                WHERE b.hotel_id = %s 
-                AND b.status IN ('confirmed', 'checked_in', 'checked_out')
-                AND DATE_TRUNC('month', b.check_in) = DATE_TRUNC('month', CURRENT_DATE)
-            ) occupied_dates
+        Raises:
+            ValueError: If a date is malformed, `to` is given without `from`,
+                the range is empty or longer than MAX_PERIOD_DAYS
         """
+        start, end = args.get('from'), args.get('to')
+        if not start and not end:
+            return default
+        if not start:
+            raise ValueError("'from' is required when 'to' is given")
         
-        occupancy_result = execute_query(occupancy_query, (hotel_id,), fetch_one=True)
+        try:
+            start = date.fromisoformat(start)
+            end = date.fromisoformat(end) if end else date.today()
+        except ValueError:
+            raise ValueError("'from' and 'to' must be dates in YYYY-MM-DD format")
         
-        # Calculate days in current month
-        days_in_month_query = """
-            SELECT EXTRACT(DAY FROM DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month' - INTERVAL '1 day') as days_in_month
+        # `to` names the last day included; the range itself is half-open
+        period = cls(start, end + timedelta(days=1))
+        if period.days <= 0:
+            raise ValueError("'to' must not be before 'from'")
+        if period.days > MAX_PERIOD_DAYS:
+            raise ValueError(f"Periods are limited to {MAX_PERIOD_DAYS} days")
+        return period
+    
+    def previous(self) -> 'Period':
+        """Period of the same length ending where this one starts"""
+        return type(self)(self.start - timedelta(days=self.days), self.start)
+    
+    def months(self) -> 'Period':
+        """Smallest range of whole calendar months covering this period"""
+        return type(self)(self.month(0, self.start).start, self.month(0, self.end - timedelta(days=1)).end)
+    
+    def predicate(self, column: str, name: str = 'period') -> str:
         """
+        Index-friendly `column >= start AND column < end` predicate; bind it
+        with params(name)
+        """
+        return f"{column} >= %({name}_start)s AND {column} < %({name}_end)s"
+    
+    def params(self, name: str = 'period') -> Dict[str, date]:
+        """Named parameters for predicate(column, name)"""
+        return {f"{name}_start": self.start, f"{name}_end": self.end}
+
+def period_filter(column: str, period: Optional[Period]) -> str:
+    """`AND <range predicate>` for an optional period (empty for all-time queries)"""
+    return f"AND {period.predicate(column)}" if period else ""
+
+def period_params(period: Optional[Period], **params) -> Dict[str, Any]:
+    """Query parameters plus the bounds for period_filter()"""
+    return {**params, **(period.params() if period else {})}
+
+# Booking statuses that occupy a room (kept in sync with sync_room_nights() in the schema)
+OCCUPIED_STATUSES = ('confirmed', 'checked_in', 'checked_out')
+
+def empty_kpis() -> Dict[str, Any]:
+    """KPI payload with every metric zeroed"""
+    return {
+        "totalBookings": 0,
+        "revenue": 0,
+        "occupancyRate": 0,
+        "averageRating": 0,
+        "revpar": 0,
+        "adr": 0,
+        "goppar": 0,
+        "occupiedRoomNights": 0
+    }
+
+def compute_kpis(hotel_id: int, periods: List[Period]) -> List[Dict[str, Any]]:
+    """
+    Compute KPIs for several periods in a single scan over bookings
+    
+    Bookings, revenue, ADR and rating count bookings made in the period;
+    occupancy counts distinct (room, night) pairs from the room_nights fact
+    table, so overlapping bookings of one room occupy it once. Every
+    period is a set of conditional aggregates over the same rows, so the
+    cost is one round trip however many periods are requested.
+    
+    Args:
+        hotel_id: Hotel to compute metrics for
+        periods: Periods to compute, in the order results are returned
         
-        days_result = execute_query(days_in_month_query, (), fetch_one=True)
-        days_in_month = int(days_result["days_in_month"]) if days_result else 30
-        
-        # Calculate metrics
-        total_bookings = current_result["total_bookings"] if current_result else 0
-        revenue = float(current_result["revenue"]) if current_result and current_result["revenue"] else 0
-        adr = float(current_result["adr"]) if current_result and current_result["adr"] else 0
-        average_rating = float(current_result["average_rating"]) if current_result and current_result["average_rating"] else 0
+    Returns:
+        One KPI dict per period
+    """
+    if not periods:
+        return []
+    
+    params: Dict[str, Any] = {
+        "hotel_id": hotel_id,
+        "range_start": min(p.start for p in periods),
+        "range_end": max(p.end for p in periods),
+    }
+    booking_columns = []
+    night_columns = []
+    for i, period in enumerate(periods):
+        params[f"start_{i}"] = period.start
+        params[f"end_{i}"] = period.end
+        booked = f"b.booking_date >= %(start_{i})s AND b.booking_date < %(end_{i})s"
+        booking_columns.append(f"""
+                COUNT(*) FILTER (WHERE {booked}) as total_bookings_{i},
+                COALESCE(SUM(b.total_amount) FILTER (WHERE {booked}), 0) as revenue_{i},
+                COALESCE(AVG(b.room_rate) FILTER (WHERE {booked}), 0) as adr_{i},
+                COALESCE(AVG(r.rating) FILTER (WHERE {booked}), 0) as average_rating_{i}""")
+        night_columns.append(f"""
+                COUNT(DISTINCT (rn.room_id, rn.date)) FILTER (WHERE rn.date >= %(start_{i})s AND rn.date < %(end_{i})s) as occupied_room_nights_{i}""")
+    
+    query = f"""
+        WITH booking_totals AS (
+            SELECT {",".join(booking_columns)}
+            FROM bookings b
+            LEFT JOIN (
+                SELECT booking_id, AVG(rating) as rating
+                FROM reviews
+                WHERE hotel_id = %(hotel_id)s AND rating IS NOT NULL
+                GROUP BY booking_id
+            ) r ON r.booking_id = b.id
+            WHERE b.hotel_id = %(hotel_id)s
+            AND b.status != 'cancelled'
+            AND b.booking_date >= %(range_start)s AND b.booking_date < %(range_end)s
+        ),
+        night_totals AS (
+            SELECT {",".join(night_columns)}
+            FROM room_nights rn
+            WHERE rn.hotel_id = %(hotel_id)s
+            AND rn.date >= %(range_start)s AND rn.date < %(range_end)s
+        )
+        SELECT
+            (SELECT total_rooms FROM hotels WHERE id = %(hotel_id)s) as total_rooms,
+            booking_totals.*,
+            night_totals.*
+        FROM booking_totals, night_totals
+    """
+    
+    row = execute_query(query, params, fetch_one=True) or {}
+    total_rooms = row.get("total_rooms")
+    if total_rooms is None:
+        total_rooms = 100
+    
+    results = []
+    for i, period in enumerate(periods):
+        total_bookings = row.get(f"total_bookings_{i}") or 0
+        revenue = float(row.get(f"revenue_{i}") or 0)
+        adr = float(row.get(f"adr_{i}") or 0)
+        average_rating = float(row.get(f"average_rating_{i}") or 0)
+        occupied_nights = int(row.get(f"occupied_room_nights_{i}") or 0)
         
         # Calculate occupancy rate
-        occupied_nights = occupancy_result["occupied_room_nights"] if occupancy_result else 0
-        total_available_nights = total_rooms * days_in_month
+        total_available_nights = total_rooms * period.days
         occupancy_rate = (occupied_nights / total_available_nights * 100) if total_available_nights > 0 else 0
         
         # Calculate RevPAR (Revenue Per Available Room)
@@ -150,45 +417,252 @@ def get_kpi_data(hotel_id: int = 1) -> Dict[str, Any]:
         # Calculate GOP (Gross Operating Profit) - simplified as 70% of revenue
         goppar = revpar * 0.7
         
-        return {
+        results.append({
             "totalBookings": total_bookings,
             "revenue": revenue,
             "occupancyRate": occupancy_rate,
             "averageRating": average_rating,
             "revpar": revpar,
             "adr": adr,
-            "goppar": goppar
-        }
+            "goppar": goppar,
+            "occupiedRoomNights": occupied_nights
+        })
+    
+    return results
+
+@cached()
+def get_room_night_metrics(hotel_id: int, period: Period) -> Dict[str, Any]:
+    """Stay-based occupancy, ADR and RevPAR for a date range from the room_nights fact table"""
+    query = """
+        SELECT
+            (SELECT total_rooms FROM hotels WHERE id = %(hotel_id)s) as total_rooms,
+            COUNT(DISTINCT (room_id, date)) as occupied_room_nights,
+            COALESCE(SUM(revenue), 0) as room_revenue
+        FROM room_nights
+        WHERE hotel_id = %(hotel_id)s
+        AND date >= %(start)s AND date < %(end)s
+    """
+    
+    row = execute_query(query, {"hotel_id": hotel_id, "start": period.start, "end": period.end}, fetch_one=True)
+    total_rooms = row["total_rooms"] or 0
+    occupied_nights = row["occupied_room_nights"] or 0
+    room_revenue = float(row["room_revenue"] or 0)
+    available_nights = total_rooms * period.days
+    
+    return {
+        "occupiedRoomNights": occupied_nights,
+        "availableRoomNights": available_nights,
+        "roomRevenue": room_revenue,
+        "occupancyRate": (occupied_nights / available_nights * 100) if available_nights > 0 else 0,
+        "adr": (room_revenue / occupied_nights) if occupied_nights > 0 else 0,
+        "revpar": (room_revenue / available_nights) if available_nights > 0 else 0
+    }
+
+def backfill_room_nights(hotel_id: Optional[int] = None) -> int:
+    """
+    Rebuild room_nights from bookings in bulk
+    The sync_room_nights trigger keeps the table current afterwards; this is
+    for initial loads and repairs
+    
+    Args:
+        hotel_id: Limit the rebuild to one hotel (all hotels if omitted)
+        
+    Returns:
+        Number of room-night rows written
+    """
+    hotel_filter = "AND b.hotel_id = %(hotel_id)s" if hotel_id is not None else ""
+    params = {"hotel_id": hotel_id, "occupied_statuses": OCCUPIED_STATUSES}
+    
+    with transaction() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM room_nights WHERE %(hotel_id)s IS NULL OR hotel_id = %(hotel_id)s",
+                params
+            )
+            cursor.execute(f"""
+                INSERT INTO room_nights (booking_id, hotel_id, room_id, date, revenue)
+                SELECT
+                    b.id, b.hotel_id, b.room_id, night::date,
+                    b.total_amount / GREATEST(b.check_out - b.check_in, 1)
+                FROM bookings b
+                CROSS JOIN LATERAL generate_series(b.check_in, b.check_out - 1, INTERVAL '1 day') AS night
+                WHERE b.status IN %(occupied_statuses)s
+                {hotel_filter}
+            """, params)
+            written = cursor.rowcount
+    
+    if hotel_id is None:
+        clear_cache()
+    else:
+        invalidate_hotel(hotel_id)
+    return written
+
+def backfill_activity_stream(hotel_id: Optional[int] = None) -> int:
+    """
+    Append activity_stream entries for existing bookings, payments and reviews
+    The append_*_activity triggers record new rows afterwards; entries that
+    already exist are left alone, so this is safe to re-run
+    
+    Args:
+        hotel_id: Limit the backfill to one hotel (all hotels if omitted)
+        
+    Returns:
+        Number of entries written
+    """
+    params = {"hotel_id": hotel_id}
+    with transaction() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO activity_stream (hotel_id, activity_type, source_id, description, created_at)
+                SELECT b.hotel_id, 'booking', b.id,
+                       CONCAT('New booking from ', g.first_name, ' ', g.last_name, ' - Room ', rt.name),
+                       COALESCE(b.booking_date, b.created_at, CURRENT_TIMESTAMP)
+                FROM bookings b
+                LEFT JOIN guests g ON b.guest_id = g.id
+                LEFT JOIN room_types rt ON b.room_type_id = rt.id
+                WHERE %(hotel_id)s IS NULL OR b.hotel_id = %(hotel_id)s
+                
+                UNION ALL
+                
+                SELECT b.hotel_id, 'cancellation', b.id,
+                       CONCAT('Booking cancelled - ', b.booking_reference),
+                       COALESCE(b.cancellation_date, b.updated_at, CURRENT_TIMESTAMP)
+                FROM bookings b
+                WHERE b.status = 'cancelled'
+                AND (%(hotel_id)s IS NULL OR b.hotel_id = %(hotel_id)s)
+                
+                UNION ALL
+                
+                SELECT b.hotel_id, 'payment', p.id,
+                       CONCAT('Payment received - $', ROUND(p.amount, 2)),
+                       COALESCE(p.payment_date, p.created_at, CURRENT_TIMESTAMP)
+                FROM payments p
+                JOIN bookings b ON p.booking_id = b.id
+                WHERE %(hotel_id)s IS NULL OR b.hotel_id = %(hotel_id)s
+                
+                UNION ALL
+                
+                SELECT r.hotel_id, 'review', r.id,
+                       CONCAT('Review submitted - ', r.rating, ' stars'),
+                       COALESCE(r.review_date::timestamp, r.created_at, CURRENT_TIMESTAMP)
+                FROM reviews r
+                WHERE %(hotel_id)s IS NULL OR r.hotel_id = %(hotel_id)s
+                
+                ON CONFLICT (activity_type, source_id) DO NOTHING
+            """, params)
+            written = cursor.rowcount
+    
+    if hotel_id is None:
+        clear_cache()
+    else:
+        invalidate_hotel(hotel_id)
+    return written
+
+def calculate_change(current_val, previous_val) -> Dict[str, Any]:
+    """Calculate percentage change and trend"""
+    if previous_val == 0:
+        if current_val > 0:
+            return {"change": 100, "trend": "up"}
+        else:
+            return {"change": 0, "trend": "neutral"}
+    
+    change = ((current_val - previous_val) / previous_val) * 100
+    trend = "up" if change > 0 else "down" if change < 0 else "neutral"
+    return {"change": round(change, 1), "trend": trend}
+
+@cached()
+def get_kpi_data(hotel_id: int = 1, period: Optional[Period] = None) -> Dict[str, Any]:
+    """Get KPI data for a period (default: current month) calculated from real booking data"""
+    try:
+        return compute_kpis(hotel_id, [period or Period.month()])[0]
         
     except Exception as e:
         print(f"Error calculating KPI data: {e}")
         # Return default values if calculation fails
-        return {
-            "totalBookings": 0,
-            "revenue": 0,
-            "occupancyRate": 0,
-            "averageRating": 0,
-            "revpar": 0,
-            "adr": 0,
-            "goppar": 0
-        }
+        return empty_kpis()
+
+def refresh_monthly_rollups():
+    """Refresh the monthly booking rollups without blocking readers"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            # CONCURRENTLY cannot run inside a transaction; pooled connections are autocommit
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY monthly_booking_rollups")
+    clear_cache()
+
+def month_span(months: int = 6, period: Optional[Period] = None) -> Period:
+    """Whole calendar months covering `period`, or the last `months` months including this one"""
+    if period:
+        return period.months()
+    return Period(Period.month(-(months - 1)).start, Period.month().end)
+
+def month_labels(span: Period) -> List[str]:
+    """'Jan 2024'-style labels for every month in a month_span()"""
+    labels = []
+    month = Period.month(0, span.start)
+    while month.start < span.end:
+        labels.append(month.start.strftime("%b %Y"))
+        month = Period.month(1, month.start)
+    return labels
+
+@cached()
+def get_monthly_booking_rollups(hotel_id: int, months: int = 6,
+                                period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """
+    Monthly booking totals for the last `months` calendar months, or for
+    every calendar month a custom period touches
+    Closed months come from the monthly_booking_rollups view; the current,
+    still-open month is aggregated from raw bookings so it is never stale
+
+    Args:
+        hotel_id: Hotel to report on
+        months: Number of calendar months, including the current one
+        period: Custom range; widened to whole months
 
-def get_revenue_trends(hotel_id: int = 1, months: int = 6) -> Dict[str, List]:
+    Returns:
+        One row per month with booking counts, revenue and room-rate sums
+    """
+    query = """
+        WITH monthly AS (
+            SELECT month, status, bookings, revenue, room_rate_sum
+            FROM monthly_booking_rollups
+            WHERE hotel_id = %(hotel_id)s
+            AND month >= %(start)s AND month < LEAST(%(open_month)s, %(end)s)
+            UNION ALL
+            SELECT 
+                DATE_TRUNC('month', booking_date)::date as month,
+                status,
+                COUNT(*) as bookings,
+                COALESCE(SUM(total_amount), 0) as revenue,
+                COALESCE(SUM(room_rate), 0) as room_rate_sum
+            FROM bookings
+            WHERE hotel_id = %(hotel_id)s
+            AND booking_date >= GREATEST(%(open_month)s, %(start)s) AND booking_date < %(end)s
+            GROUP BY DATE_TRUNC('month', booking_date)::date, status
+        )
+        SELECT 
+            month,
+            SUM(bookings) as total_bookings,
+            COALESCE(SUM(bookings) FILTER (WHERE status = 'cancelled'), 0) as cancellations,
+            COALESCE(SUM(bookings) FILTER (WHERE status != 'cancelled'), 0) as confirmed_bookings,
+            COALESCE(SUM(revenue) FILTER (WHERE status != 'cancelled'), 0) as revenue,
+            COALESCE(SUM(room_rate_sum) FILTER (WHERE status != 'cancelled'), 0) as room_rate_sum
+        FROM monthly
+        GROUP BY month
+        ORDER BY month ASC
+    """
+    
+    span = month_span(months, period)
+    return execute_query(query, {
+        "hotel_id": hotel_id,
+        "start": span.start,
+        "end": span.end,
+        "open_month": Period.month().start
+    })
+
+def get_revenue_trends(hotel_id: int = 1, months: int = 6, period: Optional[Period] = None) -> Dict[str, List]:
     """Get revenue trends for line chart calculated from real booking data"""
     try:
-        query = """
-            SELECT 
-                DATE_TRUNC('month', b.booking_date) as month,
-                COALESCE(SUM(b.total_amount), 0) as revenue
-            FROM bookings b
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            AND b.booking_date >= CURRENT_DATE - INTERVAL '%s months'
-            GROUP BY DATE_TRUNC('month', b.booking_date)
-            ORDER BY month ASC
-        """
-        
-        results = execute_query(query, (hotel_id, months))
+        results = get_monthly_booking_rollups(hotel_id, months, period)
         
         if results:
             labels = []
@@ -209,20 +683,10 @@ def get_revenue_trends(hotel_id: int = 1, months: int = 6) -> Dict[str, List]:
             }
         else:
             # Generate default months if no data
-            from datetime import datetime, timedelta
-            import calendar
-            
-            labels = []
-            data = []
-            
-            for i in range(months):
-                current_date = datetime.now() - timedelta(days=30 * i)
-                labels.insert(0, current_date.strftime("%b %Y"))
-                data.insert(0, 0)
-            
+            labels = month_labels(month_span(months, period))
             return {
                 "labels": labels,
-                "data": data
+                "data": [0] * len(labels)
             }
             
     except Exception as e:
@@ -232,22 +696,10 @@ def get_revenue_trends(hotel_id: int = 1, months: int = 6) -> Dict[str, List]:
             "data": [0, 0, 0, 0, 0, 0]
         }
 
-def get_bookings_by_month(hotel_id: int = 1, months: int = 6) -> Dict[str, List]:
+def get_bookings_by_month(hotel_id: int = 1, months: int = 6, period: Optional[Period] = None) -> Dict[str, List]:
     """Get bookings by month for bar chart calculated from real booking data"""
     try:
-        query = """
-            SELECT 
-                DATE_TRUNC('month', b.booking_date) as month,
-                COUNT(*) as total_bookings
-            FROM bookings b
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            AND b.booking_date >= CURRENT_DATE - INTERVAL '%s months'
-            GROUP BY DATE_TRUNC('month', b.booking_date)
-            ORDER BY month ASC
-        """
-        
-        results = execute_query(query, (hotel_id, months))
+        results = get_monthly_booking_rollups(hotel_id, months, period)
         
         if results:
             labels = []
@@ -260,7 +712,7 @@ def get_bookings_by_month(hotel_id: int = 1, months: int = 6) -> Dict[str, List]
                     month_date = datetime.strptime(month_date, "%Y-%m-%d")
                 
                 labels.append(month_date.strftime("%b %Y"))
-                data.append(row["total_bookings"] if row["total_bookings"] else 0)
+                data.append(int(row["confirmed_bookings"]) if row["confirmed_bookings"] else 0)
             
             return {
                 "labels": labels,
@@ -268,19 +720,10 @@ def get_bookings_by_month(hotel_id: int = 1, months: int = 6) -> Dict[str, List]
             }
         else:
             # Generate default months if no data
-            from datetime import datetime, timedelta
-            
-            labels = []
-            data = []
-            
-            for i in range(months):
-                current_date = datetime.now() - timedelta(days=30 * i)
-                labels.insert(0, current_date.strftime("%b %Y"))
-                data.insert(0, 0)
-            
+            labels = month_labels(month_span(months, period))
             return {
                 "labels": labels,
-                "data": data
+                "data": [0] * len(labels)
             }
             
     except Exception as e:
@@ -290,21 +733,24 @@ def get_bookings_by_month(hotel_id: int = 1, months: int = 6) -> Dict[str, List]
             "data": [0, 0, 0, 0, 0, 0]
         }
 
-def get_room_type_distribution(hotel_id: int = 1) -> List[Dict[str, Any]]:
-    """Get room type distribution for donut chart"""
-    query = """
+@cached()
+def get_room_type_distribution(hotel_id: int = 1, period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """Get room type distribution for donut chart (bookings made in `period`, or all time)"""
+    # The range sits in the join so room types without bookings still get a zero row
+    query = f"""
         SELECT 
             rt.name,
             COUNT(b.id) as bookings,
             SUM(b.total_amount) as revenue
         FROM room_types rt
-        LEFT JOIN bookings b ON rt.id = b.room_type_id AND b.hotel_id = %s
-        WHERE rt.hotel_id = %s
+        LEFT JOIN bookings b ON rt.id = b.room_type_id AND b.hotel_id = %(hotel_id)s
+            {period_filter('b.booking_date', period)}
+        WHERE rt.hotel_id = %(hotel_id)s
         GROUP BY rt.id, rt.name
         ORDER BY bookings DESC
     """
     
-    results = execute_query(query, (hotel_id, hotel_id))
+    results = execute_query(query, period_params(period, hotel_id=hotel_id))
     
     if results:
         total_bookings = sum(row["bookings"] for row in results)
@@ -333,46 +779,38 @@ def get_room_type_distribution(hotel_id: int = 1) -> List[Dict[str, Any]]:
             {"name": "Suite", "value": 0, "percentage": 0, "color": "#4ECDC4"}
         ]
 
-def get_recent_activity(hotel_id: int = 1, limit: int = 10) -> List[Dict[str, Any]]:
-    """Get recent activity logs calculated from real booking data"""
+@cached(ttl=10)
+def get_recent_activity(hotel_id: int = 1, limit: int = 10, before: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get the hotel's most recent activity from the activity stream
+    
+    Args:
+        hotel_id: Hotel ID
+        limit: Number of entries to return
+        before: Cursor of the last entry already shown, to load older entries
+        
+    Returns:
+        Activity entries, newest first; each carries the cursor for the next page
+    """
+    # Malformed cursors raise ValueError to the caller rather than falling back to sample data
+    cursor_filter = ""
+    params = [hotel_id]
+    if before:
+        created_at, entry_id = before.rsplit(':', 1)
+        cursor_filter = "AND (created_at, id) < (%s, %s)"
+        params.extend([datetime.fromisoformat(created_at), int(entry_id)])
+    params.append(limit)
+    
     try:
-        # Get recent bookings and payments as activity
-        query = """
-            SELECT 
-                'booking' as activity_type,
-                CONCAT('New booking from ', g.first_name, ' ', g.last_name, ' - Room ', rt.name) as description,
-                b.booking_date as created_at
-            FROM bookings b
-            LEFT JOIN guests g ON b.guest_id = g.id
-            LEFT JOIN room_types rt ON b.room_type_id = rt.id
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            
-            UNION ALL
-            
-            SELECT 
-                'payment' as activity_type,
-                CONCAT('Payment received - $', ROUND(p.amount, 2)) as description,
-                p.payment_date as created_at
-            FROM payments p
-            JOIN bookings b ON p.booking_id = b.id
-            WHERE b.hotel_id = %s
-            
-            UNION ALL
-            
-            SELECT 
-                'review' as activity_type,
-                CONCAT('Review submitted - ', r.rating, ' stars') as description,
-                r.review_date as created_at
-            FROM reviews r
-            JOIN bookings b ON r.booking_id = b.id
-            WHERE b.hotel_id = %s
-            
-            ORDER BY created_at DESC 
+        # Top-N read of the (hotel_id, created_at DESC, id DESC) index
+        results = execute_query(f"""
+            SELECT id, activity_type, description, created_at
+            FROM activity_stream
+            WHERE hotel_id = %s
+            {cursor_filter}
+            ORDER BY created_at DESC, id DESC
             LIMIT %s
-        """
-        
-        results = execute_query(query, (hotel_id, hotel_id, hotel_id, limit))
+        """, tuple(params))
         
         if results:
             activities = []
@@ -395,7 +833,7 @@ def get_recent_activity(hotel_id: int = 1, limit: int = 10) -> List[Dict[str, An
                 created_at = row["created_at"]
                 if isinstance(created_at, str):
                     created_at = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                elif hasattr(created_at, 'date'):
+                elif not isinstance(created_at, datetime):
                     created_at = datetime.combine(created_at, datetime.min.time())
                 
                 now = datetime.now()
@@ -416,10 +854,14 @@ def get_recent_activity(hotel_id: int = 1, limit: int = 10) -> List[Dict[str, An
                     "type": row["activity_type"],
                     "message": row["description"],
                     "time": time_ago,
-                    "icon": icon_map.get(row["activity_type"], "activity")
+                    "icon": icon_map.get(row["activity_type"], "activity"),
+                    "cursor": f"{row['created_at'].isoformat()}:{row['id']}"
                 })
             
             return activities
+        elif before:
+            # Past the oldest entry: an empty page ends "load more"
+            return []
         else:
             # Return sample activity if no real data available
             return [
@@ -433,6 +875,9 @@ def get_recent_activity(hotel_id: int = 1, limit: int = 10) -> List[Dict[str, An
             
     except Exception as e:
         print(f"Error getting recent activity: {e}")
+        if before:
+            # Sample rows carry no cursor; older pages report the failure instead
+            raise
         # Return sample data if query fails
         return [
             {
@@ -455,22 +900,24 @@ def get_recent_activity(hotel_id: int = 1, limit: int = 10) -> List[Dict[str, An
             }
         ]
 
-def get_booking_sources(hotel_id: int = 1) -> List[Dict[str, Any]]:
-    """Get booking source distribution"""
-    query = """
+@cached()
+def get_booking_sources(hotel_id: int = 1, period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """Get booking source distribution (bookings made in `period`, or all time)"""
+    query = f"""
         SELECT 
             bs.name,
             COUNT(b.id) as bookings,
             SUM(b.total_amount) as revenue
         FROM booking_sources bs
-        LEFT JOIN bookings b ON bs.id = b.source_id AND b.hotel_id = %s
+        LEFT JOIN bookings b ON bs.id = b.source_id AND b.hotel_id = %(hotel_id)s
+            {period_filter('b.booking_date', period)}
         WHERE bs.is_active = TRUE
         GROUP BY bs.id, bs.name
         HAVING COUNT(b.id) > 0
         ORDER BY COUNT(b.id) DESC
     """
     
-    results = execute_query(query, (hotel_id,))
+    results = execute_query(query, period_params(period, hotel_id=hotel_id))
     
     if results:
         total_bookings = sum(row["bookings"] for row in results)
@@ -495,21 +942,23 @@ def get_booking_sources(hotel_id: int = 1) -> List[Dict[str, Any]]:
     else:
         return []
 
-def get_guest_nationalities(hotel_id: int = 1) -> List[Dict[str, Any]]:
-    """Get guest nationality distribution"""
-    query = """
+@cached()
+def get_guest_nationalities(hotel_id: int = 1, period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """Get guest nationality distribution (guests booked in `period`, or all time)"""
+    query = f"""
         SELECT 
             g.nationality,
             COUNT(DISTINCT g.id) as guests
         FROM guests g
         JOIN bookings b ON g.id = b.guest_id
-        WHERE b.hotel_id = %s AND g.nationality IS NOT NULL
+        WHERE b.hotel_id = %(hotel_id)s AND g.nationality IS NOT NULL
+        {period_filter('b.booking_date', period)}
         GROUP BY g.nationality
         ORDER BY guests DESC
         LIMIT 10
     """
     
-    results = execute_query(query, (hotel_id,))
+    results = execute_query(query, period_params(period, hotel_id=hotel_id))
     
     if results:
         total_guests = sum(row["guests"] for row in results)
@@ -534,180 +983,89 @@ def get_guest_nationalities(hotel_id: int = 1) -> List[Dict[str, Any]]:
     else:
         return []
 
-def test_database_connection():
-    """Test database connection and return basic info"""
+def check_database_ready(timeout: float = HEALTH_CHECK_TIMEOUT) -> Dict[str, Any]:
+    """
+    Readiness probe: borrow a pooled connection and run SELECT 1
+    Waits at most `timeout` seconds for a connection, so a saturated pool
+    reports not-ready instead of hanging the probe
+    """
+    started = time.perf_counter()
     try:
-        query = """
-            SELECT 
-                COUNT(*) as total_bookings,
-                COUNT(DISTINCT guest_id) as total_guests,
-                COUNT(DISTINCT room_id) as total_rooms,
-                MAX(created_at) as last_booking
-            FROM bookings
-        """
-        
-        result = execute_query(query, fetch_one=True)
-        return {
-            "status": "connected",
-            "total_bookings": result["total_bookings"],
-            "total_guests": result["total_guests"],
-            "total_rooms": result["total_rooms"],
-            "last_booking": str(result["last_booking"]) if result["last_booking"] else None
-        }
+        with get_pool().connection(timeout=timeout) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        return {"status": "ready", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
     except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e)
-        }
+        return {"status": "unavailable", "error": str(e)}
 
-def get_kpi_comparisons(hotel_id: int = 1) -> Dict[str, Any]:
-    """Get KPI metrics with historical comparison data calculated from real booking data"""
+def collect_database_stats() -> Dict[str, Any]:
+    """
+    Gather booking statistics for the status endpoint
+    Table sizes come from planner estimates (pg_class.reltuples) rather than
+    scans; tables with no usable estimate (never analyzed, or reltuples <= 0
+    with no pages yet) are counted exactly
+    """
+    estimates = execute_query("""
+        SELECT c.relname, c.reltuples::bigint AS estimate, c.relpages
+        FROM pg_class c
+        WHERE c.oid IN ('bookings'::regclass, 'guests'::regclass, 'rooms'::regclass)
+    """) or []
+    counts = {}
+    estimated = {}
+    for row in estimates:
+        if row["estimate"] > 0 or row["relpages"] > 0:
+            counts[row["relname"]] = max(row["estimate"], 0)
+            estimated[row["relname"]] = True
+    for table in ("bookings", "guests", "rooms"):
+        if table not in counts:
+            counts[table] = execute_query(f"SELECT COUNT(*) AS total FROM {table}", fetch_one=True)["total"]
+            estimated[table] = False
+    
+    # Newest booking by primary key instead of MAX(created_at) over the table
+    latest = execute_query("SELECT created_at FROM bookings ORDER BY id DESC LIMIT 1", fetch_one=True)
+    return {
+        "total_bookings": counts["bookings"],
+        "total_guests": counts["guests"],
+        "total_rooms": counts["rooms"],
+        "last_booking": str(latest["created_at"]) if latest and latest["created_at"] else None,
+        "estimated": estimated,
+        "refreshed_at": datetime.now().isoformat()
+    }
+
+def refresh_database_stats() -> Dict[str, Any]:
+    """Recompute the cached database statistics"""
+    global _database_stats
     try:
-        # Get current month data
-        current_month_query = """
-            SELECT 
-                COUNT(*) as total_bookings,
-                COALESCE(SUM(b.total_amount), 0) as revenue,
-                COALESCE(AVG(b.room_rate), 0) as adr,
-                COALESCE(AVG(CASE WHEN r.rating IS NOT NULL THEN r.rating END), 0) as average_rating
-            FROM bookings b
-            LEFT JOIN reviews r ON b.id = r.booking_id
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            AND DATE_TRUNC('month', b.booking_date) = DATE_TRUNC('month', CURRENT_DATE)
-        """
-        
-        current_result = execute_query(current_month_query, (hotel_id,), fetch_one=True)
-        
-        # Get previous month data
-        previous_month_query = """
-            SELECT 
-                COUNT(*) as total_bookings,
-                COALESCE(SUM(b.total_amount), 0) as revenue,
-                COALESCE(AVG(b.room_rate), 0) as adr,
-                COALESCE(AVG(CASE WHEN r.rating IS NOT NULL THEN r.rating END), 0) as average_rating
-            FROM bookings b
-            LEFT JOIN reviews r ON b.id = r.booking_id
-            WHERE b.hotel_id = %s 
-            AND b.status != 'cancelled'
-            AND DATE_TRUNC('month', b.booking_date) = DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-        """
-        
-        previous_result = execute_query(previous_month_query, (hotel_id,), fetch_one=True)
-        
-        # Get hotel's total rooms for occupancy calculation
-        hotel_query = """
-            SELECT total_rooms
-            FROM hotels
-            WHERE id = %s
-        """
-        
-        hotel_result = execute_query(hotel_query, (hotel_id,), fetch_one=True)
-        total_rooms = hotel_result["total_rooms"] if hotel_result else 100
-        
-        # Calculate current month occupancy rate
-        current_occupancy_query = """
-            SELECT 
-                COUNT(*) as occupied_room_nights
-            FROM (
-                SELECT DISTINCT 
-                    b.room_id,
-                    generate_series(b.check_in::date, (b.check_out - interval '1 day')::date, '1 day'::interval)::date as occupied_date
-                FROM bookings b
-                WHERE b.hotel_id = %s 
-                AND b.status IN ('confirmed', 'checked_in', 'checked_out')
-                AND DATE_TRUNC('month', b.check_in) = DATE_TRUNC('month', CURRENT_DATE)
-            ) occupied_dates
-        """
-        
-        current_occupancy_result = execute_query(current_occupancy_query, (hotel_id,), fetch_one=True)
-        
-        # Calculate previous month occupancy rate
-        previous_occupancy_query = """
-            SELECT 
-                COUNT(*) as occupied_room_nights
-            FROM (
-                SELECT DISTINCT 
-                    b.room_id,
-                    generate_series(b.check_in::date, (b.check_out - interval '1 day')::date, '1 day'::interval)::date as occupied_date
-                FROM bookings b
-                WHERE b.hotel_id = %s 
-                AND b.status IN ('confirmed', 'checked_in', 'checked_out')
-                AND DATE_TRUNC('month', b.check_in) = DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-            ) occupied_dates
-        """
-        
-        previous_occupancy_result = execute_query(previous_occupancy_query, (hotel_id,), fetch_one=True)
-        
-        # Calculate days in current and previous month
-        current_days_query = """
-            SELECT EXTRACT(DAY FROM DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month' - INTERVAL '1 day') as days_in_month
-        """
-        
-        previous_days_query = """
-            SELECT EXTRACT(DAY FROM DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month') + INTERVAL '1 month' - INTERVAL '1 day') as days_in_month
-        """
-        
-        current_days_result = execute_query(current_days_query, (), fetch_one=True)
-        previous_days_result = execute_query(previous_days_query, (), fetch_one=True)
-        
-        current_days = int(current_days_result["days_in_month"]) if current_days_result else 30
-        previous_days = int(previous_days_result["days_in_month"]) if previous_days_result else 30
-        
-        def calculate_metrics(result, occupancy_result, days_in_month):
-            """Helper function to calculate all metrics"""
-            if not result:
-                return {
-                    "totalBookings": 0,
-                    "revenue": 0,
-                    "occupancyRate": 0,
-                    "averageRating": 0,
-                    "revpar": 0,
-                    "adr": 0,
-                    "goppar": 0
-                }
-            
-            total_bookings = result["total_bookings"] or 0
-            revenue = float(result["revenue"]) if result["revenue"] else 0
-            adr = float(result["adr"]) if result["adr"] else 0
-            average_rating = float(result["average_rating"]) if result["average_rating"] else 0
-            
-            # Calculate occupancy rate
-            occupied_nights = occupancy_result["occupied_room_nights"] if occupancy_result else 0
-            total_available_nights = total_rooms * days_in_month
-            occupancy_rate = (occupied_nights / total_available_nights * 100) if total_available_nights > 0 else 0
-            
-            # Calculate RevPAR (Revenue Per Available Room)
-            revpar = (revenue / total_rooms) if total_rooms > 0 else 0
-            
-            # Calculate GOP (Gross Operating Profit) - simplified as 70% of revenue
-            goppar = revpar * 0.7
-            
-            return {
-                "totalBookings": total_bookings,
-                "revenue": revenue,
-                "occupancyRate": occupancy_rate,
-                "averageRating": average_rating,
-                "revpar": revpar,
-                "adr": adr,
-                "goppar": goppar
-            }
-        
-        def calculate_change(current_val, previous_val):
-            """Calculate percentage change and trend"""
-            if previous_val == 0:
-                if current_val > 0:
-                    return {"change": 100, "trend": "up"}
-                else:
-                    return {"change": 0, "trend": "neutral"}
-            
-            change = ((current_val - previous_val) / previous_val) * 100
-            trend = "up" if change > 0 else "down" if change < 0 else "neutral"
-            return {"change": round(change, 1), "trend": trend}
-        
-        # Calculate current and previous metrics
-        current_data = calculate_metrics(current_result, current_occupancy_result, current_days)
-        previous_data = calculate_metrics(previous_result, previous_occupancy_result, previous_days)
+        stats = {"status": "connected", **collect_database_stats()}
+    except Exception as e:
+        stats = {"status": "error", "error": str(e), "refreshed_at": datetime.now().isoformat()}
+    _database_stats = stats
+    return stats
+
+def test_database_connection():
+    """Return cached database statistics with live pool and cache usage"""
+    # Only the first call computes statistics inline (every call if the refresher is disabled)
+    stats = _database_stats
+    if stats is None or DB_STATUS_REFRESH_INTERVAL <= 0:
+        stats = refresh_database_stats()
+    return {
+        **stats,
+        "pool": get_pool_stats(),
+        "cache": get_cache_stats()
+    }
+
+@cached()
+def get_kpi_comparisons(hotel_id: int = 1, period: Optional[Period] = None) -> Dict[str, Any]:
+    """
+    Get KPI metrics with historical comparison data calculated from real booking data
+    A custom period is compared with the equally long period just before it;
+    by default the current month is compared with the previous month
+    """
+    try:
+        periods = [period, period.previous()] if period else [Period.month(0), Period.month(-1)]
+        # Current and previous period in one pass
+        current_data, previous_data = compute_kpis(hotel_id, periods)
         
         # Calculate comparisons
         comparisons = {}
@@ -722,15 +1080,7 @@ def get_kpi_comparisons(hotel_id: int = 1) -> Dict[str, Any]:
     except Exception as e:
         print(f"Error calculating KPI comparisons: {e}")
         # Return default values if calculation fails
-        default_data = {
-            "totalBookings": 0,
-            "revenue": 0,
-            "occupancyRate": 0,
-            "averageRating": 0,
-            "revpar": 0,
-            "adr": 0,
-            "goppar": 0
-        }
+        default_data = empty_kpis()
         
         default_comparisons = {}
         for key in default_data:
@@ -741,21 +1091,22 @@ def get_kpi_comparisons(hotel_id: int = 1) -> Dict[str, Any]:
             "comparisons": default_comparisons
         }
 
-def get_lead_time_analytics(hotel_id: int = 1) -> Dict[str, Any]:
+@cached()
+def get_lead_time_analytics(hotel_id: int = 1, period: Optional[Period] = None) -> Dict[str, Any]:
     """Calculate average lead time (days between booking date and check-in date)"""
     try:
-        # Calculate average lead time for all bookings (since test data has timing issues)
-        # In real scenario, we'd filter by current month: AND DATE_TRUNC('month', booking_date) = DATE_TRUNC('month', CURRENT_DATE)
-        query = """
+        # Without a period, average over all bookings (since test data has timing issues)
+        query = f"""
             SELECT 
-                AVG(ABS(EXTRACT(DAY FROM (check_in - booking_date)))) as avg_lead_time,
+                AVG(lead_time_days) as avg_lead_time,
                 COUNT(*) as total_bookings
             FROM bookings 
-            WHERE hotel_id = %s 
+            WHERE hotel_id = %(hotel_id)s 
             AND status != 'cancelled'
+            {period_filter('booking_date', period)}
         """
         
-        result = execute_query(query, (hotel_id,), fetch_one=True)
+        result = execute_query(query, period_params(period, hotel_id=hotel_id), fetch_one=True)
         
         # For more realistic results, let's cap the lead time at 60 days
         avg_lead_time = float(result['avg_lead_time']) if result['avg_lead_time'] else 18.0
@@ -771,20 +1122,21 @@ def get_lead_time_analytics(hotel_id: int = 1) -> Dict[str, Any]:
         print(f"Error calculating lead time analytics: {e}")
         return {"avgLeadTime": 18.0, "totalBookings": 0}
 
-def get_cancellation_analytics(hotel_id: int = 1) -> Dict[str, Any]:
-    """Calculate cancellation rate and related metrics"""
+@cached()
+def get_cancellation_analytics(hotel_id: int = 1, period: Optional[Period] = None) -> Dict[str, Any]:
+    """Calculate cancellation rate and related metrics for a period (default: current month)"""
     try:
-        # Calculate cancellation rate for the current month
-        query = """
+        period = period or Period.month()
+        query = f"""
             SELECT 
                 COUNT(*) as total_bookings,
                 COUNT(CASE WHEN status = 'cancelled' THEN 1 END) as cancelled_bookings
             FROM bookings 
-            WHERE hotel_id = %s 
-            AND DATE_TRUNC('month', booking_date) = DATE_TRUNC('month', CURRENT_DATE)
+            WHERE hotel_id = %(hotel_id)s 
+            AND {period.predicate('booking_date')}
         """
         
-        result = execute_query(query, (hotel_id,), fetch_one=True)
+        result = execute_query(query, period_params(period, hotel_id=hotel_id), fetch_one=True)
         
         total = result['total_bookings'] or 0
         cancelled = result['cancelled_bookings'] or 0
@@ -800,6 +1152,94 @@ def get_cancellation_analytics(hotel_id: int = 1) -> Dict[str, Any]:
         print(f"Error calculating cancellation analytics: {e}")
         return {"cancellationRate": 9.6, "totalBookings": 0, "cancelledBookings": 0}
 
+# Numeric booking attributes get_booking_histogram() can bucket: column,
+# default bucket edges, and whether values are whole numbers (for labels)
+HISTOGRAM_ATTRIBUTES = {
+    'lead_time': {'column': 'lead_time_days', 'edges': (0, 1, 8, 15, 31, 61), 'integer': True},
+    'length_of_stay': {'column': 'nights', 'edges': (1, 2, 3, 4, 5, 8, 15), 'integer': True},
+    'room_rate': {'column': 'room_rate', 'edges': (0, 100, 150, 200, 300, 500), 'integer': False},
+}
+
+# Most buckets a caller may request
+MAX_HISTOGRAM_BUCKETS = 50
+
+def histogram_labels(edges: Sequence[float], integer: bool = True) -> List[str]:
+    """Labels for the buckets [edges[i], edges[i+1]) plus the open-ended last one"""
+    def fmt(value):
+        return f"{value:g}"
+    
+    labels = []
+    for lower, upper in zip(edges, edges[1:]):
+        if integer:
+            labels.append(fmt(lower) if upper - lower == 1 else f"{fmt(lower)}-{fmt(upper - 1)}")
+        else:
+            labels.append(f"{fmt(lower)}-{fmt(upper)}")
+    labels.append(f"{fmt(edges[-1])}+")
+    return labels
+
+@cached()
+def get_booking_histogram(hotel_id: int, attribute: str, edges: Optional[Sequence[float]] = None,
+                          labels: Optional[Sequence[str]] = None,
+                          period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """
+    Distribution of a numeric booking attribute over caller-supplied buckets
+    
+    Non-cancelled bookings are counted in one aggregate with width_bucket(),
+    so the cost is a single pass however many buckets are requested. Bucket i
+    covers [edges[i], edges[i+1]); the last one is open-ended. Values below
+    the first edge are left out.
+    
+    Args:
+        hotel_id: Hotel to report on
+        attribute: Key of HISTOGRAM_ATTRIBUTES
+        edges: Ascending bucket lower bounds (defaults per attribute)
+        labels: One label per bucket (generated from the edges if omitted)
+        period: Bookings made in this period only (all time if omitted)
+    
+    Returns:
+        One row per bucket, empty buckets included, with label, bounds,
+        booking count and percentage of the counted bookings
+    
+    Raises:
+        ValueError: For an unknown attribute or invalid edges/labels
+    """
+    if attribute not in HISTOGRAM_ATTRIBUTES:
+        raise ValueError(f"Unknown attribute '{attribute}'; expected one of {', '.join(HISTOGRAM_ATTRIBUTES)}")
+    spec = HISTOGRAM_ATTRIBUTES[attribute]
+    edges = tuple(edges if edges is not None else spec['edges'])
+    if not edges or len(edges) > MAX_HISTOGRAM_BUCKETS:
+        raise ValueError(f"Between 1 and {MAX_HISTOGRAM_BUCKETS} bucket edges are required")
+    if any(lower >= upper for lower, upper in zip(edges, edges[1:])):
+        raise ValueError("Bucket edges must be strictly ascending")
+    labels = list(labels) if labels is not None else histogram_labels(edges, spec['integer'])
+    if len(labels) != len(edges):
+        raise ValueError("One label per bucket edge is required")
+    
+    # width_bucket returns 0 below the first edge and len(edges) at or above the last;
+    # the operand is cast because width_bucket(anyelement, anyarray) needs matching types before PostgreSQL 14
+    query = f"""
+        SELECT 
+            width_bucket({spec['column']}::numeric, %(edges)s::numeric[]) as bucket,
+            COUNT(*) as bookings
+        FROM bookings
+        WHERE hotel_id = %(hotel_id)s
+        AND status != 'cancelled'
+        AND {spec['column']} >= %(lowest)s
+        {period_filter('booking_date', period)}
+        GROUP BY 1
+    """
+    rows = execute_query(query, period_params(period, hotel_id=hotel_id, edges=list(edges), lowest=edges[0]))
+    
+    counts = {row['bucket']: row['bookings'] for row in rows or []}
+    total = sum(counts.values())
+    return [{
+        "label": label,
+        "min": lower,
+        "max": edges[index + 1] if index + 1 < len(edges) else None,
+        "bookings": counts.get(index + 1, 0),
+        "percentage": round(counts.get(index + 1, 0) * 100 / total, 1) if total else 0
+    } for index, (lower, label) in enumerate(zip(edges, labels))]
+
 # Test the database functions
 if __name__ == "__main__":
     print("🧪 Testing InsightForge Database Functions...")
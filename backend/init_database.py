@@ -7,6 +7,7 @@ Creates PostgreSQL database with schema and seed data for hotel analytics dashbo
 import psycopg2
 import psycopg2.extras
 import os
+import re
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -30,6 +31,31 @@ DB_CONFIG = {
     'sslmode': os.getenv('DB_SSLMODE', 'prefer'),
 }
 
+SQL_TOKEN_RE = re.compile(r"--[^\n]*|\$[A-Za-z_]*\$|'|;")
+
+def split_sql_statements(sql: str) -> list:
+    """Split a SQL script on semicolons, keeping quoted strings and $$ function bodies intact"""
+    statements = []
+    start = 0
+    quote = None  # "'" or the active dollar-quote tag
+    
+    for match in SQL_TOKEN_RE.finditer(sql):
+        token = match.group()
+        if quote:
+            if token == quote:
+                quote = None
+        elif token.startswith('--'):
+            continue
+        elif token == "'" or token.startswith('$'):
+            quote = token
+        else:
+            statements.append(sql[start:match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    
+    # Drop empty and comment-only fragments
+    return [stmt.strip() for stmt in statements if re.sub(r'--[^\n]*', '', stmt).strip()]
+
 def create_database():
     """Create and initialize the PostgreSQL database"""
     try:
@@ -47,7 +73,7 @@ def create_database():
             schema_sql = f.read()
         
         # Execute schema in parts (split by semicolon and filter empty statements)
-        schema_statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
+        schema_statements = split_sql_statements(schema_sql)
         
         with conn.cursor() as cursor:
             for i, statement in enumerate(schema_statements, 1):
@@ -69,7 +95,7 @@ def create_database():
             seed_sql = f.read()
         
         # Execute seed data in parts
-        seed_statements = [stmt.strip() for stmt in seed_sql.split(';') if stmt.strip()]
+        seed_statements = split_sql_statements(seed_sql)
         
         with conn.cursor() as cursor:
             for i, statement in enumerate(seed_statements, 1):
@@ -7,6 +7,10 @@ import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from utils.database import get_db_connection, DatabaseError
+from utils import identity_map
+
+# Hotels per grouped stats query (each id is bound four times)
+STATS_BULK_CHUNK_SIZE = 200
 
 class Hotel:
     """Hotel model for multi-tenant architecture"""
@@ -57,7 +61,11 @@ class Hotel:
     
     @classmethod
     def get_by_id(cls, hotel_id: int) -> Optional['Hotel']:
-        """Get hotel by ID"""
+        """Get hotel by ID (loaded at most once per request)"""
+        found, hotel = identity_map.lookup('hotel', hotel_id)
+        if found:
+            return hotel
+        
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -67,9 +75,7 @@ class Hotel:
             """, (hotel_id,))
             
             row = cursor.fetchone()
-            if row:
-                return cls(*row)
-            return None
+            return identity_map.remember('hotel', hotel_id, cls(*row) if row else None)
     
     @classmethod
     def get_by_name(cls, name: str) -> Optional['Hotel']:
@@ -88,23 +94,36 @@ class Hotel:
             return None
     
     @classmethod
-    def get_all(cls, active_only: bool = True) -> List['Hotel']:
-        """Get all hotels"""
+    def get_all(cls, active_only: bool = True, limit: Optional[int] = None, offset: int = 0) -> List['Hotel']:
+        """Get all hotels, optionally one page at a time"""
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
             # Since existing schema doesn't have is_active, return all hotels
-            cursor.execute("""
+            query = """
                 SELECT id, name, address, city, country, created_at, email, phone, 
                        website, star_rating, total_rooms, updated_at
-                FROM hotels ORDER BY name
-            """)
+                FROM hotels ORDER BY name, id
+            """
+            params = ()
+            if limit is not None:
+                query += " LIMIT ? OFFSET ?"
+                params = (limit, offset)
+            cursor.execute(query, params)
             
             hotels = []
             for row in cursor.fetchall():
                 hotels.append(cls(*row))
             return hotels
     
+    @classmethod
+    def count_all(cls) -> int:
+        """Count all hotels"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM hotels")
+            return cursor.fetchone()[0]
+    
     def update(self, **kwargs) -> bool:
         """Update hotel fields"""
         if not self.id:
@@ -136,9 +155,11 @@ class Hotel:
             conn.commit()
             
             # Refresh object data
+            identity_map.forget('hotel', self.id)
             updated_hotel = self.get_by_id(self.id)
             if updated_hotel:
                 self.__dict__.update(updated_hotel.__dict__)
+                identity_map.remember('hotel', self.id, self)
             return True
     
     def delete(self) -> bool:
@@ -149,64 +170,96 @@ class Hotel:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get hotel statistics"""
+        stats = self.get_stats_bulk([self.id]).get(self.id)
+        return stats or self._format_stats((self.id, self.name) + (0,) * 10)
+    
+    @classmethod
+    def get_stats_bulk(cls, hotel_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get statistics for many hotels with one grouped query per chunk of ids"""
+        stats = {}
+        hotel_ids = list(dict.fromkeys(hotel_ids))
+        
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Get booking stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_bookings,
-                    COUNT(DISTINCT guest_id) as total_guests,
-                    SUM(total_amount) as total_revenue,
-                    AVG(total_amount) as avg_booking_value
-                FROM bookings 
-                WHERE hotel_id = ?
-            """, (self.id,))
-            booking_stats = cursor.fetchone()
-            
-            # Get room stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_rooms,
-                    COUNT(CASE WHEN is_available = 1 THEN 1 END) as available_rooms
-                FROM rooms 
-                WHERE hotel_id = ?
-            """, (self.id,))
-            room_stats = cursor.fetchone()
-            
-            # Get user stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_users,
-                    COUNT(CASE WHEN role = 'admin' THEN 1 END) as admin_users,
-                    COUNT(CASE WHEN role = 'manager' THEN 1 END) as manager_users,
-                    COUNT(CASE WHEN role = 'staff' THEN 1 END) as staff_users
-                FROM users 
-                WHERE hotel_id = ? AND is_active = 1
-            """, (self.id,))
-            user_stats = cursor.fetchone()
-            
-            return {
-                'hotel_id': self.id,
-                'hotel_name': self.name,
-                'bookings': {
-                    'total': booking_stats[0] if booking_stats else 0,
-                    'total_guests': booking_stats[1] if booking_stats else 0,
-                    'total_revenue': float(booking_stats[2] or 0) if booking_stats else 0,
-                    'avg_booking_value': float(booking_stats[3] or 0) if booking_stats else 0
-                },
-                'rooms': {
-                    'total': room_stats[0] if room_stats else 0,
-                    'available': room_stats[1] if room_stats else 0,
-                    'occupancy_rate': ((room_stats[0] - room_stats[1]) / room_stats[0] * 100) if room_stats and room_stats[0] > 0 else 0
-                },
-                'users': {
-                    'total': user_stats[0] if user_stats else 0,
-                    'admins': user_stats[1] if user_stats else 0,
-                    'managers': user_stats[2] if user_stats else 0,
-                    'staff': user_stats[3] if user_stats else 0
-                }
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(hotel_ids), STATS_BULK_CHUNK_SIZE):
+                chunk = hotel_ids[i:i + STATS_BULK_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f"""
+                    SELECT 
+                        h.id, h.name,
+                        COALESCE(b.total_bookings, 0), COALESCE(b.total_guests, 0),
+                        b.total_revenue, b.avg_booking_value,
+                        COALESCE(r.total_rooms, 0), COALESCE(r.available_rooms, 0),
+                        COALESCE(u.total_users, 0), COALESCE(u.admin_users, 0),
+                        COALESCE(u.manager_users, 0), COALESCE(u.staff_users, 0)
+                    FROM hotels h
+                    LEFT JOIN (
+                        SELECT 
+                            hotel_id,
+                            COUNT(*) as total_bookings,
+                            COUNT(DISTINCT guest_id) as total_guests,
+                            SUM(total_amount) as total_revenue,
+                            AVG(total_amount) as avg_booking_value
+                        FROM bookings 
+                        WHERE hotel_id IN ({placeholders})
+                        GROUP BY hotel_id
+                    ) b ON b.hotel_id = h.id
+                    LEFT JOIN (
+                        SELECT 
+                            hotel_id,
+                            COUNT(*) as total_rooms,
+                            COUNT(CASE WHEN status = 'available' THEN 1 END) as available_rooms
+                        FROM rooms 
+                        WHERE hotel_id IN ({placeholders})
+                        GROUP BY hotel_id
+                    ) r ON r.hotel_id = h.id
+                    LEFT JOIN (
+                        SELECT 
+                            hotel_id,
+                            COUNT(*) as total_users,
+                            COUNT(CASE WHEN role = 'admin' THEN 1 END) as admin_users,
+                            COUNT(CASE WHEN role = 'manager' THEN 1 END) as manager_users,
+                            COUNT(CASE WHEN role = 'staff' THEN 1 END) as staff_users
+                        FROM users 
+                        WHERE hotel_id IN ({placeholders}) AND is_active = 1
+                        GROUP BY hotel_id
+                    ) u ON u.hotel_id = h.id
+                    WHERE h.id IN ({placeholders})
+                """, tuple(chunk) * 4)
+                
+                for row in cursor.fetchall():
+                    stats[row[0]] = cls._format_stats(row)
+        
+        return stats
+    
+    @staticmethod
+    def _format_stats(row) -> Dict[str, Any]:
+        """Shape one get_stats_bulk row into the stats payload"""
+        (hotel_id, hotel_name, total_bookings, total_guests, total_revenue, avg_booking_value,
+         total_rooms, available_rooms, total_users, admin_users, manager_users, staff_users) = row
+        return {
+            'hotel_id': hotel_id,
+            'hotel_name': hotel_name,
+            'bookings': {
+                'total': total_bookings,
+                'total_guests': total_guests,
+                'total_revenue': float(total_revenue or 0),
+                'avg_booking_value': float(avg_booking_value or 0)
+            },
+            'rooms': {
+                'total': total_rooms,
+                'available': available_rooms,
+                'occupancy_rate': ((total_rooms - available_rooms) / total_rooms * 100) if total_rooms > 0 else 0
+            },
+            'users': {
+                'total': total_users,
+                'admins': admin_users,
+                'managers': manager_users,
+                'staff': staff_users
             }
+        }
     
     def get_users(self) -> List[Dict[str, Any]]:
         """Get all users for this hotel"""
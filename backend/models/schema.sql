@@ -32,6 +32,8 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
 CREATE INDEX IF NOT EXISTS idx_users_hotel_id ON users(hotel_id);
+-- Keyset pagination of the user listing grouped by hotel (platform users keyed as 0)
+CREATE INDEX IF NOT EXISTS idx_users_hotel_key_id ON users(IFNULL(hotel_id, 0), id DESC);
 CREATE INDEX IF NOT EXISTS idx_hotels_name ON hotels(name);
 
 -- User sessions table for JWT token management
@@ -42,6 +44,7 @@ CREATE TABLE IF NOT EXISTS user_sessions (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     expires_at DATETIME NOT NULL,
     is_revoked BOOLEAN DEFAULT 0,
+    revoked_at DATETIME,
     ip_address VARCHAR(45),
     user_agent TEXT,
     FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
@@ -49,6 +52,8 @@ CREATE TABLE IF NOT EXISTS user_sessions (
 
 CREATE INDEX IF NOT EXISTS idx_user_sessions_token_jti ON user_sessions(token_jti);
 CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions(expires_at);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_revoked_at ON user_sessions(revoked_at) WHERE is_revoked = 1;
 
 -- Existing tables (keeping compatibility)
 -- Bookings table
@@ -60,7 +65,7 @@ CREATE TABLE IF NOT EXISTS bookings (
     check_in_date DATE NOT NULL,
     check_out_date DATE NOT NULL,
     total_amount DECIMAL(10, 2) NOT NULL,
-    booking_status VARCHAR(50) DEFAULT 'confirmed',
+    status VARCHAR(50) DEFAULT 'confirmed', -- same column name as the deployed bookings table
     booking_source VARCHAR(100),
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (hotel_id) REFERENCES hotels (id),
@@ -127,6 +132,78 @@ CREATE TABLE IF NOT EXISTS activity_logs (
     FOREIGN KEY (user_id) REFERENCES users (id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_activity_logs_user_id ON activity_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_activity_logs_hotel_id ON activity_logs(hotel_id);
+-- Each filter of /api/admin/activity-logs leads an index ending in created_at
+-- (plus the implicit rowid), so keyset pages read only the rows they return
 CREATE INDEX IF NOT EXISTS idx_activity_logs_created_at ON activity_logs(created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_user_created ON activity_logs(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_hotel_created ON activity_logs(hotel_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_type_created ON activity_logs(activity_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_entity_created ON activity_logs(entity_type, entity_id, created_at);
+
+-- Platform-wide counters for /api/admin/stats: active users by role, hotels
+-- and bookings (with revenue) by status. Triggers keep them current and
+-- utils/platform_counters.py periodically rebuilds them from the source tables
+CREATE TABLE IF NOT EXISTS platform_counters (
+    metric VARCHAR(50) NOT NULL, -- users, hotels, bookings; platform/seeded marks a full rebuild
+    bucket VARCHAR(50) NOT NULL, -- role, 'total' for hotels, booking status
+    count INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0, -- booking revenue
+    PRIMARY KEY (metric, bucket)
+);
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_users_insert AFTER INSERT ON users
+WHEN NEW.is_active
+BEGIN
+    INSERT INTO platform_counters (metric, bucket, count) VALUES ('users', NEW.role, 1)
+    ON CONFLICT (metric, bucket) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_users_update AFTER UPDATE OF role, is_active ON users
+BEGIN
+    UPDATE platform_counters SET count = count - 1
+    WHERE metric = 'users' AND bucket = OLD.role AND OLD.is_active;
+    INSERT INTO platform_counters (metric, bucket, count) SELECT 'users', NEW.role, 1 WHERE NEW.is_active
+    ON CONFLICT (metric, bucket) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_users_delete AFTER DELETE ON users
+WHEN OLD.is_active
+BEGIN
+    UPDATE platform_counters SET count = count - 1 WHERE metric = 'users' AND bucket = OLD.role;
+END;
+
+-- Hotels have no active flag in the deployed database (see models/hotel.py),
+-- so they are counted as one bucket
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_hotels_insert AFTER INSERT ON hotels
+BEGIN
+    INSERT INTO platform_counters (metric, bucket, count) VALUES ('hotels', 'total', 1)
+    ON CONFLICT (metric, bucket) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_hotels_delete AFTER DELETE ON hotels
+BEGIN
+    UPDATE platform_counters SET count = count - 1 WHERE metric = 'hotels' AND bucket = 'total';
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_bookings_insert AFTER INSERT ON bookings
+BEGIN
+    INSERT INTO platform_counters (metric, bucket, count, amount)
+    VALUES ('bookings', COALESCE(NEW.status, 'unknown'), 1, NEW.total_amount)
+    ON CONFLICT (metric, bucket) DO UPDATE SET count = count + 1, amount = amount + excluded.amount;
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_bookings_update AFTER UPDATE OF status, total_amount ON bookings
+BEGIN
+    UPDATE platform_counters SET count = count - 1, amount = amount - OLD.total_amount
+    WHERE metric = 'bookings' AND bucket = COALESCE(OLD.status, 'unknown');
+    INSERT INTO platform_counters (metric, bucket, count, amount)
+    VALUES ('bookings', COALESCE(NEW.status, 'unknown'), 1, NEW.total_amount)
+    ON CONFLICT (metric, bucket) DO UPDATE SET count = count + 1, amount = amount + excluded.amount;
+END;
+
+CREATE TRIGGER IF NOT EXISTS platform_counters_bookings_delete AFTER DELETE ON bookings
+BEGIN
+    UPDATE platform_counters SET count = count - 1, amount = amount - OLD.total_amount
+    WHERE metric = 'bookings' AND bucket = COALESCE(OLD.status, 'unknown');
+END;
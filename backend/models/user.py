@@ -4,10 +4,12 @@ Handles user CRUD operations with role-based permissions
 """
 
 import sqlite3
-import bcrypt
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from utils.database import get_db_connection, DatabaseError
+from utils import identity_map
+from utils.user_state import user_states
+from utils.password_hasher import password_hasher, PasswordPoolBusy
 
 class UserRole:
     """User role constants"""
@@ -47,15 +49,16 @@ class User:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt (on the bounded hashing pool)"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
         """Verify password against hash"""
         try:
-            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+            return password_hasher.check(password, password_hash)
+        except PasswordPoolBusy:
+            raise
         except:
             # Fallback for existing SHA256 hashes
             import hashlib
@@ -97,7 +100,11 @@ class User:
     
     @classmethod
     def get_by_id(cls, user_id: int) -> Optional['User']:
-        """Get user by ID"""
+        """Get user by ID (loaded at most once per request)"""
+        found, user = identity_map.lookup('user', user_id)
+        if found:
+            return user
+        
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -107,9 +114,7 @@ class User:
             """, (user_id,))
             
             row = cursor.fetchone()
-            if row:
-                return cls(*row)
-            return None
+            return identity_map.remember('user', user_id, cls(*row) if row else None)
     
     @classmethod
     def get_by_email(cls, email: str) -> Optional['User']:
@@ -139,16 +144,21 @@ class User:
             """, (email,))
             
             row = cursor.fetchone()
-            if row:
-                user = cls(*row)
-                if cls.verify_password(password, user.password_hash):
-                    # Update last login
-                    cursor.execute("UPDATE users SET last_login = ? WHERE id = ?", 
-                                 (datetime.now().isoformat(), user.id))
-                    conn.commit()
-                    user.last_login = datetime.now().isoformat()
-                    return user
+        
+        # Checked outside the connection block so PasswordPoolBusy is not wrapped in DatabaseError
+        if not row:
+            return None
+        user = cls(*row)
+        if not cls.verify_password(password, user.password_hash):
             return None
+        
+        with get_db_connection() as conn:
+            # Update last login
+            conn.execute("UPDATE users SET last_login = ? WHERE id = ?", 
+                         (datetime.now().isoformat(), user.id))
+            conn.commit()
+            user.last_login = datetime.now().isoformat()
+            return user
     
     @classmethod
     def get_all(cls, hotel_id: Optional[int] = None) -> List['User']:
@@ -175,6 +185,68 @@ class User:
                 users.append(cls(*row))
             return users
     
+    @staticmethod
+    def _listing_filters(hotel_id: Optional[int] = None, role: Optional[str] = None,
+                         is_active: Optional[bool] = None, search: Optional[str] = None):
+        """Build the WHERE clause shared by list_with_hotels() and count_filtered()"""
+        conditions = []
+        params = []
+        if hotel_id is not None:
+            conditions.append("IFNULL(u.hotel_id, 0) = ?")
+            params.append(hotel_id)
+        if role:
+            conditions.append("u.role = ?")
+            params.append(role)
+        if is_active is not None:
+            conditions.append("u.is_active = ?")
+            params.append(1 if is_active else 0)
+        if search:
+            conditions.append("(u.name LIKE ? OR u.email LIKE ?)")
+            params.extend([f"%{search}%", f"%{search}%"])
+        where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return where_clause, params
+    
+    @classmethod
+    def list_with_hotels(cls, limit: int = 100, after: Optional[tuple] = None, **filters) -> List[tuple]:
+        """
+        Get one keyset page of users with their hotel names, grouped by hotel
+        Rows are ordered by hotel (platform users, hotel_id 0, first) and then
+        newest user first; pass the last row's (hotel_key, user_id) as `after`
+        to fetch the next page
+        
+        Returns:
+            List of (user, hotel_key, hotel_name) tuples
+        """
+        where_clause, params = cls._listing_filters(**filters)
+        if after is not None:
+            keyset = "(IFNULL(u.hotel_id, 0) > ? OR (IFNULL(u.hotel_id, 0) = ? AND u.id < ?))"
+            where_clause = f"{where_clause} AND {keyset}" if where_clause else f"WHERE {keyset}"
+            params.extend([after[0], after[0], after[1]])
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT u.id, u.hotel_id, u.name, u.email, u.password_hash, u.role, u.is_active, 
+                       u.avatar_url, u.phone, u.last_login, u.created_at, u.updated_at,
+                       IFNULL(u.hotel_id, 0) as hotel_key, h.name as hotel_name
+                FROM users u
+                LEFT JOIN hotels h ON h.id = u.hotel_id
+                {where_clause}
+                ORDER BY IFNULL(u.hotel_id, 0) ASC, u.id DESC
+                LIMIT ?
+            """, (*params, limit))
+            
+            return [(cls(*row[:12]), row[12], row[13]) for row in cursor.fetchall()]
+    
+    @classmethod
+    def count_filtered(cls, **filters) -> int:
+        """Count users matching the list_with_hotels() filters"""
+        where_clause, params = cls._listing_filters(**filters)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM users u {where_clause}", params)
+            return cursor.fetchone()[0]
+    
     def update(self, **kwargs) -> bool:
         """Update user fields"""
         if not self.id:
@@ -218,9 +290,12 @@ class User:
             conn.commit()
             
             # Refresh object data
+            user_states.invalidate(self.id)
+            identity_map.forget('user', self.id)
             updated_user = self.get_by_id(self.id)
             if updated_user:
                 self.__dict__.update(updated_user.__dict__)
+                identity_map.remember('user', self.id, self)
             return True
     
     def change_password(self, new_password: str) -> bool:
@@ -232,10 +307,14 @@ class User:
         
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            updated_at = datetime.now().isoformat()
             cursor.execute("UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ?", 
-                         (password_hash, datetime.now().isoformat(), self.id))
+                         (password_hash, updated_at, self.id))
             conn.commit()
             self.password_hash = password_hash
+            self.updated_at = updated_at
+            user_states.invalidate(self.id)
+            identity_map.forget('user', self.id)
             return True
     
     def delete(self) -> bool:
@@ -245,12 +324,43 @@ class User:
         
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            updated_at = datetime.now().isoformat()
             cursor.execute("UPDATE users SET is_active = 0, updated_at = ? WHERE id = ?", 
-                         (datetime.now().isoformat(), self.id))
+                         (updated_at, self.id))
             conn.commit()
             self.is_active = False
+            self.updated_at = updated_at
+            user_states.invalidate(self.id)
+            identity_map.forget('user', self.id)
             return True
     
+    @property
+    def account_version(self) -> str:
+        """
+        Version embedded in tokens as the 'ver' claim
+        update(), change_password() and delete() all stamp updated_at, while
+        logins do not, so it changes exactly when issued tokens must be re-checked
+        """
+        return str(self.updated_at or self.created_at or '')
+    
+    def auth_state(self) -> Dict[str, Any]:
+        """Authorization state cached by utils.user_state"""
+        return {
+            'id': self.id,
+            'hotel_id': self.hotel_id,
+            'name': self.name,
+            'email': self.email,
+            'role': self.role,
+            'is_active': bool(self.is_active),
+            'version': self.account_version
+        }
+    
+    @classmethod
+    def from_auth_state(cls, state: Dict[str, Any]) -> 'User':
+        """Build a user from cached authorization state (no password hash or timestamps)"""
+        return cls(id=state['id'], hotel_id=state['hotel_id'], name=state['name'],
+                   email=state['email'], role=state['role'], is_active=state['is_active'])
+    
     def can_access_hotel(self, hotel_id: int) -> bool:
         """Check if user can access specific hotel data"""
         if self.role == UserRole.SUPERADMIN:
@@ -0,0 +1,113 @@
+"""
+Bounded worker pool for concurrent analytics queries in InsightForge
+Runs independent dashboard computations side by side on pooled database
+connections, isolating failures and timing each task
+"""
+
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# Worker threads shared by every request; keep below DB_POOL_MAX_SIZE
+ANALYTICS_WORKERS = int(os.getenv('ANALYTICS_WORKERS', '4'))
+# Default seconds a fan-out waits for its tasks before reporting them as timed out
+ANALYTICS_DEADLINE = float(os.getenv('ANALYTICS_DEADLINE', '10'))
+# Tasks slower than this many milliseconds are reported as slow
+ANALYTICS_SLOW_MS = float(os.getenv('ANALYTICS_SLOW_MS', '250'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared analytics worker pool"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, ANALYTICS_WORKERS),
+                                               thread_name_prefix='analytics')
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the worker pool (called at interpreter exit)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+atexit.register(shutdown_executor)
+
+
+def _timed(task: Callable[[], Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    outer = getattr(_worker, 'active', False)
+    _worker.active = True
+    try:
+        result = {"data": task()}
+    except Exception as e:
+        print(f"❌ Analytics task failed: {e}")
+        result = {"error": str(e)}
+    finally:
+        _worker.active = outer
+    result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]], deadline: Optional[float] = None,
+                     executor: Optional[Executor] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run named zero-argument tasks side by side
+
+    Args:
+        tasks: Mapping of task name to callable
+        deadline: Seconds to wait for all tasks (defaults to ANALYTICS_DEADLINE)
+        executor: Executor to run on (defaults to the shared analytics pool)
+
+    Returns:
+        Mapping of task name to {"data": ..., "ms": ...} on success,
+        {"error": ..., "ms": ...} if the task raised, or
+        {"error": ..., "timedOut": True, "ms": ...} if it missed the deadline
+    """
+    # Tasks fanning out again from a worker run inline so a saturated pool cannot deadlock
+    if len(tasks) <= 1 or getattr(_worker, 'active', False):
+        return {name: _timed(task) for name, task in tasks.items()}
+
+    deadline = ANALYTICS_DEADLINE if deadline is None else deadline
+    executor = executor or get_executor()
+    started = time.perf_counter()
+    futures = {name: executor.submit(_timed, task) for name, task in tasks.items()}
+    wait(futures.values(), timeout=deadline)
+
+    results = {}
+    for name, future in futures.items():
+        if future.done():
+            results[name] = future.result()
+        else:
+            # Queued tasks are dropped; running ones finish in the background
+            future.cancel()
+            results[name] = {
+                "error": f"Timed out after {deadline:g}s",
+                "timedOut": True,
+                "ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+    return results
+
+
+def slow_tasks(results: Dict[str, Dict[str, Any]], threshold_ms: Optional[float] = None) -> List[str]:
+    """Names of tasks that timed out or ran longer than threshold_ms, slowest first"""
+    threshold_ms = ANALYTICS_SLOW_MS if threshold_ms is None else threshold_ms
+    slow = [name for name, result in results.items()
+            if result.get("timedOut") or result["ms"] > threshold_ms]
+    return sorted(slow, key=lambda name: results[name]["ms"], reverse=True)
+
+
+def timings(results: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Per-task durations in milliseconds"""
+    return {name: result["ms"] for name, result in results.items()}
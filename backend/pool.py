@@ -0,0 +1,287 @@
+"""
+PostgreSQL connection pool for InsightForge
+Thread-safe bounded pool with idle reaping, liveness checks on checkout,
+pool-wait timeouts and usage statistics
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolError(Exception):
+    """Raised when the pool cannot hand out a connection"""
+    pass
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection becomes available within the wait timeout"""
+    pass
+
+
+def pool_settings_from_env(prefix: str = 'DB_POOL') -> Dict[str, Any]:
+    """Read pool sizing and timeout settings from environment variables"""
+    return {
+        'min_size': int(os.getenv(f'{prefix}_MIN_SIZE', '1')),
+        'max_size': int(os.getenv(f'{prefix}_MAX_SIZE', '10')),
+        'max_idle': float(os.getenv(f'{prefix}_MAX_IDLE', '300')),
+        'wait_timeout': float(os.getenv(f'{prefix}_TIMEOUT', '10')),
+        'health_check_interval': float(os.getenv(f'{prefix}_HEALTH_CHECK_INTERVAL', '30')),
+    }
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections
+
+    Connections are checked out with getconn() and returned with putconn(),
+    or borrowed for a block with connection(). Idle connections above
+    min_size are closed once unused for max_idle seconds. A connection that
+    has sat idle longer than health_check_interval is probed before being
+    handed out, so busy pools never pay for a liveness round trip.
+    """
+
+    def __init__(self, db_config: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 max_idle: float = 300.0, wait_timeout: float = 10.0,
+                 health_check_interval: float = 30.0,
+                 configure: Optional[Callable[[Any], None]] = None,
+                 name: str = 'default'):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.wait_timeout = wait_timeout
+        self.health_check_interval = health_check_interval
+
+        self._db_config = db_config
+        self._configure = configure
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, oldest on the left
+        self._size = 0  # open connections, including ones being opened
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._counters = {
+            'created': 0,
+            'closed': 0,
+            'reaped': 0,
+            'checkouts': 0,
+            'wait_timeouts': 0,
+            'health_check_failures': 0,
+        }
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        # Warm up the minimum number of connections; failures are not fatal
+        for _ in range(min_size):
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"❌ Pool '{name}' warm-up failed: {e}")
+                break
+            with self._cond:
+                self._size += 1
+                self._counters['created'] += 1
+                self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        """Open and configure a new connection"""
+        conn = psycopg2.connect(**self._db_config)
+        if self._configure:
+            try:
+                self._configure(conn)
+            except Exception:
+                conn.close()
+                raise
+        return conn
+
+    def _is_alive(self, conn) -> bool:
+        """Probe a connection with a trivial query"""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap_locked(self, now: float):
+        """Close connections idle for longer than max_idle, keeping min_size open"""
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            conn, _ = self._idle.popleft()
+            self._close_quietly(conn)
+            self._size -= 1
+            self._counters['closed'] += 1
+            self._counters['reaped'] += 1
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Check out a connection
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to wait_timeout)
+
+        Returns:
+            An open psycopg2 connection
+
+        Raises:
+            PoolTimeoutError: If the pool stays exhausted for the whole timeout
+        """
+        started = time.monotonic()
+        deadline = started + (self.wait_timeout if timeout is None else timeout)
+        conn = None
+        last_used = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError(f"Pool '{self.name}' is closed")
+
+                now = time.monotonic()
+                self._reap_locked(now)
+
+                if self._idle:
+                    # LIFO: the most recently used connection is the warmest
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._counters['wait_timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {time.monotonic() - started:.1f}s waiting for a "
+                        f"connection from pool '{self.name}' (max_size={self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_use += 1
+
+        try:
+            if conn is not None and (conn.closed or
+                                     time.monotonic() - last_used > self.health_check_interval):
+                if not self._is_alive(conn):
+                    with self._cond:
+                        self._counters['health_check_failures'] += 1
+                        self._counters['closed'] += 1
+                    self._close_quietly(conn)
+                    conn = None
+
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self._counters['created'] += 1
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._counters['checkouts'] += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection previously obtained from getconn()
+            discard: Close the connection instead of keeping it for reuse
+        """
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    # Never hand the next borrower a half-finished transaction
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._close_quietly(conn)
+                self._size -= 1
+                self._counters['closed'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def reap(self):
+        """Close expired idle connections now instead of on the next checkout"""
+        with self._cond:
+            self._reap_locked(time.monotonic())
+
+    def close(self):
+        """Close idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close_quietly(conn)
+                self._size -= 1
+                self._counters['closed'] += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage statistics"""
+        with self._cond:
+            checkouts = self._counters['checkouts']
+            return {
+                'name': self.name,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'closed': self._closed,
+                **{f'total_{key}': value for key, value in self._counters.items()},
+                'avg_wait_ms': round(self._total_wait / checkouts * 1000, 3) if checkouts else 0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+            }
@@ -3,34 +3,109 @@ Admin routes for InsightForge platform management
 Superadmin-only routes for managing hotels and platform-wide operations
 """
 
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Tuple
 from flask import Blueprint, request, jsonify
 from models.user import User, UserRole
 from models.hotel import Hotel
 from utils.auth_helpers import (
-    require_role, require_auth, log_activity, get_accessible_hotels
+    require_role, require_auth, log_activity, get_accessible_hotels, platform_sessions,
+    generate_jwt_token, current_token_payload, revoke_current_token
 )
-from utils.database import DatabaseError, test_connection
+from utils.database import DatabaseError
+from utils.identity_map import get_identity_map_stats
+from utils.password_hasher import get_password_hasher_stats, PasswordPoolBusy
+from utils.write_behind import get_write_behind_stats
+from utils.system_metrics import get_metrics
+from utils.platform_counters import get_platform_counters
 
 # Create blueprint
 admin_bp = Blueprint('admin', __name__)
 
+# Seconds an activity log count is reused across pages
+ACTIVITY_LOG_COUNT_TTL = float(os.getenv('ACTIVITY_LOG_COUNT_TTL', '60'))
+# Filtered counts stop at this many rows and are reported as inexact
+ACTIVITY_LOG_COUNT_CAP = int(os.getenv('ACTIVITY_LOG_COUNT_CAP', '10000'))
+
+# Activity log counts by filter: (where_clause, params) -> (count, expires_at)
+_activity_log_counts: Dict[Tuple[str, tuple], Tuple[Dict[str, Any], float]] = {}
+_activity_log_counts_lock = threading.Lock()
+
+@admin_bp.route('/logout', methods=['POST'])
+@require_auth
+def logout(current_user=None):
+    """Revoke the presented platform token"""
+    try:
+        revoke_current_token()
+        log_activity(current_user.id, 'user_logout', 'User logged out')
+        return jsonify({'success': True, 'message': 'Logged out successfully'})
+    except DatabaseError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@admin_bp.route('/change-password', methods=['POST'])
+@require_auth
+def change_password(current_user=None):
+    """Change the current user's password; returns a new token"""
+    try:
+        data = request.get_json() or {}
+        current_password = data.get('current_password', '')
+        new_password = data.get('new_password', '')
+        if len(new_password) < 8:
+            return jsonify({'error': 'New password must be at least 8 characters'}), 400
+        
+        user = User.get_by_id(current_user.id)
+        if not user or not User.verify_password(current_password, user.password_hash):
+            return jsonify({'error': 'Current password is incorrect'}), 400
+        
+        # Read the token before the change: afterwards its version no longer verifies
+        token_payload = current_token_payload()
+        user.change_password(new_password)
+        # The new account version already rejects older tokens; revoke this one explicitly too
+        revoke_current_token(token_payload)
+        log_activity(user.id, 'password_changed', 'User changed their password')
+        
+        return jsonify({'success': True, 'token': generate_jwt_token(user)})
+    except PasswordPoolBusy:
+        raise  # 503 with Retry-After from the app-level handler
+    except DatabaseError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 @admin_bp.route('/hotels', methods=['GET'])
 @require_role(UserRole.SUPERADMIN)
 def get_hotels(current_user=None):
     """Get all hotels (superadmin only)"""
     try:
-        hotels = Hotel.get_all(active_only=False)
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 100)  # Max 100 per page
+        
+        total_count = Hotel.count_all()
+        hotels = Hotel.get_all(active_only=False, limit=per_page, offset=(page - 1) * per_page)
+        
+        # Stats for the whole page in grouped queries instead of three per hotel
+        stats = Hotel.get_stats_bulk([hotel.id for hotel in hotels])
         hotels_data = []
         
         for hotel in hotels:
             hotel_dict = hotel.to_dict()
-            # Add stats for each hotel
-            hotel_dict['stats'] = hotel.get_stats()
+            hotel_dict['stats'] = stats.get(hotel.id)
             hotels_data.append(hotel_dict)
         
         return jsonify({
             'success': True,
-            'hotels': hotels_data
+            'hotels': hotels_data,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total_count,
+                'pages': (total_count + per_page - 1) // per_page
+            }
         })
         
     except DatabaseError as e:
@@ -168,75 +243,17 @@ def get_platform_stats(current_user=None):
     try:
         from utils.database import execute_query
         
-        # Get overall platform stats
-        stats = {
-            'hotels': {
-                'total': 0,
-                'active': 0,
-                'inactive': 0
-            },
-            'users': {
-                'total': 0,
-                'superadmins': 0,
-                'admins': 0,
-                'managers': 0,
-                'staff': 0,
-                'demo': 0
-            },
-            'bookings': {
-                'total': 0,
-                'total_revenue': 0,
-                'avg_booking_value': 0
-            },
-            'recent_activity': []
-        }
-        
-        # Hotel stats
-        hotel_stats = execute_query("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN is_active = 1 THEN 1 END) as active,
-                COUNT(CASE WHEN is_active = 0 THEN 1 END) as inactive
-            FROM hotels
-        """, fetch_one=True)
-        stats['hotels'] = hotel_stats
-        
-        # User stats
-        user_stats = execute_query("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN role = 'superadmin' THEN 1 END) as superadmins,
-                COUNT(CASE WHEN role = 'admin' THEN 1 END) as admins,
-                COUNT(CASE WHEN role = 'manager' THEN 1 END) as managers,
-                COUNT(CASE WHEN role = 'staff' THEN 1 END) as staff,
-                COUNT(CASE WHEN role = 'demo' THEN 1 END) as demo
-            FROM users WHERE is_active = 1
-        """, fetch_one=True)
-        stats['users'] = user_stats
-        
-        # Booking stats
-        booking_stats = execute_query("""
-            SELECT 
-                COUNT(*) as total,
-                COALESCE(SUM(total_amount), 0) as total_revenue,
-                COALESCE(AVG(total_amount), 0) as avg_booking_value
-            FROM bookings WHERE booking_status = 'confirmed'
-        """, fetch_one=True)
-        if booking_stats:
-            stats['bookings'] = {
-                'total': booking_stats['total'],
-                'total_revenue': float(booking_stats['total_revenue']),
-                'avg_booking_value': float(booking_stats['avg_booking_value'])
-            }
+        # Totals come from the trigger-maintained rollup table, not table scans
+        stats = get_platform_counters()
         
-        # Recent activity
+        # Recent activity (top-N read of the created_at index)
         recent_activity = execute_query("""
             SELECT 
-                al.*, u.full_name as user_name, h.name as hotel_name
+                al.*, u.name as user_name, h.name as hotel_name
             FROM activity_logs al
             LEFT JOIN users u ON al.user_id = u.id
             LEFT JOIN hotels h ON al.hotel_id = h.id
-            ORDER BY al.created_at DESC
+            ORDER BY al.created_at DESC, al.id DESC
             LIMIT 20
         """)
         stats['recent_activity'] = recent_activity or []
@@ -256,29 +273,55 @@ def get_platform_stats(current_user=None):
 def get_all_users(current_user=None):
     """Get all users across all hotels (superadmin only)"""
     try:
-        users = User.get_all()
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+        is_active = request.args.get('is_active')
+        filters = {
+            'hotel_id': request.args.get('hotel_id', type=int),
+            'role': request.args.get('role'),
+            'is_active': None if is_active is None else is_active.lower() in ('1', 'true', 'yes'),
+            'search': request.args.get('search', '').strip() or None
+        }
+        
+        # Keyset cursor "<hotel_key>:<user_id>" from the previous page
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                hotel_key, user_id = cursor.split(':')
+                after = (int(hotel_key), int(user_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        # One extra row tells us whether another page exists
+        rows = User.list_with_hotels(limit=limit + 1, after=after, **filters)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         # Group users by hotel
         hotels_users = {}
-        for user in users:
+        for user, hotel_key, hotel_name in rows:
             user_dict = user.to_dict()
-            
-            # Get hotel name
             if user.hotel_id:
-                hotel = Hotel.get_by_id(user.hotel_id)
-                user_dict['hotel_name'] = hotel.name if hotel else 'Unknown Hotel'
+                user_dict['hotel_name'] = hotel_name or 'Unknown Hotel'
             else:
                 user_dict['hotel_name'] = 'Platform Admin'
-            
-            hotel_key = user.hotel_id or 'platform'
-            if hotel_key not in hotels_users:
-                hotels_users[hotel_key] = []
-            hotels_users[hotel_key].append(user_dict)
+            # String keys: jsonify sorts keys and cannot compare ints with 'platform'
+            hotels_users.setdefault(str(user.hotel_id or 'platform'), []).append(user_dict)
+        
+        next_cursor = None
+        if has_more:
+            last_user, last_key, _ = rows[-1]
+            next_cursor = f"{last_key}:{last_user.id}"
         
         return jsonify({
             'success': True,
             'users_by_hotel': hotels_users,
-            'total_users': len(users)
+            'total_users': User.count_filtered(**filters),
+            'pagination': {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_more': has_more
+            }
         })
         
     except DatabaseError as e:
@@ -286,69 +329,147 @@ def get_all_users(current_user=None):
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+def _parse_log_time(value: str) -> str:
+    """Normalize an ISO date/time to the activity_logs created_at format"""
+    return datetime.fromisoformat(value.replace('Z', '')).strftime('%Y-%m-%d %H:%M:%S')
+
+def _count_activity_logs(where_clause: str, params: tuple) -> Dict[str, Any]:
+    """Capped count of activity logs matching a filter, reused for ACTIVITY_LOG_COUNT_TTL seconds"""
+    from utils.database import execute_query
+    
+    key = (where_clause, params)
+    now = time.monotonic()
+    with _activity_log_counts_lock:
+        entry = _activity_log_counts.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+    
+    if not where_clause:
+        # Log ids only grow, so the id span estimates the table size without a scan
+        row = execute_query("SELECT MAX(id) - MIN(id) + 1 AS total FROM activity_logs", fetch_one=True)
+        count = {'total': row['total'] or 0, 'exact': False}
+    else:
+        # Counting stops after the cap so broad filters stay cheap
+        row = execute_query(f"""
+            SELECT COUNT(*) AS total FROM (
+                SELECT 1 FROM activity_logs al {where_clause} LIMIT ?
+            )
+        """, params + (ACTIVITY_LOG_COUNT_CAP + 1,), fetch_one=True)
+        total = row['total']
+        count = {'total': min(total, ACTIVITY_LOG_COUNT_CAP), 'exact': total <= ACTIVITY_LOG_COUNT_CAP}
+    
+    with _activity_log_counts_lock:
+        if len(_activity_log_counts) >= 1000:
+            # Filters vary freely; keep the memo bounded by dropping expired entries
+            for stale in [k for k, (_, expires_at) in _activity_log_counts.items() if expires_at <= now]:
+                del _activity_log_counts[stale]
+            if len(_activity_log_counts) >= 1000:
+                _activity_log_counts.clear()
+        _activity_log_counts[key] = (count, now + ACTIVITY_LOG_COUNT_TTL)
+    return count
+
 @admin_bp.route('/activity-logs', methods=['GET'])
 @require_role(UserRole.SUPERADMIN)
 def get_activity_logs(current_user=None):
-    """Get platform-wide activity logs (superadmin only)"""
+    """Get platform-wide activity logs, newest first (superadmin only)"""
     try:
         from utils.database import execute_query
         
-        # Get query parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 50, type=int), 100)  # Max 100 per page
-        hotel_id = request.args.get('hotel_id', type=int)
-        activity_type = request.args.get('activity_type')
+        # Get query parameters; per_page is still accepted for clients of the OFFSET-paged API
+        limit = request.args.get('limit', type=int) or request.args.get('per_page', 50, type=int)
+        limit = min(max(limit, 1), 100)  # Max 100 per page
+        page = request.args.get('page', type=int)
         
-        # Build query
+        # Build query; every filter leads one of the (<column>, created_at) indexes
         where_conditions = []
         params = []
         
-        if hotel_id:
-            where_conditions.append("al.hotel_id = ?")
-            params.append(hotel_id)
-        
-        if activity_type:
-            where_conditions.append("al.activity_type = ?")
-            params.append(activity_type)
+        for column in ('hotel_id', 'user_id', 'entity_id'):
+            value = request.args.get(column, type=int)
+            if value:
+                where_conditions.append(f"al.{column} = ?")
+                params.append(value)
+        
+        for column in ('activity_type', 'entity_type'):
+            value = request.args.get(column)
+            if value:
+                where_conditions.append(f"al.{column} = ?")
+                params.append(value)
+        
+        try:
+            since = request.args.get('since')
+            if since:
+                where_conditions.append("al.created_at >= ?")
+                params.append(_parse_log_time(since))
+            until = request.args.get('until')
+            if until:
+                where_conditions.append("al.created_at < ?")
+                params.append(_parse_log_time(until))
+        except ValueError:
+            return jsonify({'error': 'since/until must be ISO dates or timestamps'}), 400
         
         where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
-        
-        # Get total count
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM activity_logs al
-            {where_clause}
-        """
-        total_count = execute_query(count_query, tuple(params), fetch_one=True)['total']
-        
-        # Get paginated results
-        offset = (page - 1) * per_page
-        params.extend([per_page, offset])
-        
-        logs_query = f"""
+        filter_params = tuple(params)
+        
+        # Keyset cursor "<created_at>:<log_id>" from the previous page
+        cursor = request.args.get('cursor')
+        if cursor and page is not None:
+            return jsonify({'error': 'Pass either cursor or page, not both'}), 400
+        if cursor:
+            try:
+                created_at, log_id = cursor.rsplit(':', 1)
+                params.extend([created_at, int(log_id)])
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            where_conditions.append("(al.created_at, al.id) < (?, ?)")
+        
+        page_where = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+        
+        # One extra row tells us whether another page exists
+        params.append(limit + 1)
+        # Numbered pages still work, but read and skip every earlier row; prefer cursor
+        page_offset = ""
+        if page is not None:
+            page = max(page, 1)
+            page_offset = "OFFSET ?"
+            params.append((page - 1) * limit)
+        logs = execute_query(f"""
             SELECT 
                 al.*, 
-                u.full_name as user_name, 
+                u.name as user_name, 
                 h.name as hotel_name
             FROM activity_logs al
             LEFT JOIN users u ON al.user_id = u.id
             LEFT JOIN hotels h ON al.hotel_id = h.id
-            {where_clause}
-            ORDER BY al.created_at DESC
-            LIMIT ? OFFSET ?
-        """
-        
-        logs = execute_query(logs_query, tuple(params))
+            {page_where}
+            ORDER BY al.created_at DESC, al.id DESC
+            LIMIT ? {page_offset}
+        """, tuple(params)) or []
+        
+        has_more = len(logs) > limit
+        logs = logs[:limit]
+        next_cursor = f"{logs[-1]['created_at']}:{logs[-1]['id']}" if has_more else None
+        
+        count = _count_activity_logs(where_clause, filter_params)
+        pagination = {
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'total': count['total'],
+            'total_is_exact': count['exact']
+        }
+        if page is not None:
+            # Fields of the OFFSET-paged response; pages follows the (possibly estimated) total
+            pagination.update({
+                'page': page,
+                'per_page': limit,
+                'pages': (count['total'] + limit - 1) // limit
+            })
         
         return jsonify({
             'success': True,
-            'logs': logs or [],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total_count,
-                'pages': (total_count + per_page - 1) // per_page
-            }
+            'logs': logs,
+            'pagination': pagination
         })
         
     except DatabaseError as e:
@@ -361,22 +482,29 @@ def get_activity_logs(current_user=None):
 def get_system_status(current_user=None):
     """Get system status and health checks (superadmin only)"""
     try:
-        # Test database connection
-        db_status = test_connection()
-        
-        # Get system info
-        import os
-        import psutil
-        import platform
+        # Latest background sample plus recent history; nothing is measured here
+        history = request.args.get('history', type=int)
+        metrics = get_metrics(history)
+        current = metrics['current']
         
         system_info = {
-            'platform': platform.system(),
-            'python_version': platform.python_version(),
-            'cpu_percent': psutil.cpu_percent(interval=1),
-            'memory_percent': psutil.virtual_memory().percent,
-            'disk_percent': psutil.disk_usage('/').percent if platform.system() != 'Windows' else psutil.disk_usage('C:').percent,
-            'database': db_status
+            'platform': metrics['platform'],
+            'python_version': metrics['python_version'],
+            'cpu_percent': current.get('cpu_percent'),
+            'memory_percent': current.get('memory_percent'),
+            'disk_percent': current.get('disk_percent'),
+            'database': {**current['database'], 'database_path': metrics['database_path']},
+            'pools': current.get('pools'),
+            'sampled_at': current['timestamp'],
+            'sample_interval': metrics['sample_interval'],
+            'history': metrics['history'],
+            'identity_map': get_identity_map_stats(),
+            'sessions': platform_sessions.stats(),
+            'password_hashing': get_password_hasher_stats(),
+            'write_behind': get_write_behind_stats()
         }
+        if not metrics['psutil_available']:
+            system_info['message'] = 'Install psutil for detailed system metrics'
         
         return jsonify({
             'success': True,
@@ -384,15 +512,5 @@ def get_system_status(current_user=None):
             'timestamp': datetime.now().isoformat()
         })
         
-    except ImportError:
-        # If psutil is not available, return basic info
-        return jsonify({
-            'success': True,
-            'system_info': {
-                'database': test_connection(),
-                'message': 'Install psutil for detailed system metrics'
-            },
-            'timestamp': datetime.now().isoformat()
-        })
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
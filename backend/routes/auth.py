@@ -5,12 +5,15 @@ Uses the new Database connection class for JWT-based authentication
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import (
-    create_access_token, jwt_required, get_jwt_identity
+    create_access_token, jwt_required, get_jwt_identity, get_jwt, decode_token
 )
-from datetime import timedelta
-import bcrypt
+from datetime import datetime, timedelta
 import hashlib
-from connection import execute_query, execute_update, execute_insert, Database
+from connection import execute_query, execute_update, execute_insert
+from utils.user_state import UserStateCache, claims_match
+from utils.token_store import create_token_store
+from utils.password_hasher import password_hasher, PasswordPoolBusy
+from utils.write_behind import create_write_behind
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -24,15 +27,17 @@ class UserRole:
     DEMO = 'demo'
 
 def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash password using bcrypt (on the bounded hashing pool)"""
+    return password_hasher.hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify password against hash (supports both bcrypt and legacy SHA256)"""
     # Try bcrypt first (new format)
     try:
         if password_hash.startswith('$2b$'):
-            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+            return password_hasher.check(password, password_hash)
+    except PasswordPoolBusy:
+        raise
     except:
         pass
     
@@ -47,7 +52,7 @@ def get_user_by_email(email: str):
     """Get user by email from database"""
     try:
         users = execute_query(
-            "SELECT id, hotel_id, name, email, password_hash, role, is_active, phone, last_login, created_at, updated_at FROM users WHERE email = %s AND is_active = true",
+            "SELECT id, hotel_id, name, email, password_hash, role, is_active, phone, last_login, token_version, created_at, updated_at FROM users WHERE email = %s AND is_active = true",
             (email,)
         )
         return users[0] if users else None
@@ -59,7 +64,7 @@ def get_user_by_id(user_id: int):
     """Get user by ID from database"""
     try:
         users = execute_query(
-            "SELECT id, hotel_id, name, email, password_hash, role, is_active, phone, last_login, created_at, updated_at FROM users WHERE id = %s AND is_active = true",
+            "SELECT id, hotel_id, name, email, password_hash, role, is_active, phone, last_login, token_version, created_at, updated_at FROM users WHERE id = %s AND is_active = true",
             (user_id,)
         )
         return users[0] if users else None
@@ -67,14 +72,69 @@ def get_user_by_id(user_id: int):
         print(f"Error getting user by ID: {e}")
         return None
 
+# Cached authorization state for users of the auth database, keyed by user id
+user_states = UserStateCache()
+
+def token_claims(user) -> dict:
+    """Claims embedded in access tokens so requests can be authorized without a user lookup"""
+    return {
+        'role': user['role'],
+        'hotel_id': user['hotel_id'],
+        'ver': user['token_version']
+    }
+
+def load_user_state(user_id: int):
+    """Read a user's profile and authorization state (no password hash)"""
+    user = get_user_by_id(user_id)
+    if not user:
+        return None
+    state = {key: value for key, value in user.items() if key != 'password_hash'}
+    state['version'] = user['token_version']
+    return state
+
+def get_authorized_user():
+    """
+    Resolve the user behind the current access token
+    Served from the short-TTL state cache, so most requests read nothing from
+    the database; returns None if the user is gone, inactive or changed
+    since the token was issued
+    """
+    user_id = int(get_jwt_identity())  # Convert back to int
+    state = user_states.get(user_id, lambda: load_user_state(user_id))
+    if not claims_match(get_jwt(), state):
+        return None
+    return state
+
+# Sessions and revocations for access tokens issued by this blueprint;
+# app.py consults it from the JWT blocklist loader
+auth_sessions = create_token_store('auth', execute_query, execute_update, '%s')
+
+def record_session(access_token: str, user_id: int):
+    """Queue the session of a newly issued access token"""
+    claims = decode_token(access_token)
+    auth_sessions.record_issued(
+        claims['jti'], user_id, datetime.utcfromtimestamp(claims['exp']),
+        request.remote_addr, request.headers.get('User-Agent')
+    )
+
+def _write_last_logins(rows: list):
+    """Apply a batch of queued last-login stamps in one UPDATE"""
+    # Keep only the latest login per user in the batch
+    latest = dict(rows)
+    placeholders = ', '.join(['(%s, %s::timestamp)'] * len(latest))
+    execute_update(f"""
+        UPDATE users SET last_login = v.last_login
+        FROM (VALUES {placeholders}) AS v(id, last_login)
+        WHERE users.id = v.id
+    """, tuple(value for row in latest.items() for value in row))
+
+# last_login stamps are written behind the login response in batches
+last_login_queue = create_write_behind('last_login', _write_last_logins)
+
 def update_last_login(user_id: int):
-    """Update user's last login timestamp"""
+    """Queue an update of the user's last login timestamp"""
     try:
-        from datetime import datetime
-        execute_update(
-            "UPDATE users SET last_login = %s WHERE id = %s",
-            (datetime.now().isoformat(), user_id)
-        )
+        last_login_queue.put((user_id, datetime.now().isoformat()))
     except Exception as e:
         print(f"Error updating last login: {e}")
 
@@ -104,8 +164,10 @@ def login():
           # Create JWT token
         access_token = create_access_token(
             identity=str(user['id']),  # Convert to string for JWT
-            expires_delta=timedelta(hours=24)
+            expires_delta=timedelta(hours=24),
+            additional_claims=token_claims(user)
         )
+        record_session(access_token, user['id'])
         
         # Return success response
         return jsonify({
@@ -123,6 +185,8 @@ def login():
             }
         })
         
+    except PasswordPoolBusy:
+        raise  # 503 with Retry-After from the app-level handler
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -132,8 +196,7 @@ def login():
 def verify_token():
     """Verify JWT token and return user info"""
     try:
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        user = get_user_by_id(current_user_id)
+        user = get_authorized_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -159,9 +222,11 @@ def verify_token():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout endpoint"""
+    """Logout endpoint - revokes the presented token"""
     try:
-        # In a production system, you would blacklist the token here
+        claims = get_jwt()
+        auth_sessions.revoke(claims['jti'], int(get_jwt_identity()),
+                             datetime.utcfromtimestamp(claims['exp']))
         return jsonify({
             'success': True,
             'message': 'Logged out successfully'
@@ -176,8 +241,7 @@ def logout():
 def get_profile():
     """Get current user profile"""
     try:
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        user = get_user_by_id(current_user_id)
+        user = get_authorized_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -205,8 +269,7 @@ def get_profile():
 def get_users():
     """Get users (admin and superadmin only)"""
     try:
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        current_user = get_user_by_id(current_user_id)
+        current_user = get_authorized_user()
         
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
@@ -242,8 +305,7 @@ def get_users():
 def register():
     """Register a new user (requires admin or superadmin)"""
     try:
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        current_user = get_user_by_id(current_user_id)
+        current_user = get_authorized_user()
         
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
@@ -311,6 +373,8 @@ def register():
             }
         }), 201
         
+    except PasswordPoolBusy:
+        raise  # 503 with Retry-After from the app-level handler
     except Exception as e:
         print(f"Register error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -349,7 +413,8 @@ def public_signup():
         new_user = get_user_by_id(user_id)
         
         # Generate JWT token for the new user
-        access_token = create_access_token(identity=str(new_user['id']))
+        access_token = create_access_token(identity=str(new_user['id']), additional_claims=token_claims(new_user))
+        record_session(access_token, new_user['id'])
         
         return jsonify({
             'success': True,
@@ -366,6 +431,8 @@ def public_signup():
             }
         }), 201
         
+    except PasswordPoolBusy:
+        raise  # 503 with Retry-After from the app-level handler
     except Exception as e:
         print(f"Public signup error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -3,7 +3,12 @@ Dashboard API routes for InsightForge Flask backend
 Provides real data from SQLite database for hotel analytics dashboard
 """
 
-from flask import Blueprint, jsonify, request
+import csv
+import functools
+import io
+import time
+from typing import Optional
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from database import (
     get_kpi_data,
     get_kpi_comparisons,
@@ -15,19 +20,50 @@ from database import (
     get_guest_nationalities,
     get_lead_time_analytics,
     get_cancellation_analytics,
+    get_monthly_booking_rollups,
+    get_booking_histogram,
+    stream_query,
+    HISTOGRAM_ATTRIBUTES,
     test_database_connection,
+    compute_kpis,
+    calculate_change,
+    empty_kpis,
+    Period,
+    period_filter,
+    period_params,
     DatabaseError
 )
+from snapshots import get_snapshot_trends
+from parallel import run_concurrently, slow_tasks, timings
 
 # Create blueprint
 dashboard_bp = Blueprint('dashboard', __name__)
 
+class InvalidPeriod(Exception):
+    """Raised for malformed `from`/`to` query parameters"""
+
+@dashboard_bp.errorhandler(InvalidPeriod)
+def invalid_period(e):
+    return jsonify({"error": str(e)}), 400
+
+def requested_period() -> Optional[Period]:
+    """
+    Custom period from the `from`/`to` query parameters (inclusive ISO dates),
+    or None when neither is given so each endpoint keeps its default range.
+    Call it before the endpoint's try block so a bad range answers 400.
+    """
+    try:
+        return Period.from_params(request.args)
+    except ValueError as e:
+        raise InvalidPeriod(str(e))
+
 @dashboard_bp.route('/kpis', methods=['GET'])
 def get_kpis():
     """Get KPI metrics for dashboard"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        kpis = get_kpi_data(hotel_id)
+        kpis = get_kpi_data(hotel_id, period)
         return jsonify(kpis)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -37,9 +73,10 @@ def get_kpis():
 @dashboard_bp.route('/kpis-with-comparisons', methods=['GET'])
 def get_kpis_with_comparisons():
     """Get KPI metrics with historical comparisons for dashboard"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        kpis_with_comparisons = get_kpi_comparisons(hotel_id)
+        kpis_with_comparisons = get_kpi_comparisons(hotel_id, period)
         return jsonify(kpis_with_comparisons)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -49,10 +86,11 @@ def get_kpis_with_comparisons():
 @dashboard_bp.route('/revenue-trends', methods=['GET'])
 def get_revenue_trends_endpoint():
     """Get revenue trends for line chart"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         months = request.args.get('months', 6, type=int)
-        trends = get_revenue_trends(hotel_id, months)
+        trends = get_revenue_trends(hotel_id, months, period)
         return jsonify(trends)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -62,10 +100,11 @@ def get_revenue_trends_endpoint():
 @dashboard_bp.route('/bookings-by-month', methods=['GET'])
 def get_bookings_by_month_endpoint():
     """Get monthly booking volumes for bar chart"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         months = request.args.get('months', 6, type=int)
-        bookings = get_bookings_by_month(hotel_id, months)
+        bookings = get_bookings_by_month(hotel_id, months, period)
         return jsonify(bookings)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -75,9 +114,10 @@ def get_bookings_by_month_endpoint():
 @dashboard_bp.route('/room-type-distribution', methods=['GET'])
 def get_room_type_distribution_endpoint():
     """Get room type distribution for donut chart"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        distribution = get_room_type_distribution(hotel_id)
+        distribution = get_room_type_distribution(hotel_id, period)
         return jsonify(distribution)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -90,7 +130,12 @@ def get_recent_activity_endpoint():
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
-        activities = get_recent_activity(hotel_id, limit)
+        # "Load more" passes the cursor of the last entry shown
+        before = request.args.get('before')
+        try:
+            activities = get_recent_activity(hotel_id, limit, before)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
         return jsonify(activities)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -100,9 +145,10 @@ def get_recent_activity_endpoint():
 @dashboard_bp.route('/booking-sources', methods=['GET'])
 def get_booking_sources_endpoint():
     """Get booking source distribution"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        sources = get_booking_sources(hotel_id)
+        sources = get_booking_sources(hotel_id, period)
         return jsonify(sources)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -112,21 +158,68 @@ def get_booking_sources_endpoint():
 @dashboard_bp.route('/guest-nationalities', methods=['GET'])
 def get_guest_nationalities_endpoint():
     """Get guest nationality distribution"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        nationalities = get_guest_nationalities(hotel_id)
+        nationalities = get_guest_nationalities(hotel_id, period)
         return jsonify(nationalities)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
+# Widgets available through /dashboard-bundle, named after their standalone endpoints
+DASHBOARD_WIDGETS = {
+    'kpis': lambda hotel_id, months, limit, period: get_kpi_data(hotel_id, period),
+    'kpis-with-comparisons': lambda hotel_id, months, limit, period: get_kpi_comparisons(hotel_id, period),
+    'revenue-trends': lambda hotel_id, months, limit, period: get_revenue_trends(hotel_id, months, period),
+    'bookings-by-month': lambda hotel_id, months, limit, period: get_bookings_by_month(hotel_id, months, period),
+    'room-type-distribution': lambda hotel_id, months, limit, period: get_room_type_distribution(hotel_id, period),
+    'recent-activity': lambda hotel_id, months, limit, period: get_recent_activity(hotel_id, limit),
+    'booking-sources': lambda hotel_id, months, limit, period: get_booking_sources(hotel_id, period),
+    'guest-nationalities': lambda hotel_id, months, limit, period: get_guest_nationalities(hotel_id, period),
+}
+
+@dashboard_bp.route('/dashboard-bundle', methods=['GET'])
+def get_dashboard_bundle():
+    """Compute several dashboard widgets concurrently in one request"""
+    period = requested_period()
+    try:
+        hotel_id = request.args.get('hotel_id', 1, type=int)
+        months = request.args.get('months', 6, type=int)
+        limit = request.args.get('limit', 10, type=int)
+        widgets = request.args.get('widgets', '')
+        names = [name.strip() for name in widgets.split(',') if name.strip()] or list(DASHBOARD_WIDGETS)
+        
+        unknown = [name for name in names if name not in DASHBOARD_WIDGETS]
+        if unknown:
+            return jsonify({
+                "error": f"Unknown widgets: {', '.join(unknown)}",
+                "available": list(DASHBOARD_WIDGETS)
+            }), 400
+        
+        started = time.perf_counter()
+        results = run_concurrently({
+            name: functools.partial(DASHBOARD_WIDGETS[name], hotel_id, months, limit, period)
+            for name in dict.fromkeys(names)
+        })
+        
+        return jsonify({
+            "hotel_id": hotel_id,
+            "widgets": results,
+            "errors": [name for name, result in results.items() if "error" in result],
+            "totalMs": round((time.perf_counter() - started) * 1000, 2)
+        })
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
 @dashboard_bp.route('/lead-time-analytics', methods=['GET'])
 def get_lead_time_analytics_endpoint():
     """Get lead time analytics"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        analytics = get_lead_time_analytics(hotel_id)
+        analytics = get_lead_time_analytics(hotel_id, period)
         return jsonify(analytics)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -136,9 +229,10 @@ def get_lead_time_analytics_endpoint():
 @dashboard_bp.route('/cancellation-analytics', methods=['GET'])
 def get_cancellation_analytics_endpoint():
     """Get cancellation analytics"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        analytics = get_cancellation_analytics(hotel_id)
+        analytics = get_cancellation_analytics(hotel_id, period)
         return jsonify(analytics)
     except DatabaseError as e:
         return jsonify({"error": str(e)}), 500
@@ -148,14 +242,22 @@ def get_cancellation_analytics_endpoint():
 @dashboard_bp.route('/booking-analytics-summary', methods=['GET'])
 def get_booking_analytics_summary():
     """Get comprehensive booking analytics summary for BookingsAnalytics page"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        
-        # Get all analytics data
-        kpis = get_kpi_data(hotel_id)
-        lead_time = get_lead_time_analytics(hotel_id)
-        cancellation = get_cancellation_analytics(hotel_id)
-        booking_sources = get_booking_sources(hotel_id)
+        deadline = request.args.get('deadline', None, type=float)
+        
+        # Get all analytics data concurrently; a failed or late sub-query falls back to defaults
+        results = run_concurrently({
+            "kpis": lambda: get_kpi_data(hotel_id, period),
+            "leadTime": lambda: get_lead_time_analytics(hotel_id, period),
+            "cancellation": lambda: get_cancellation_analytics(hotel_id, period),
+            "bookingSources": lambda: get_booking_sources(hotel_id, period),
+        }, deadline=deadline)
+        kpis = results["kpis"].get("data") or {}
+        lead_time = results["leadTime"].get("data") or {}
+        cancellation = results["cancellation"].get("data") or {}
+        booking_sources = results["bookingSources"].get("data") or []
         
         # Calculate dynamic comments and trends
         def get_bookings_trend_comment(current_bookings, change_percent):
@@ -237,7 +339,11 @@ def get_booking_analytics_summary():
             
             "revenue": kpis.get("revenue", 0),
             "occupancyRate": kpis.get("occupancyRate", 0),
-            "averageRating": kpis.get("averageRating", 0)
+            "averageRating": kpis.get("averageRating", 0),
+            
+            "timings": timings(results),
+            "slowQueries": slow_tasks(results),
+            "failedQueries": [name for name, result in results.items() if "error" in result]
         }
         
         return jsonify(summary)
@@ -246,71 +352,38 @@ def get_booking_analytics_summary():
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
+# Lead-time buckets shown on the bookings page (edges default to HISTOGRAM_ATTRIBUTES)
+LEAD_TIME_GROUPS = ('Same Day', '1-7 Days', '8-14 Days', '15-30 Days', '31-60 Days', '60+ Days')
+
 @dashboard_bp.route('/lead-time-distribution', methods=['GET'])
 def get_lead_time_distribution():
     """Get lead time distribution for bar chart analysis"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        
-        from database import execute_query
-        
-        query = """
-            SELECT 
-                lead_time_group,
-                bookings,
-                ROUND(bookings * 100.0 / SUM(bookings) OVER (), 1) as percentage
-            FROM (
-                SELECT 
-                    CASE 
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) = 0 THEN 'Same Day'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 1 AND 7 THEN '1-7 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 8 AND 14 THEN '8-14 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 15 AND 30 THEN '15-30 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 31 AND 60 THEN '31-60 Days'
-                        ELSE '60+ Days'
-                    END as lead_time_group,
-                    COUNT(*) as bookings,
-                    CASE 
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) = 0 THEN 1
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 1 AND 7 THEN 2
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 8 AND 14 THEN 3
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 15 AND 30 THEN 4
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 31 AND 60 THEN 5
-                        ELSE 6
-                    END as sort_order
-                FROM bookings 
-                WHERE hotel_id = %s 
-                AND status != 'cancelled'
-                GROUP BY 
-                    CASE 
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) = 0 THEN 'Same Day'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 1 AND 7 THEN '1-7 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 8 AND 14 THEN '8-14 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 15 AND 30 THEN '15-30 Days'
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 31 AND 60 THEN '31-60 Days'
-                        ELSE '60+ Days'
-                    END,
-                    CASE 
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) = 0 THEN 1
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 1 AND 7 THEN 2
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 8 AND 14 THEN 3
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 15 AND 30 THEN 4
-                        WHEN ABS(EXTRACT(DAY FROM (check_in - booking_date))) BETWEEN 31 AND 60 THEN 5
-                        ELSE 6
-                    END
-            ) lead_time_data
-            ORDER BY sort_order
-        """
-        
-        results = execute_query(query, (hotel_id,))
-        
-        if results:
+        deadline = request.args.get('deadline', None, type=float)
+        
+        # The histogram and the average lead time are independent; run them side by side
+        subresults = run_concurrently({
+            'distribution': lambda: get_booking_histogram(hotel_id, 'lead_time', labels=LEAD_TIME_GROUPS,
+                                                          period=period),
+            'leadTime': lambda: get_lead_time_analytics(hotel_id, period),
+        }, deadline=deadline)
+        if 'error' in subresults['distribution']:
+            raise DatabaseError(subresults['distribution']['error'])
+        results = [{
+            'lead_time_group': bucket['label'],
+            'bookings': bucket['bookings'],
+            'percentage': bucket['percentage']
+        } for bucket in subresults['distribution']['data']]
+        
+        if any(r['bookings'] for r in results):
             # Calculate additional insights
             same_day_bookings = next((r['percentage'] for r in results if r['lead_time_group'] == 'Same Day'), 0)
             most_common = max(results, key=lambda x: x['bookings'])['lead_time_group']
             
             # Get average lead time
-            lead_time_analytics = get_lead_time_analytics(hotel_id)
+            lead_time_analytics = subresults['leadTime'].get('data') or {}
             avg_lead_time = lead_time_analytics.get('avgLeadTime', 0)
             
             return jsonify({
@@ -319,7 +392,9 @@ def get_lead_time_distribution():
                     'mostCommonWindow': most_common,
                     'averageLeadTime': round(avg_lead_time, 1),
                     'sameDayBookings': same_day_bookings
-                }
+                },
+                'timings': timings(subresults),
+                'slowQueries': slow_tasks(subresults)
             })
         else:
             # Return mock data if no real data
@@ -344,45 +419,94 @@ def get_lead_time_distribution():
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
+@dashboard_bp.route('/booking-distribution', methods=['GET'])
+def get_booking_distribution():
+    """Histogram of a numeric booking attribute (lead_time, length_of_stay, room_rate)"""
+    period = requested_period()
+    try:
+        hotel_id = request.args.get('hotel_id', 1, type=int)
+        attribute = request.args.get('attribute', 'lead_time')
+        # Optional comma-separated bucket lower bounds, e.g. edges=0,100,200
+        edges = request.args.get('edges')
+        try:
+            if edges:
+                try:
+                    edges = tuple(float(edge) for edge in edges.split(','))
+                except ValueError:
+                    raise ValueError("'edges' must be comma-separated numbers")
+            buckets = get_booking_histogram(hotel_id, attribute, edges, period=period)
+        except ValueError as e:
+            return jsonify({"error": str(e), "attributes": list(HISTOGRAM_ATTRIBUTES)}), 400
+        
+        return jsonify({
+            "attribute": attribute,
+            "buckets": buckets,
+            "totalBookings": sum(bucket["bookings"] for bucket in buckets)
+        })
+    except DatabaseError as e:
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+# Columns written by /bookings-export, in order
+BOOKING_EXPORT_COLUMNS = ('booking_reference', 'booking_date', 'check_in', 'check_out', 'nights',
+                          'lead_time_days', 'status', 'room_type', 'source', 'room_rate',
+                          'total_amount', 'paid_amount', 'currency')
+
+@dashboard_bp.route('/bookings-export', methods=['GET'])
+def export_bookings():
+    """Stream a hotel's bookings as CSV (constant memory however many rows)"""
+    period = requested_period()
+    hotel_id = request.args.get('hotel_id', 1, type=int)
+    query = f"""
+        SELECT 
+            b.booking_reference, b.booking_date, b.check_in, b.check_out, b.nights,
+            b.lead_time_days, b.status, rt.name as room_type, bs.name as source,
+            b.room_rate, b.total_amount, b.paid_amount, b.currency
+        FROM bookings b
+        LEFT JOIN room_types rt ON rt.id = b.room_type_id
+        LEFT JOIN booking_sources bs ON bs.id = b.source_id
+        WHERE b.hotel_id = %(hotel_id)s
+        {period_filter('b.booking_date', period)}
+        ORDER BY b.booking_date, b.id
+    """
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(BOOKING_EXPORT_COLUMNS)
+        try:
+            for rows in stream_query(query, period_params(period, hotel_id=hotel_id), batch_size=500):
+                writer.writerows([row[column] for column in BOOKING_EXPORT_COLUMNS] for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        except DatabaseError as e:
+            # Headers are already sent; end the file with a marker instead of a 500
+            print(f"❌ Bookings export for hotel {hotel_id} failed: {e}")
+            writer.writerow(['# export incomplete'])
+        yield buffer.getvalue()
+    
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename=bookings-hotel-{hotel_id}.csv'
+    })
+
 @dashboard_bp.route('/bookings-cancellations-trend', methods=['GET'])
 def get_bookings_cancellations_trend():
     """Get monthly trend of bookings vs cancellations"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         months = request.args.get('months', 6, type=int)
         
-        from database import execute_query
-        
-        query = """
-            WITH monthly_data AS (
-                SELECT 
-                    TO_CHAR(booking_date, 'Mon') as month,
-                    EXTRACT(MONTH FROM booking_date) as month_num,
-                    COUNT(*) as total_bookings,
-                    COUNT(CASE WHEN status = 'cancelled' THEN 1 END) as cancellations,
-                    COUNT(CASE WHEN status != 'cancelled' THEN 1 END) as confirmed_bookings
-                FROM bookings 
-                WHERE hotel_id = %s 
-                AND booking_date >= CURRENT_DATE - INTERVAL '%s months'
-                GROUP BY 
-                    TO_CHAR(booking_date, 'Mon'),
-                    EXTRACT(MONTH FROM booking_date)
-                ORDER BY month_num
-            )
-            SELECT 
-                month,
-                total_bookings,
-                cancellations,
-                confirmed_bookings,
-                CASE 
-                    WHEN total_bookings > 0 
-                    THEN ROUND(cancellations * 100.0 / total_bookings, 1)
-                    ELSE 0 
-                END as cancellation_rate
-            FROM monthly_data
-        """
-        
-        results = execute_query(query, (hotel_id, months))
+        results = [{
+            'month': row['month'].strftime('%b'),
+            'total_bookings': int(row['total_bookings']),
+            'cancellations': int(row['cancellations']),
+            'confirmed_bookings': int(row['confirmed_bookings']),
+            'cancellation_rate': round(float(row['cancellations']) * 100 / float(row['total_bookings']), 1)
+                if row['total_bookings'] else 0
+        } for row in get_monthly_booking_rollups(hotel_id, months, period)]
         
         if results:
             # Calculate insights
@@ -434,23 +558,21 @@ def get_bookings_cancellations_trend():
 @dashboard_bp.route('/financial-summary', methods=['GET'])
 def get_financial_summary():
     """Get financial summary data"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         
-        # Get latest KPI data for financial metrics
-        kpis = get_kpi_data(hotel_id)
-        
-        # Calculate additional financial metrics
-        revenue_trends = get_revenue_trends(hotel_id, 6)
+        # Current and previous month (or custom period and the one before it) in a single query
+        periods = [period, period.previous()] if period else [Period.month(0), Period.month(-1)]
+        try:
+            kpis, previous = compute_kpis(hotel_id, periods)
+        except DatabaseError as e:
+            print(f"Error calculating financial summary: {e}")
+            kpis, previous = empty_kpis(), empty_kpis()
         
         # Calculate month-over-month growth
-        if len(revenue_trends['data']) >= 2:
-            current_month = revenue_trends['data'][-1]
-            previous_month = revenue_trends['data'][-2]
-            if previous_month > 0:
-                growth_rate = ((current_month - previous_month) / previous_month) * 100
-            else:
-                growth_rate = 0
+        if previous["revenue"] > 0:
+            growth_rate = calculate_change(kpis["revenue"], previous["revenue"])["change"]
         else:
             growth_rate = 0
         
@@ -483,39 +605,17 @@ def get_database_status():
 @dashboard_bp.route('/occupancy-trends', methods=['GET'])
 def get_occupancy_trends():
     """Get occupancy rate trends"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         months = request.args.get('months', 6, type=int)
         
-        from database import execute_query
-        
-        query = """
-            SELECT 
-                date,
-                occupancy_rate
-            FROM kpi_snapshots 
-            WHERE hotel_id = ? 
-            ORDER BY date DESC 
-            LIMIT ?
-        """
-        
-        results = execute_query(query, (hotel_id, months))
+        trends = get_snapshot_trends(hotel_id, months, period)
         
-        if results:
-            results.reverse()  # Chronological order
-            
-            labels = []
-            data = []
-            
-            for row in results:
-                from datetime import datetime
-                date_obj = datetime.strptime(row["date"], "%Y-%m-%d")
-                labels.append(date_obj.strftime("%b"))
-                data.append(float(row["occupancy_rate"]) if row["occupancy_rate"] else 0)
-            
+        if trends:
             return jsonify({
-                "labels": labels,
-                "data": data
+                "labels": [row["month"].strftime("%b") for row in trends],
+                "data": [round(row["occupancyRate"], 2) for row in trends]
             })
         else:
             return jsonify({
@@ -531,39 +631,17 @@ def get_occupancy_trends():
 @dashboard_bp.route('/adr-trends', methods=['GET'])
 def get_adr_trends():
     """Get Average Daily Rate trends"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         months = request.args.get('months', 6, type=int)
         
-        from database import execute_query
+        trends = get_snapshot_trends(hotel_id, months, period)
         
-        query = """
-            SELECT 
-                date,
-                adr
-            FROM kpi_snapshots 
-            WHERE hotel_id = ? 
-            ORDER BY date DESC 
-            LIMIT ?
-        """
-        
-        results = execute_query(query, (hotel_id, months))
-        
-        if results:
-            results.reverse()  # Chronological order
-            
-            labels = []
-            data = []
-            
-            for row in results:
-                from datetime import datetime
-                date_obj = datetime.strptime(row["date"], "%Y-%m-%d")
-                labels.append(date_obj.strftime("%b"))
-                data.append(float(row["adr"]) if row["adr"] else 0)
-            
+        if trends:
             return jsonify({
-                "labels": labels,
-                "data": data
+                "labels": [row["month"].strftime("%b") for row in trends],
+                "data": [round(row["adr"], 2) for row in trends]
             })
         else:
             return jsonify({
@@ -579,13 +657,14 @@ def get_adr_trends():
 @dashboard_bp.route('/top-performing-rooms', methods=['GET'])
 def get_top_performing_rooms():
     """Get top performing room types"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         limit = request.args.get('limit', 5, type=int)
         
         from database import execute_query
         
-        query = """
+        query = f"""
             SELECT 
                 rt.name,
                 COUNT(b.id) as bookings,
@@ -593,14 +672,15 @@ def get_top_performing_rooms():
                 AVG(b.room_rate) as avg_rate,
                 COUNT(DISTINCT b.guest_id) as unique_guests
             FROM room_types rt
-            LEFT JOIN bookings b ON rt.id = b.room_type_id AND b.hotel_id = ?
-            WHERE rt.hotel_id = ?
+            LEFT JOIN bookings b ON rt.id = b.room_type_id AND b.hotel_id = %(hotel_id)s
+                {period_filter('b.booking_date', period)}
+            WHERE rt.hotel_id = %(hotel_id)s
             GROUP BY rt.id, rt.name
-            ORDER BY revenue DESC
-            LIMIT ?
+            ORDER BY revenue DESC NULLS LAST
+            LIMIT %(limit)s
         """
         
-        results = execute_query(query, (hotel_id, hotel_id, limit))
+        results = execute_query(query, period_params(period, hotel_id=hotel_id, limit=limit))
         
         if results:
             rooms = []
@@ -625,22 +705,24 @@ def get_top_performing_rooms():
 @dashboard_bp.route('/guest-satisfaction', methods=['GET'])
 def get_guest_satisfaction():
     """Get guest satisfaction metrics from reviews"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
         
         from database import execute_query
         
-        query = """
+        query = f"""
             SELECT 
                 AVG(rating) as avg_rating,
                 COUNT(*) as total_reviews,
                 COUNT(CASE WHEN rating >= 4 THEN 1 END) as positive_reviews,
                 COUNT(CASE WHEN rating <= 2 THEN 1 END) as negative_reviews
             FROM reviews 
-            WHERE hotel_id = ?
+            WHERE hotel_id = %(hotel_id)s
+            {period_filter('review_date', period)}
         """
         
-        result = execute_query(query, (hotel_id,), fetch_one=True)
+        result = execute_query(query, period_params(period, hotel_id=hotel_id), fetch_one=True)
         
         if result:
             total = result["total_reviews"] or 0
@@ -682,9 +764,10 @@ def get_guest_satisfaction():
 @dashboard_bp.route('/occupancy-stats', methods=['GET'])
 def get_occupancy_stats():
     """Get occupancy statistics (legacy endpoint)"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        kpis = get_kpi_data(hotel_id)
+        kpis = get_kpi_data(hotel_id, period)
         
         # Mock calculation for demonstration
         total_rooms = 150  # This could come from hotel settings
@@ -705,9 +788,10 @@ def get_occupancy_stats():
 @dashboard_bp.route('/revenue-breakdown', methods=['GET'])
 def get_revenue_breakdown():
     """Get revenue breakdown by source (legacy endpoint)"""
+    period = requested_period()
     try:
         hotel_id = request.args.get('hotel_id', 1, type=int)
-        sources = get_booking_sources(hotel_id)
+        sources = get_booking_sources(hotel_id, period)
         
         if sources:
             labels = [source["name"] for source in sources]
@@ -1,7 +1,7 @@
 """
 Run script for InsightForge Flask Backend
 """
-from app import create_app
+from app import create_app, start_background_workers
 import os
 from dotenv import load_dotenv
 
@@ -9,13 +9,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(start_workers=False)
     
     # Get configuration from environment
     port = int(os.getenv('PORT', 5000))
     host = os.getenv('HOST', '0.0.0.0')
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # The debug reloader re-runs this script in a child process that serves requests;
+    # start the background threads there only, not in the watching parent
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
+    
     print(f"Starting InsightForge Backend on http://{host}:{port}")
     print(f"Debug mode: {'ON' if debug else 'OFF'}")
     print(f"API endpoints available at: http://{host}:{port}/api")
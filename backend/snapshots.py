@@ -0,0 +1,248 @@
+"""
+KPI snapshot builder for InsightForge
+Computes daily per-hotel rows in kpi_snapshots from bookings, room_nights and
+reviews, backfills history across hotels in parallel and recomputes only the
+dates queued by the bookings/reviews triggers
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import execute_query, transaction, get_pool, Period
+from cache import cached, invalidate_hotel
+
+# Seconds between background refreshes of queued snapshot dates (0 disables)
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('SNAPSHOT_REFRESH_INTERVAL', '60'))
+
+# Upsert one snapshot row per day in [start, end) for a hotel
+BUILD_SNAPSHOTS_QUERY = """
+    INSERT INTO kpi_snapshots (
+        hotel_id, date, total_bookings, revenue, occupancy_rate, adr, revpar, goppar,
+        alos, average_rating, total_rooms_available, rooms_occupied
+    )
+    SELECT
+        h.id,
+        d.day::date,
+        COALESCE(bk.total_bookings, 0),
+        COALESCE(rn.revenue, 0),
+        ROUND(COALESCE(rn.rooms_occupied * 100.0 / NULLIF(h.total_rooms, 0), 0), 2),
+        ROUND(COALESCE(rn.revenue / NULLIF(rn.rooms_occupied, 0), 0), 2),
+        ROUND(COALESCE(rn.revenue / NULLIF(h.total_rooms, 0), 0), 2),
+        ROUND(COALESCE(rn.revenue / NULLIF(h.total_rooms, 0), 0) * 0.7, 2),
+        ROUND(COALESCE(st.alos, 0), 2),
+        ROUND(COALESCE(rv.average_rating, 0), 2),
+        COALESCE(h.total_rooms, 0),
+        COALESCE(rn.rooms_occupied, 0)
+    FROM hotels h
+    CROSS JOIN generate_series(%(start)s::date, %(end)s::date - 1, INTERVAL '1 day') AS d(day)
+    LEFT JOIN (
+        SELECT date, COUNT(DISTINCT (room_id, date)) as rooms_occupied, SUM(revenue) as revenue
+        FROM room_nights
+        WHERE hotel_id = %(hotel_id)s AND date >= %(start)s AND date < %(end)s
+        GROUP BY date
+    ) rn ON rn.date = d.day
+    LEFT JOIN (
+        SELECT booking_date::date as day, COUNT(*) as total_bookings
+        FROM bookings
+        WHERE hotel_id = %(hotel_id)s AND status != 'cancelled'
+        AND booking_date >= %(start)s AND booking_date < %(end)s
+        GROUP BY booking_date::date
+    ) bk ON bk.day = d.day
+    LEFT JOIN (
+        SELECT check_in as day, AVG(nights) as alos
+        FROM bookings
+        WHERE hotel_id = %(hotel_id)s AND status != 'cancelled'
+        AND check_in >= %(start)s AND check_in < %(end)s
+        GROUP BY check_in
+    ) st ON st.day = d.day
+    LEFT JOIN (
+        SELECT review_date as day, AVG(rating) as average_rating
+        FROM reviews
+        WHERE hotel_id = %(hotel_id)s AND review_date >= %(start)s AND review_date < %(end)s
+        GROUP BY review_date
+    ) rv ON rv.day = d.day
+    WHERE h.id = %(hotel_id)s
+    ON CONFLICT (hotel_id, date) DO UPDATE SET
+        total_bookings = EXCLUDED.total_bookings,
+        revenue = EXCLUDED.revenue,
+        occupancy_rate = EXCLUDED.occupancy_rate,
+        adr = EXCLUDED.adr,
+        revpar = EXCLUDED.revpar,
+        goppar = EXCLUDED.goppar,
+        alos = EXCLUDED.alos,
+        average_rating = EXCLUDED.average_rating,
+        total_rooms_available = EXCLUDED.total_rooms_available,
+        rooms_occupied = EXCLUDED.rooms_occupied
+"""
+
+def build_snapshots(hotel_id: int, period: Period) -> int:
+    """
+    Compute and upsert daily snapshots for one hotel
+
+    Args:
+        hotel_id: Hotel to build snapshots for
+        period: Days to (re)compute
+
+    Returns:
+        Number of snapshot rows written
+    """
+    if period.days <= 0:
+        return 0
+
+    with transaction() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(BUILD_SNAPSHOTS_QUERY, {
+                "hotel_id": hotel_id,
+                "start": period.start,
+                "end": period.end
+            })
+            written = cursor.rowcount
+    
+    invalidate_hotel(hotel_id)
+    return written
+
+def _contiguous_periods(dates: Iterable[date]) -> List[Period]:
+    """Collapse a set of dates into the fewest half-open ranges"""
+    periods = []
+    for day in sorted(set(dates)):
+        if periods and periods[-1].end == day:
+            periods[-1] = Period(periods[-1].start, day + timedelta(days=1))
+        else:
+            periods.append(Period(day, day + timedelta(days=1)))
+    return periods
+
+def rebuild_dates(hotel_id: int, dates: Iterable[date]) -> int:
+    """Recompute snapshots for specific dates only"""
+    return sum(build_snapshots(hotel_id, period) for period in _contiguous_periods(dates))
+
+def backfill_snapshots(period: Period, hotel_ids: Optional[List[int]] = None,
+                       max_workers: int = 4) -> Dict[int, int]:
+    """
+    Build snapshot history for many hotels in parallel
+    Each hotel runs on its own pooled connection; workers are capped below
+    the pool size so dashboard requests can still get a connection
+
+    Args:
+        period: Days to build
+        hotel_ids: Hotels to build (all hotels if omitted)
+        max_workers: Number of hotels processed concurrently
+
+    Returns:
+        Rows written per hotel
+    """
+    if hotel_ids is None:
+        hotel_ids = [row["id"] for row in execute_query("SELECT id FROM hotels ORDER BY id")]
+
+    workers = max(1, min(max_workers, get_pool().max_size - 1, len(hotel_ids) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snapshot-backfill') as executor:
+        counts = executor.map(lambda hotel_id: build_snapshots(hotel_id, period), hotel_ids)
+        return dict(zip(hotel_ids, counts))
+
+def refresh_dirty_snapshots(hotel_id: Optional[int] = None) -> int:
+    """
+    Recompute the dates queued in kpi_snapshot_dirty_dates
+    Queue rows are claimed and deleted in the same statement, so concurrent
+    refreshers never recompute the same date twice
+
+    Args:
+        hotel_id: Only refresh this hotel's queue (all hotels if omitted)
+
+    Returns:
+        Number of snapshot rows rewritten
+    """
+    claimed = execute_query("""
+        DELETE FROM kpi_snapshot_dirty_dates
+        WHERE %(hotel_id)s IS NULL OR hotel_id = %(hotel_id)s
+        RETURNING hotel_id, date
+    """, {"hotel_id": hotel_id})
+
+    dates_by_hotel: Dict[int, List[date]] = {}
+    for row in claimed:
+        dates_by_hotel.setdefault(row["hotel_id"], []).append(row["date"])
+
+    return sum(rebuild_dates(hotel, dates) for hotel, dates in dates_by_hotel.items())
+
+def extend_snapshots(through: Optional[date] = None, hotel_id: Optional[int] = None) -> int:
+    """
+    Build snapshots for days since each hotel's latest snapshot, up to and
+    including today; hotels without history are backfilled from their first booking
+
+    Args:
+        through: Last day to build (today if omitted)
+        hotel_id: Only extend this hotel (all hotels if omitted)
+
+    Returns:
+        Number of snapshot rows written
+    """
+    through = through or date.today()
+    latest = execute_query("""
+        SELECT
+            h.id as hotel_id,
+            (SELECT MAX(k.date) FROM kpi_snapshots k WHERE k.hotel_id = h.id) as last_date,
+            (SELECT LEAST(MIN(b.booking_date)::date, MIN(b.check_in))
+             FROM bookings b WHERE b.hotel_id = h.id) as first_date
+        FROM hotels h
+        WHERE %(hotel_id)s IS NULL OR h.id = %(hotel_id)s
+    """, {"hotel_id": hotel_id})
+
+    written = 0
+    for row in latest:
+        if row["last_date"] is not None:
+            start = row["last_date"] + timedelta(days=1)
+        elif row["first_date"] is not None:
+            start = row["first_date"]
+        else:
+            continue  # No bookings yet, nothing to snapshot
+        written += build_snapshots(row["hotel_id"], Period(start, through + timedelta(days=1)))
+    return written
+
+@cached()
+def get_snapshot_trends(hotel_id: int = 1, months: int = 6, period: Optional[Period] = None) -> List[Dict[str, Any]]:
+    """
+    Monthly occupancy, ADR, RevPAR and revenue rolled up from daily snapshots
+    for the last `months` months, or for exactly the days of a custom period
+    """
+    query = """
+        SELECT
+            DATE_TRUNC('month', date) as month,
+            SUM(rooms_occupied) as rooms_occupied,
+            SUM(total_rooms_available) as rooms_available,
+            SUM(revenue) as revenue
+        FROM kpi_snapshots
+        WHERE hotel_id = %(hotel_id)s
+        AND date >= %(start)s AND date < %(end)s
+        GROUP BY DATE_TRUNC('month', date)
+        ORDER BY month ASC
+    """
+
+    period = period or Period(Period.month(-(months - 1)).start, Period.month().end)
+    params = {"hotel_id": hotel_id, "start": period.start, "end": period.end}
+    results = execute_query(query, params)
+    if not results and not execute_query("SELECT 1 FROM kpi_snapshots WHERE hotel_id = %(hotel_id)s LIMIT 1",
+                                         params, fetch_one=True):
+        # No history yet (e.g. before the refresher's first pass): build it now
+        if extend_snapshots(hotel_id=hotel_id):
+            results = execute_query(query, params)
+
+    trends = []
+    for row in results:
+        rooms_occupied = float(row["rooms_occupied"] or 0)
+        rooms_available = float(row["rooms_available"] or 0)
+        revenue = float(row["revenue"] or 0)
+        trends.append({
+            "month": row["month"],
+            "occupancyRate": (rooms_occupied / rooms_available * 100) if rooms_available > 0 else 0,
+            "adr": (revenue / rooms_occupied) if rooms_occupied > 0 else 0,
+            "revpar": (revenue / rooms_available) if rooms_available > 0 else 0,
+            "revenue": revenue
+        })
+    return trends
+
+# Background refresh job
+
+def refresh_snapshots():
+    """Recompute queued snapshot dates and extend every hotel through today (run by start_background_workers)"""
+    refresh_dirty_snapshots()
+    extend_snapshots()
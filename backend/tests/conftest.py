@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the InsightForge backend tests
+SQLite tests run against a copy of the bundled insightforge.db; PostgreSQL
+code is exercised against the stand-in connections in fake_pg.py
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Background jobs are started explicitly by the tests that need them
+for variable in ('SNAPSHOT_REFRESH_INTERVAL', 'ROLLUP_REFRESH_INTERVAL', 'SYSTEM_METRICS_INTERVAL',
+                 'DB_STATUS_REFRESH_INTERVAL', 'PLATFORM_COUNTERS_RECONCILE_INTERVAL'):
+    os.environ.setdefault(variable, '0')
+
+from utils import database as sqlite_database  # noqa: E402
+
+
+@pytest.fixture
+def platform_db(tmp_path, monkeypatch):
+    """A private copy of insightforge.db with models/schema.sql applied"""
+    from models import user as user_model
+    from utils import auth_helpers
+    from utils.token_store import TokenStore
+    from utils.user_state import UserStateCache
+
+    path = tmp_path / 'insightforge.db'
+    shutil.copy(os.path.join(BACKEND_DIR, 'insightforge.db'), path)
+    sqlite_database.close_all_connections()
+    monkeypatch.setattr(sqlite_database, 'DB_PATH', str(path))
+    sqlite_database.init_database()
+
+    # Per-test session store and user state cache, so nothing leaks between copies
+    sessions = TokenStore('platform', sqlite_database.execute_query, sqlite_database.execute_update)
+    states = UserStateCache()
+    monkeypatch.setattr(auth_helpers, 'platform_sessions', sessions)
+    monkeypatch.setattr(auth_helpers, 'user_states', states)
+    monkeypatch.setattr(user_model, 'user_states', states)
+    yield path
+    sessions.close()
+    sqlite_database.close_all_connections()
+
+
+@pytest.fixture
+def app(platform_db):
+    """The Flask app over platform_db, without background workers"""
+    from app import create_app
+    flask_app = create_app(start_workers=False)
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def superadmin(app):
+    """A superadmin in platform_db and the headers of a token issued to them"""
+    from models.user import User, UserRole
+    from utils.auth_helpers import generate_jwt_token
+    user = User.create('Platform Admin', 'root@example.com', 'Secret123!', UserRole.SUPERADMIN)
+    with app.app_context():
+        token = generate_jwt_token(user)
+    return user, {'Authorization': f'Bearer {token}'}
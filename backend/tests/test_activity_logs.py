@@ -0,0 +1,70 @@
+"""Route tests for keyset pagination of /api/admin/activity-logs"""
+
+import pytest
+
+from routes import admin
+from utils.database import execute_query, get_db_connection
+
+
+@pytest.fixture
+def logs(platform_db, monkeypatch):
+    """25 more log rows for hotel 1, several sharing a created_at second"""
+    monkeypatch.setattr(admin, '_activity_log_counts', {})
+    hotel_id = execute_query("SELECT id FROM hotels LIMIT 1", fetch_one=True)['id']
+    with get_db_connection() as conn:
+        conn.executemany("""
+            INSERT INTO activity_logs (hotel_id, activity_type, description, created_at)
+            VALUES (?, ?, ?, ?)
+        """, [(hotel_id, 'booking' if i % 2 else 'payment', f'entry {i}',
+               f'2030-01-01 10:00:{i // 3:02d}') for i in range(25)])
+        conn.commit()
+    return [row['id'] for row in execute_query(
+        "SELECT id FROM activity_logs ORDER BY created_at DESC, id DESC")]
+
+
+def walk(client, headers, **query):
+    ids, cursor = [], None
+    while True:
+        params = dict(query, **({'cursor': cursor} if cursor else {}))
+        body = client.get('/api/admin/activity-logs', headers=headers, query_string=params).get_json()
+        ids.extend(log['id'] for log in body['logs'])
+        cursor = body['pagination']['next_cursor']
+        assert body['pagination']['has_more'] == (cursor is not None)
+        if cursor is None:
+            return ids
+
+
+def test_cursor_pages_return_every_row_once_in_order(client, superadmin, logs):
+    _, headers = superadmin
+    assert walk(client, headers, limit=4) == logs
+
+
+def test_cursor_pages_respect_filters(client, superadmin, logs):
+    _, headers = superadmin
+    expected = [row['id'] for row in execute_query(
+        "SELECT id FROM activity_logs WHERE activity_type = 'booking' ORDER BY created_at DESC, id DESC")]
+    assert walk(client, headers, limit=3, activity_type='booking') == expected
+
+
+def test_numbered_pages_are_still_accepted(client, superadmin, logs):
+    _, headers = superadmin
+    body = client.get('/api/admin/activity-logs?page=2&per_page=5', headers=headers).get_json()
+    assert [log['id'] for log in body['logs']] == logs[5:10]
+    pagination = body['pagination']
+    assert (pagination['page'], pagination['per_page']) == (2, 5)
+    assert pagination['pages'] == (pagination['total'] + 4) // 5
+    # The page's cursor continues where the numbered page ended
+    after = client.get('/api/admin/activity-logs', headers=headers,
+                       query_string={'limit': 5, 'cursor': pagination['next_cursor']}).get_json()
+    assert [log['id'] for log in after['logs']] == logs[10:15]
+
+
+def test_cursor_and_page_together_are_rejected(client, superadmin, logs):
+    _, headers = superadmin
+    response = client.get('/api/admin/activity-logs?page=1&cursor=2030-01-01 10:00:00:1', headers=headers)
+    assert response.status_code == 400
+
+
+def test_malformed_cursor_is_rejected(client, superadmin, logs):
+    _, headers = superadmin
+    assert client.get('/api/admin/activity-logs?cursor=nonsense', headers=headers).status_code == 400
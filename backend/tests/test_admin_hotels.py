@@ -0,0 +1,28 @@
+"""Route tests for /api/admin/hotels on the bundled database"""
+
+from utils.database import execute_query
+
+
+def test_hotel_listing_includes_room_and_booking_stats(client, superadmin):
+    _, headers = superadmin
+    response = client.get('/api/admin/hotels', headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+    hotels = response.get_json()['hotels']
+    expected = execute_query("""
+        SELECT h.id,
+               (SELECT COUNT(*) FROM rooms r WHERE r.hotel_id = h.id) as rooms,
+               (SELECT COUNT(*) FROM rooms r WHERE r.hotel_id = h.id AND r.status = 'available') as available,
+               (SELECT COUNT(*) FROM bookings b WHERE b.hotel_id = h.id) as bookings
+        FROM hotels h
+    """)
+    assert len(hotels) == len(expected)
+    stats = {hotel['id']: hotel['stats'] for hotel in hotels}
+    for row in expected:
+        assert stats[row['id']]['rooms']['total'] == row['rooms']
+        assert stats[row['id']]['rooms']['available'] == row['available']
+        assert stats[row['id']]['bookings']['total'] == row['bookings']
+
+
+def test_hotel_listing_requires_superadmin(client):
+    assert client.get('/api/admin/hotels').status_code == 401
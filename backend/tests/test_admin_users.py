@@ -0,0 +1,64 @@
+"""Route tests for keyset pagination of /api/admin/users/all"""
+
+import pytest
+
+from utils.database import execute_query, get_db_connection
+
+
+@pytest.fixture
+def users(platform_db, superadmin):
+    """Staff spread over two hotels, plus the superadmin on the platform"""
+    first_hotel = execute_query("SELECT id FROM hotels ORDER BY id LIMIT 1", fetch_one=True)['id']
+    with get_db_connection() as conn:
+        second_hotel = conn.execute(
+            "INSERT INTO hotels (name, city, country) VALUES ('Second Hotel', 'Lyon', 'France')").lastrowid
+        conn.executemany("""
+            INSERT INTO users (hotel_id, name, email, password_hash, role, is_active)
+            VALUES (?, ?, ?, 'x', ?, ?)
+        """, [(first_hotel if i % 3 else second_hotel, f'User {i}', f'user{i}@example.com',
+               'manager' if i % 4 == 0 else 'staff', 0 if i == 5 else 1) for i in range(14)])
+        conn.commit()
+    return [(row['hotel_key'], row['id']) for row in execute_query(
+        "SELECT IFNULL(hotel_id, 0) AS hotel_key, id FROM users ORDER BY hotel_key, id DESC")]
+
+
+def walk(client, headers, **query):
+    rows, cursor = [], None
+    while True:
+        params = dict(query, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/api/admin/users/all', headers=headers, query_string=params)
+        assert response.status_code == 200
+        body = response.get_json()
+        for hotel, hotel_users in body['users_by_hotel'].items():
+            rows.extend((0 if hotel == 'platform' else int(hotel), user['id']) for user in hotel_users)
+        cursor = body['pagination']['next_cursor']
+        assert body['pagination']['has_more'] == (cursor is not None)
+        if cursor is None:
+            return rows, body['total_users']
+
+
+def test_cursor_pages_return_every_user_once_in_order(client, superadmin, users):
+    _, headers = superadmin
+    rows, total = walk(client, headers, limit=4)
+    # Pages are grouped per hotel in the response, so compare as keyset order
+    assert sorted(rows, key=lambda row: (row[0], -row[1])) == users
+    assert len(set(rows)) == len(rows) == total
+
+
+def test_cursor_pages_respect_filters(client, superadmin, users):
+    _, headers = superadmin
+    expected = [(row['hotel_key'], row['id']) for row in execute_query("""
+        SELECT IFNULL(hotel_id, 0) AS hotel_key, id FROM users
+        WHERE role = 'staff' AND is_active = 1 ORDER BY hotel_key, id DESC
+    """)]
+
+    rows, total = walk(client, headers, limit=3, role='staff', is_active='true')
+
+    assert sorted(rows, key=lambda row: (row[0], -row[1])) == expected
+    assert total == len(expected)
+
+
+def test_invalid_cursor_is_rejected(client, superadmin, users):
+    _, headers = superadmin
+    response = client.get('/api/admin/users/all', headers=headers, query_string={'cursor': 'abc'})
+    assert response.status_code == 400
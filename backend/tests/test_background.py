@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from utils import background
+
+
+@pytest.fixture(autouse=True)
+def stop_jobs():
+    yield
+    background.stop_jobs()
+
+
+def test_failed_run_is_retried_on_the_next_interval():
+    calls = []
+    done = threading.Event()
+
+    def job():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+        done.set()
+
+    assert background.start_job('test-retry', job, 0.01, run_immediately=True)
+    assert done.wait(2)
+    assert len(calls) >= 2
+
+
+def test_disabled_and_duplicate_jobs_do_not_start():
+    started = threading.Event()
+
+    assert not background.start_job('test-disabled', started.set, 0)
+    assert background.start_job('test-once', lambda: None, 60)
+    assert not background.start_job('test-once', lambda: None, 60)
+    assert not started.is_set()
+
+
+def test_stop_jobs_ends_threads_and_sets_stopping():
+    ran = threading.Event()
+    background.start_job('test-stop', ran.set, 60, run_immediately=True)
+    assert ran.wait(2)
+
+    background.stop_jobs()
+
+    assert background.stopping()
+    assert not any(thread.is_alive() for thread in background._threads.values())
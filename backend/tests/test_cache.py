@@ -0,0 +1,93 @@
+"""Tests for the analytics result cache (cache.py)"""
+
+import time
+
+import pytest
+
+import database
+from cache import AnalyticsCache, cached
+from database import DatabaseError
+
+
+@pytest.fixture
+def cache():
+    return AnalyticsCache(max_bytes=1024 * 1024, default_ttl=30)
+
+
+def counting(cache, **options):
+    calls = []
+
+    @cached(cache=cache, **options)
+    def report(hotel_id: int, months: int = 6):
+        calls.append((hotel_id, months))
+        return {'hotel': hotel_id, 'months': months, 'call': len(calls)}
+
+    return report, calls
+
+
+def test_hits_reuse_the_first_result(cache):
+    report, calls = counting(cache)
+    assert report(1) == report(1, months=6) == {'hotel': 1, 'months': 6, 'call': 1}
+    report(1, 12)
+    assert calls == [(1, 6), (1, 12)]
+    assert cache.stats()['hits'] == 1
+
+
+def test_entries_expire_after_their_ttl(cache):
+    report, calls = counting(cache, ttl=0.05)
+    report(1)
+    time.sleep(0.1)
+    report(1)
+    assert len(calls) == 2
+    assert cache.stats()['expirations'] == 1
+
+
+def test_invalidating_a_hotel_drops_only_its_entries(cache):
+    report, calls = counting(cache)
+    report(1)
+    report(2)
+    assert cache.invalidate_hotel(1) == 1
+    report(1)
+    report(2)
+    assert calls == [(1, 6), (2, 6), (1, 6)]
+
+
+def test_callers_get_private_copies(cache):
+    report, _ = counting(cache)
+    report(1)['hotel'] = 99
+    assert report(1)['hotel'] == 1
+
+
+def test_fallback_after_failed_query_is_not_cached(cache, monkeypatch):
+    def broken_pool():
+        raise database.PoolError('pool exhausted')
+    monkeypatch.setattr(database, 'get_pool', broken_pool)
+    calls = []
+
+    @cached(cache=cache)
+    def sources(hotel_id: int):
+        calls.append(hotel_id)
+        try:
+            return database.execute_query("SELECT 1")
+        except DatabaseError:
+            return []
+
+    assert sources(1) == [] and sources(1) == []
+    assert calls == [1, 1]
+    assert cache.stats()['entries'] == 0
+
+
+def test_failure_in_nested_call_keeps_outer_result_out_of_cache(cache):
+    from cache import mark_uncacheable
+
+    @cached(cache=cache)
+    def inner(hotel_id: int):
+        mark_uncacheable()
+        return 0
+
+    @cached(cache=cache)
+    def outer(hotel_id: int):
+        return inner(hotel_id) + 1
+
+    assert outer(1) == 1
+    assert cache.stats()['entries'] == 0
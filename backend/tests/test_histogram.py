@@ -0,0 +1,104 @@
+"""Bucketing of get_booking_histogram and /api/booking-distribution"""
+
+from bisect import bisect_right
+
+import pytest
+
+import database
+from cache import clear_cache
+from database import get_booking_histogram, histogram_labels
+
+BOOKINGS = [
+    # (lead_time_days, nights, room_rate, status)
+    (0, 1, 80.0, 'confirmed'),
+    (0, 2, 99.99, 'checked_out'),
+    (1, 3, 100.0, 'confirmed'),
+    (7, 4, 149.5, 'confirmed'),
+    (8, 7, 150.0, 'confirmed'),
+    (14, 8, 220.0, 'confirmed'),
+    (30, 14, 300.0, 'confirmed'),
+    (31, 15, 499.0, 'confirmed'),
+    (60, 30, 500.0, 'confirmed'),
+    (61, 2, 750.0, 'confirmed'),
+    (400, 1, 90.0, 'confirmed'),
+    (5, 3, 120.0, 'cancelled'),
+]
+
+
+@pytest.fixture
+def bookings(monkeypatch):
+    """Answer the histogram query the way PostgreSQL's width_bucket() would"""
+    columns = {'lead_time_days': 0, 'nights': 1, 'room_rate': 2}
+    queries = []
+
+    def execute_query(query, params=None, fetch_one=False):
+        queries.append((query, params))
+        column = next(name for name in columns if f'width_bucket({name}::numeric' in query)
+        counts = {}
+        for booking in BOOKINGS:
+            value = booking[columns[column]]
+            if booking[3] == 'cancelled' or value < params['lowest']:
+                continue
+            # width_bucket(x, thresholds) is the number of thresholds <= x
+            bucket = bisect_right(params['edges'], value)
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return [{'bucket': bucket, 'bookings': count} for bucket, count in counts.items()]
+
+    monkeypatch.setattr(database, 'execute_query', execute_query)
+    clear_cache()
+    yield queries
+    clear_cache()
+
+
+def test_integer_labels_cover_each_edge_range():
+    assert histogram_labels((0, 1, 8, 15, 31, 61)) == ['0', '1-7', '8-14', '15-30', '31-60', '61+']
+    assert histogram_labels((0, 99.5, 200), integer=False) == ['0-99.5', '99.5-200', '200+']
+
+
+def test_lead_time_buckets_use_lower_inclusive_edges(bookings):
+    buckets = get_booking_histogram(1, 'lead_time')
+
+    assert [(b['label'], b['min'], b['max'], b['bookings']) for b in buckets] == [
+        ('0', 0, 1, 2),
+        ('1-7', 1, 8, 2),
+        ('8-14', 8, 15, 2),
+        ('15-30', 15, 31, 1),
+        ('31-60', 31, 61, 2),
+        ('61+', 61, None, 2),
+    ]
+    # Cancelled bookings are not counted
+    assert sum(b['bookings'] for b in buckets) == 11
+    assert sum(b['percentage'] for b in buckets) == pytest.approx(100, abs=0.5)
+
+
+def test_empty_buckets_and_values_below_first_edge(bookings):
+    buckets = get_booking_histogram(1, 'room_rate', edges=(100, 200, 1000))
+
+    # 80, 99.99 and 90 fall below the first edge and are left out
+    assert [(b['label'], b['bookings']) for b in buckets] == [
+        ('100-200', 3), ('200-1000', 5), ('1000+', 0)]
+    query, params = bookings[-1]
+    assert params['edges'] == [100, 200, 1000] and params['lowest'] == 100
+
+
+def test_invalid_edges_and_labels_are_rejected(bookings):
+    with pytest.raises(ValueError):
+        get_booking_histogram(1, 'lead_time', edges=(0, 10, 5))
+    with pytest.raises(ValueError):
+        get_booking_histogram(1, 'lead_time', edges=(0, 10), labels=('only one',))
+    with pytest.raises(ValueError):
+        get_booking_histogram(1, 'guests')
+    assert bookings == []
+
+
+def test_distribution_endpoint(client, bookings):
+    response = client.get('/api/booking-distribution',
+                          query_string={'attribute': 'length_of_stay', 'edges': '1,3,8'})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert [(b['label'], b['bookings']) for b in body['buckets']] == [('1-2', 4), ('3-7', 3), ('8+', 4)]
+    assert body['totalBookings'] == 11
+
+    response = client.get('/api/booking-distribution', query_string={'edges': '1,x'})
+    assert response.status_code == 400
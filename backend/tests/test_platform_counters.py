@@ -0,0 +1,68 @@
+"""Tests for the trigger-maintained platform counters (utils/platform_counters.py)"""
+
+from utils.database import execute_query, execute_update
+from utils.platform_counters import get_platform_counters, reconcile_platform_counters
+
+
+def source_totals():
+    hotels = execute_query("SELECT COUNT(*) AS total FROM hotels", fetch_one=True)['total']
+    bookings = execute_query("""
+        SELECT COUNT(*) AS total, COALESCE(SUM(total_amount), 0) AS revenue
+        FROM bookings WHERE status = 'confirmed'
+    """, fetch_one=True)
+    by_status = {row['status']: row['total'] for row in execute_query(
+        "SELECT status, COUNT(*) AS total FROM bookings GROUP BY status")}
+    return hotels, bookings, by_status
+
+
+def test_trigger_rows_before_first_reconcile_are_not_taken_as_totals(platform_db):
+    # A trigger fires before anything has seeded the table
+    execute_update("INSERT INTO users (name, email, password_hash, role) VALUES ('Staff', 's@example.com', 'x', 'staff')")
+    assert execute_query("SELECT metric, bucket FROM platform_counters") == [{'metric': 'users', 'bucket': 'staff'}]
+
+    counters = get_platform_counters()
+    hotels, bookings, by_status = source_totals()
+    assert hotels > 0 and sum(by_status.values()) > 0
+    assert counters['hotels']['total'] == hotels
+    assert counters['bookings']['total'] == bookings['total']
+    assert counters['bookings']['by_status'] == by_status
+    assert counters['users']['staff'] == 1
+
+
+def test_triggers_keep_seeded_counters_current(platform_db):
+    get_platform_counters()
+    hotel_id = execute_query("SELECT id FROM hotels LIMIT 1", fetch_one=True)['id']
+    booking = execute_query("SELECT id, status FROM bookings LIMIT 1", fetch_one=True)
+    execute_update("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking['id'],))
+    execute_update("INSERT INTO users (hotel_id, name, email, password_hash, role) VALUES (?, 'M', 'm@example.com', 'x', 'manager')",
+                   (hotel_id,))
+
+    counters = get_platform_counters()
+    _, _, by_status = source_totals()
+    assert counters['bookings']['by_status'] == by_status
+    assert counters['users']['managers'] == 1
+    # Nothing drifted, so a rebuild changes no bucket
+    assert reconcile_platform_counters() == 0
+
+
+def test_reconcile_corrects_drift(platform_db):
+    get_platform_counters()
+    execute_update("UPDATE platform_counters SET count = count + 5 WHERE metric = 'hotels'")
+    execute_update("DELETE FROM platform_counters WHERE metric = 'bookings'")
+
+    assert reconcile_platform_counters() >= 2
+    hotels, _, by_status = source_totals()
+    counters = get_platform_counters()
+    assert counters['hotels']['total'] == hotels
+    assert counters['bookings']['by_status'] == by_status
+
+
+def test_admin_stats_route_reports_source_totals(client, superadmin):
+    _, headers = superadmin
+    response = client.get('/api/admin/stats', headers=headers)
+    assert response.status_code == 200
+    hotels, _, by_status = source_totals()
+    stats = response.get_json()['stats']
+    assert stats['hotels']['total'] == hotels
+    assert stats['bookings']['by_status'] == by_status
+    assert stats['users']['superadmins'] == 1
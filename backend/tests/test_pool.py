@@ -0,0 +1,123 @@
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+import pool as pool_module
+from pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.broken = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**config):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(pool_module.psycopg2, 'connect', connect)
+    return opened
+
+
+def make_pool(**settings):
+    return ConnectionPool({}, **{'min_size': 0, 'max_size': 2, 'name': 'test', **settings})
+
+
+def test_exhausted_pool_times_out(connections):
+    pool = make_pool(max_size=1, wait_timeout=0.05)
+    conn = pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats['total_wait_timeouts'] == 1
+    assert stats['in_use'] == 1 and stats['size'] == 1
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_waiter_gets_the_returned_connection(connections):
+    pool = make_pool(max_size=1, wait_timeout=2)
+    conn = pool.getconn()
+    result = {}
+
+    waiter = threading.Thread(target=lambda: result.update(conn=pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.stats()['waiting'] == 1
+    pool.putconn(conn)
+    waiter.join(2)
+
+    assert result['conn'] is conn
+    assert len(connections) == 1
+
+
+def test_idle_connections_above_min_size_are_reaped(connections):
+    pool = make_pool(min_size=1, max_size=3, max_idle=0.05)
+    first, second, third = pool.getconn(), pool.getconn(), pool.getconn()
+    for conn in (first, second, third):
+        pool.putconn(conn)
+    assert pool.stats()['idle'] == 3
+
+    time.sleep(0.1)
+    pool.reap()
+
+    stats = pool.stats()
+    assert stats['size'] == stats['idle'] == 1
+    assert stats['total_reaped'] == 2
+    assert sum(1 for conn in connections if conn.closed) == 2
+
+
+def test_dead_idle_connection_is_replaced_on_checkout(connections):
+    pool = make_pool(health_check_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+
+    replacement = pool.getconn()
+
+    assert replacement is not conn and conn.closed
+    stats = pool.stats()
+    assert stats['total_health_check_failures'] == 1
+    assert stats['total_created'] == 2
+    assert stats['size'] == 1
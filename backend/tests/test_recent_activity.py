@@ -0,0 +1,74 @@
+"""Keyset pagination of get_recent_activity / /api/recent-activity"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from cache import clear_cache
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    """activity_stream rows for hotels 1 and 2, several sharing a created_at"""
+    start = datetime(2030, 1, 1, 10, 0)
+    rows = [{'id': i, 'hotel_id': 1 if i % 4 else 2, 'activity_type': 'booking',
+             'description': f'entry {i}', 'created_at': start + timedelta(minutes=i // 3)}
+            for i in range(1, 31)]
+    queries = []
+
+    def execute_query(query, params=None, fetch_one=False):
+        # Mirrors the SQL: WHERE hotel_id [AND (created_at, id) < cursor] ORDER BY ... DESC LIMIT
+        assert 'FROM activity_stream' in query
+        queries.append(params)
+        hotel_id, limit = params[0], params[-1]
+        matches = [row for row in rows if row['hotel_id'] == hotel_id]
+        if len(params) == 4:
+            matches = [row for row in matches if (row['created_at'], row['id']) < (params[1], params[2])]
+        matches.sort(key=lambda row: (row['created_at'], row['id']), reverse=True)
+        return [dict(row) for row in matches[:limit]]
+
+    monkeypatch.setattr(database, 'execute_query', execute_query)
+    clear_cache()
+    yield rows, queries
+    clear_cache()
+
+
+def test_cursor_pages_return_every_entry_once_in_order(stream):
+    rows, _ = stream
+    expected = [row['description'] for row in sorted(
+        (row for row in rows if row['hotel_id'] == 1),
+        key=lambda row: (row['created_at'], row['id']), reverse=True)]
+
+    seen, before = [], None
+    while True:
+        page = database.get_recent_activity(1, 4, before)
+        if not page:
+            break
+        seen.extend(entry['message'] for entry in page)
+        before = page[-1]['cursor']
+
+    assert seen == expected
+
+
+def test_cursor_is_passed_to_the_query_as_a_keyset(stream):
+    _, queries = stream
+    first = database.get_recent_activity(1, 2)
+    database.get_recent_activity(1, 2, first[-1]['cursor'])
+
+    assert queries[0] == (1, 2)
+    assert queries[1] == (1, datetime(2030, 1, 1, 10, 9), 29, 2)
+
+
+def test_past_the_end_returns_empty_page(stream):
+    assert database.get_recent_activity(1, 5, '2000-01-01T00:00:00:1') == []
+
+
+def test_first_page_without_rows_returns_placeholder(stream):
+    page = database.get_recent_activity(99, 5)
+    assert len(page) == 1 and 'cursor' not in page[0]
+
+
+def test_invalid_cursor_is_rejected(client, stream):
+    response = client.get('/api/recent-activity', query_string={'hotel_id': 1, 'before': 'garbage'})
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+"""Tests for platform token revocation (utils/token_store.py, /api/admin/logout, /api/admin/change-password)"""
+
+from datetime import datetime, timedelta
+
+from utils import auth_helpers
+from utils.database import execute_query, execute_update
+from utils import token_store
+from utils.token_store import TokenStore
+
+
+def test_logout_revokes_the_presented_token(client, superadmin):
+    _, headers = superadmin
+    assert client.get('/api/admin/stats', headers=headers).status_code == 200
+
+    assert client.post('/api/admin/logout', headers=headers).status_code == 200
+    assert client.get('/api/admin/stats', headers=headers).status_code == 401
+
+    # Recorded for other processes too
+    auth_helpers.platform_sessions.flush()
+    assert execute_query("SELECT COUNT(*) AS revoked FROM user_sessions WHERE is_revoked = 1",
+                         fetch_one=True)['revoked'] == 1
+
+
+def test_change_password_revokes_old_token_and_issues_a_new_one(client, superadmin):
+    user, headers = superadmin
+    response = client.post('/api/admin/change-password', headers=headers,
+                           json={'current_password': 'Secret123!', 'new_password': 'Another456!'})
+    assert response.status_code == 200, response.get_json()
+    new_headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+    assert client.get('/api/admin/stats', headers=headers).status_code == 401
+    assert client.get('/api/admin/stats', headers=new_headers).status_code == 200
+    assert execute_query("SELECT COUNT(*) AS revoked FROM user_sessions WHERE is_revoked = 1",
+                         fetch_one=True)['revoked'] == 1
+
+
+def test_change_password_rejects_wrong_current_password(client, superadmin):
+    _, headers = superadmin
+    response = client.post('/api/admin/change-password', headers=headers,
+                           json={'current_password': 'wrong', 'new_password': 'Another456!'})
+    assert response.status_code == 400
+    assert client.get('/api/admin/stats', headers=headers).status_code == 200
+
+
+def test_start_preloads_revocations_so_checks_never_query(platform_db, superadmin, monkeypatch):
+    user, _ = superadmin
+    # Keep the background refresh out of the query count
+    monkeypatch.setattr(token_store, 'TOKEN_STORE_FLUSH_INTERVAL', 3600)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    execute_update("""
+        INSERT INTO user_sessions (user_id, token_jti, expires_at, is_revoked, revoked_at)
+        VALUES (?, 'revoked-elsewhere', ?, 1, ?)
+    """, (user.id, expires_at, datetime.utcnow()))
+
+    queries = []
+
+    def counting_query(*args, **kwargs):
+        queries.append(args[0])
+        return execute_query(*args, **kwargs)
+
+    store = TokenStore('test', counting_query, execute_update)
+    store.start()
+    loaded = len(queries)
+    try:
+        assert store.is_revoked('revoked-elsewhere')
+        assert not store.is_revoked('still-valid')
+        assert len(queries) == loaded == 1
+    finally:
+        store.close()
@@ -0,0 +1,88 @@
+"""Write-behind activity logging (utils/write_behind.py, utils/auth_helpers.log_activity)"""
+
+from datetime import datetime
+
+import pytest
+
+from utils import auth_helpers
+from utils.auth_helpers import activity_log_queue, log_activity, ACTIVITY_LOG_ROWS_PER_INSERT
+from utils.database import execute_query, get_db_connection
+
+
+@pytest.fixture
+def staff(platform_db):
+    """A hotel staff user; rows left queued by earlier tests are written first"""
+    activity_log_queue.flush()
+    hotel_id = execute_query("SELECT id FROM hotels ORDER BY id LIMIT 1", fetch_one=True)['id']
+    with get_db_connection() as conn:
+        user_id = conn.execute("""
+            INSERT INTO users (hotel_id, name, email, password_hash, role)
+            VALUES (?, 'Front Desk', 'desk@example.com', 'x', 'staff')
+        """, (hotel_id,)).lastrowid
+        conn.commit()
+    return user_id, hotel_id
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Parameter counts of the INSERT statements the queue runs"""
+    counts = []
+    execute_update = auth_helpers.execute_update
+
+    def counting_update(query, params=None):
+        counts.append(len(params))
+        return execute_update(query, params)
+
+    monkeypatch.setattr(auth_helpers, 'execute_update', counting_update)
+    return counts
+
+
+def logged(description_prefix):
+    return execute_query("SELECT hotel_id, user_id, description, created_at FROM activity_logs "
+                         "WHERE description LIKE ? ORDER BY id", (f'{description_prefix}%',))
+
+
+def test_queued_rows_are_written_in_batches_under_the_parameter_limit(staff, statements):
+    user_id, hotel_id = staff
+    for i in range(250):
+        log_activity(user_id, 'report_generation', f'batched {i}')
+
+    activity_log_queue.flush()
+
+    rows = logged('batched')
+    assert [row['description'] for row in rows] == [f'batched {i}' for i in range(250)]
+    # hotel_id is resolved from the user inside the INSERT
+    assert {row['hotel_id'] for row in rows} == {hotel_id}
+    assert len(statements) >= 3
+    assert max(statements) <= 999 and max(statements) // 10 <= ACTIVITY_LOG_ROWS_PER_INSERT
+
+
+def test_failing_row_is_dropped_without_losing_its_batch(staff, statements):
+    user_id, _ = staff
+    dropped = activity_log_queue.stats()['dropped']
+    log_activity(user_id, 'report_generation', 'kept 1')
+    # No hotel to fall back on: violates activity_logs.hotel_id NOT NULL
+    log_activity(None, 'report_generation', 'orphan')
+    log_activity(user_id, 'report_generation', 'kept 2')
+
+    activity_log_queue.flush()
+
+    assert [row['description'] for row in logged('kept')] == ['kept 1', 'kept 2']
+    assert logged('orphan') == []
+    assert activity_log_queue.stats()['dropped'] == dropped + 1
+
+
+def test_rows_keep_the_time_they_were_logged(staff, monkeypatch):
+    user_id, _ = staff
+
+    class frozen(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2020, 1, 2, 3, 4, 5)
+
+    monkeypatch.setattr(auth_helpers, 'datetime', frozen)
+    log_activity(user_id, 'report_generation', 'stamped')
+
+    activity_log_queue.flush()
+
+    assert logged('stamped')[0]['created_at'] == '2020-01-02 03:04:05'
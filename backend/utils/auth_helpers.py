@@ -4,86 +4,160 @@ JWT token handling, decorators, and permission checking
 """
 
 import jwt
+import uuid
 import functools
 from datetime import datetime, timedelta
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, has_request_context
 from typing import Dict, Any, Optional, Callable
 from models.user import User, UserRole
-from utils.database import get_db_connection, execute_update
+from utils.database import execute_query, execute_update
+from utils import identity_map
+from utils.user_state import user_states, claims_match
+from utils.token_store import create_token_store
+from utils.write_behind import create_write_behind, WRITE_BEHIND_BATCH_SIZE
+
+# Sessions and revocations for tokens issued by generate_jwt_token
+platform_sessions = create_token_store('platform', execute_query, execute_update, '?')
 
 def generate_jwt_token(user: User) -> str:
     """Generate JWT token for authenticated user"""
+    expires_at = datetime.utcnow() + timedelta(hours=24)  # Token expires in 24 hours
     payload = {
         'user_id': user.id,
         'email': user.email,
         'role': user.role,
         'hotel_id': user.hotel_id,
-        'exp': datetime.utcnow() + timedelta(hours=24),  # Token expires in 24 hours
+        'ver': user.account_version,  # Tokens are rejected once the account changes
+        'exp': expires_at,
         'iat': datetime.utcnow(),
-        'jti': f"{user.id}_{int(datetime.utcnow().timestamp())}"  # Unique token identifier
+        'jti': uuid.uuid4().hex  # Unique token identifier, checked against revocations
     }
     
     secret_key = current_app.config.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-    return jwt.encode(payload, secret_key, algorithm='HS256')
+    token = jwt.encode(payload, secret_key, algorithm='HS256')
+    in_request = has_request_context()
+    platform_sessions.record_issued(payload['jti'], user.id, expires_at,
+                                    request.remote_addr if in_request else None,
+                                    request.headers.get('User-Agent') if in_request else None)
+    return token
 
-def verify_jwt_token(token: str) -> Optional[Dict[str, Any]]:
-    """Verify JWT token and return payload"""
+def revoke_jwt_token(payload: Dict[str, Any]):
+    """Revoke a verified token so it is rejected from now on"""
+    platform_sessions.revoke(payload['jti'], payload['user_id'],
+                             datetime.utcfromtimestamp(payload['exp']))
+
+def current_token_payload() -> Optional[Dict[str, Any]]:
+    """Verified payload of the bearer token sent with the current request"""
+    token = _bearer_token(request.headers.get('Authorization', ''))
+    return verify_jwt_token(token) if token else None
+
+def revoke_current_token(payload: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Revoke the current request's token (or an already verified payload of it)
+    Returns False if there was no valid token to revoke
+    """
+    payload = payload or current_token_payload()
+    if not payload or 'jti' not in payload:
+        return False
+    revoke_jwt_token(payload)
+    return True
+
+def get_user_state(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user's authorization state, from the short-TTL cache when possible"""
+    def load():
+        user = User.get_by_id(user_id)
+        return user.auth_state() if user else None
+    return user_states.get(user_id, load)
+
+def _verify_token(token: str):
+    """Decode a token and check its claims against the user's state"""
     try:
         secret_key = current_app.config.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
         payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        
-        # Check if token is revoked (optional - can implement token blacklist)
-        # For now, we'll just verify the user still exists and is active
-        user = User.get_by_id(payload['user_id'])
-        if not user or not user.is_active:
-            return None
-            
-        return payload
     except jwt.ExpiredSignatureError:
-        return None
+        return None, None
     except jwt.InvalidTokenError:
-        return None
+        return None, None
+    
+    # Revocations are held in memory, so this check does not query the database
+    if platform_sessions.is_revoked(payload.get('jti')):
+        return None, None
+    
+    # The user must still be active and unchanged since the token was issued
+    state = get_user_state(payload['user_id'])
+    if not claims_match(payload, state):
+        return None, None
+    return payload, state
+
+def verify_jwt_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify JWT token and return payload"""
+    payload, _ = _verify_token(token)
+    return payload
 
 def get_current_user() -> Optional[User]:
-    """Get current user from JWT token in request headers"""
+    """Get current user from JWT token in request headers (resolved once per request)"""
     auth_header = request.headers.get('Authorization')
     if not auth_header:
         return None
     
+    # Stacked decorators share the first resolution of this header
+    found, user = identity_map.lookup('current_user', auth_header)
+    if found:
+        return user
+    return identity_map.remember('current_user', auth_header, _resolve_current_user(auth_header))
+
+def _bearer_token(auth_header: str) -> Optional[str]:
+    """Extract the token from an "Authorization: Bearer <token>" header"""
     try:
-        # Expected format: "Bearer <token>"
         token_type, token = auth_header.split(' ', 1)
-        if token_type.lower() != 'bearer':
-            return None
     except ValueError:
         return None
+    return token if token_type.lower() == 'bearer' else None
+
+def _resolve_current_user(auth_header: str) -> Optional[User]:
+    """Verify the bearer token in auth_header and load its user"""
+    token = _bearer_token(auth_header)
+    if not token:
+        return None
     
-    payload = verify_jwt_token(token)
+    payload, state = _verify_token(token)
     if not payload:
         return None
     
-    return User.get_by_id(payload['user_id'])
+    # Authorization only needs the cached state, so no user row is read here
+    return User.from_auth_state(state)
+
+def _write_activity_logs(rows: list):
+    """Insert a batch of queued activity log rows in one statement"""
+    # hotel_id falls back to the user's hotel, resolved here instead of on the request path
+    placeholders = ', '.join(['(COALESCE(?, (SELECT hotel_id FROM users WHERE id = ?)), ?, ?, ?, ?, ?, ?, ?, ?)'] * len(rows))
+    execute_update(f"""
+        INSERT INTO activity_logs 
+        (hotel_id, user_id, activity_type, entity_type, entity_id, description, ip_address, user_agent, created_at)
+        VALUES {placeholders}
+    """, tuple(value for row in rows for value in row))
+
+# SQLite builds before 3.32 bind at most 999 parameters per statement (10 per row)
+ACTIVITY_LOG_ROWS_PER_INSERT = 999 // 10
+
+# Activity logs are written behind the request in multi-row batches
+activity_log_queue = create_write_behind('activity_logs', _write_activity_logs,
+                                         batch_size=min(WRITE_BEHIND_BATCH_SIZE, ACTIVITY_LOG_ROWS_PER_INSERT))
 
 def log_activity(user_id: Optional[int], activity_type: str, description: str, 
                 entity_type: Optional[str] = None, entity_id: Optional[int] = None,
                 hotel_id: Optional[int] = None):
-    """Log user activity for audit trail"""
+    """Log user activity for audit trail (queued, written in the background)"""
     try:
-        # Get user's hotel_id if not provided
-        if not hotel_id and user_id:
-            user = User.get_by_id(user_id)
-            if user:
-                hotel_id = user.hotel_id
-        
         # Get request info
-        ip_address = request.remote_addr if request else None
-        user_agent = request.headers.get('User-Agent') if request else None
+        in_request = has_request_context()
+        ip_address = request.remote_addr if in_request else None
+        user_agent = request.headers.get('User-Agent') if in_request else None
         
-        execute_update("""
-            INSERT INTO activity_logs 
-            (hotel_id, user_id, activity_type, entity_type, entity_id, description, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (hotel_id, user_id, activity_type, entity_type, entity_id, description, ip_address, user_agent))
+        # Stamp the event now so batching does not shift its time (same format as CURRENT_TIMESTAMP)
+        created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        activity_log_queue.put((hotel_id or None, user_id, user_id, activity_type, entity_type, entity_id,
+                                description, ip_address, user_agent, created_at))
         
     except Exception as e:
         # Don't fail the main operation if logging fails
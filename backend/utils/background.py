@@ -0,0 +1,65 @@
+"""
+Periodic background jobs for InsightForge
+Runs each registered job on its own daemon thread every `interval` seconds;
+app.start_background_workers registers the snapshot, metrics, database-status,
+platform counter and cache invalidation jobs at startup
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+_threads: Dict[str, threading.Thread] = {}
+_threads_lock = threading.Lock()
+_shutdown = threading.Event()
+
+
+def _run(name: str, job: Callable[[], Any], interval: float, run_immediately: bool):
+    if not run_immediately and _shutdown.wait(interval):
+        return
+    while True:
+        try:
+            job()
+        except Exception as e:
+            # Log and try again next interval; one failed run must not end the thread
+            print(f"❌ Background job '{name}' failed: {e}")
+        if _shutdown.wait(interval):
+            return
+
+
+def start_job(name: str, job: Callable[[], Any], interval: float, run_immediately: bool = False) -> bool:
+    """
+    Run job() every `interval` seconds on a daemon thread
+
+    Args:
+        name: Thread name; a job already running under it is left alone
+        job: Zero-argument callable; exceptions are logged, not raised
+        interval: Seconds between runs (0 or less disables the job)
+        run_immediately: Run once at start instead of after the first interval
+
+    Returns:
+        True if a thread was started
+    """
+    with _threads_lock:
+        thread = _threads.get(name)
+        if interval <= 0 or (thread is not None and thread.is_alive()):
+            return False
+        _shutdown.clear()
+        thread = _threads[name] = threading.Thread(target=_run, args=(name, job, interval, run_immediately),
+                                                   name=name, daemon=True)
+        thread.start()
+        return True
+
+
+def stopping() -> bool:
+    """True once stop_jobs() was called; long-running jobs poll this to exit"""
+    return _shutdown.is_set()
+
+
+def stop_jobs(timeout: float = 5.0):
+    """Stop every job after its current run"""
+    _shutdown.set()
+    with _threads_lock:
+        threads = list(_threads.values())
+    for thread in threads:
+        if thread is not threading.current_thread():
+            thread.join(timeout)
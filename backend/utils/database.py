@@ -5,25 +5,120 @@ Handles SQLite database connections and common operations
 
 import sqlite3
 import os
+import atexit
+import threading
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 
 # Database configuration
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'insightforge.db')
 
+# Connection tuning (applied once per connection, not per query)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(64 * 1024 * 1024)))
+SQLITE_MAX_IDLE_CONNECTIONS = int(os.getenv('SQLITE_MAX_IDLE_CONNECTIONS', '8'))
+
 class DatabaseError(Exception):
     """Custom exception for database operations"""
     pass
 
+# Per-thread connection cache
+_local = threading.local()
+_registry_lock = threading.Lock()
+_bound_connections: Dict[threading.Thread, sqlite3.Connection] = {}
+_idle_connections: List[sqlite3.Connection] = []
+
+def _open_connection() -> sqlite3.Connection:
+    """Open a tuned SQLite connection"""
+    # Connections move between threads when one is recycled, never concurrently
+    conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # Enable foreign key constraints
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def _park_locked(conn: sqlite3.Connection):
+    """Keep an unbound connection for reuse, closing it if the idle list is full"""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        conn.close()
+        return
+    if len(_idle_connections) < SQLITE_MAX_IDLE_CONNECTIONS:
+        _idle_connections.append(conn)
+    else:
+        conn.close()
+
+def _acquire_connection() -> sqlite3.Connection:
+    """Get this thread's cached connection, binding one on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+    
+    thread = threading.current_thread()
+    with _registry_lock:
+        # Reclaim connections left behind by threads that have exited
+        for dead in [t for t in _bound_connections if not t.is_alive()]:
+            _park_locked(_bound_connections.pop(dead))
+        conn = _idle_connections.pop() if _idle_connections else None
+    
+    if conn is None:
+        try:
+            conn = _open_connection()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Database error: {str(e)}")
+    
+    with _registry_lock:
+        _bound_connections[thread] = conn
+    _local.conn = conn
+    _local.depth = 0
+    return conn
+
+def release_thread_connection(exception=None):
+    """Return this thread's connection to the idle cache (Flask teardown hook)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.depth:
+        return
+    _local.conn = None
+    with _registry_lock:
+        _bound_connections.pop(threading.current_thread(), None)
+        _park_locked(conn)
+
+def close_all_connections():
+    """Close every cached connection (called at interpreter exit)"""
+    with _registry_lock:
+        for conn in list(_bound_connections.values()) + _idle_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _bound_connections.clear()
+        _idle_connections.clear()
+    _local.conn = None
+
+atexit.register(close_all_connections)
+
+def get_connection_stats() -> Dict[str, int]:
+    """Count cached SQLite connections bound to threads and idle"""
+    with _registry_lock:
+        return {'bound': len(_bound_connections), 'idle': len(_idle_connections),
+                'max_idle': SQLITE_MAX_IDLE_CONNECTIONS}
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections with proper error handling"""
+    """Context manager for the thread's cached connection with proper error handling"""
     conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
-        # Enable foreign key constraints
-        conn.execute("PRAGMA foreign_keys = ON")
+        conn = _acquire_connection()
+        _local.depth += 1
         yield conn
     except sqlite3.Error as e:
         if conn:
@@ -35,7 +130,10 @@ def get_db_connection():
         raise DatabaseError(f"Unexpected error: {str(e)}")
     finally:
         if conn:
-            conn.close()
+            _local.depth -= 1
+            # Uncommitted work is discarded, as it was when connections were closed per call
+            if _local.depth == 0 and conn.in_transaction:
+                conn.rollback()
 
 def init_database():
     """Initialize database with schema"""
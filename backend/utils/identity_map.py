@@ -0,0 +1,68 @@
+"""
+Request-scoped identity map for InsightForge models
+Keeps each User/Hotel loaded by id at most once per request by storing it on
+flask.g, and counts the queries that were avoided
+"""
+
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+from flask import g, has_app_context
+
+_stats_lock = threading.Lock()
+_stats = {
+    'loads': 0,
+    'queries_avoided': 0,
+}
+
+
+def _current_map() -> Optional[Dict[Tuple[str, Hashable], Any]]:
+    """The identity map for the current request, or None outside a request"""
+    if not has_app_context():
+        return None
+    identity_map = g.get('_identity_map')
+    if identity_map is None:
+        identity_map = g._identity_map = {}
+        g._identity_map_avoided = 0
+    return identity_map
+
+
+def lookup(kind: str, key: Hashable) -> Tuple[bool, Any]:
+    """
+    Look up an entity loaded earlier in this request
+
+    Returns:
+        (found, entity); a found entity may be None if it did not exist
+    """
+    identity_map = _current_map()
+    if identity_map is None or (kind, key) not in identity_map:
+        return False, None
+    g._identity_map_avoided += 1
+    with _stats_lock:
+        _stats['queries_avoided'] += 1
+    return True, identity_map[(kind, key)]
+
+
+def remember(kind: str, key: Hashable, entity: Any) -> Any:
+    """Record an entity loaded from the database (None records a miss)"""
+    identity_map = _current_map()
+    if identity_map is not None:
+        identity_map[(kind, key)] = entity
+    with _stats_lock:
+        _stats['loads'] += 1
+    return entity
+
+
+def forget(kind: str, key: Hashable):
+    """Drop an entity after it was written so the next lookup reloads it"""
+    identity_map = _current_map()
+    if identity_map is not None:
+        identity_map.pop((kind, key), None)
+
+
+def get_identity_map_stats() -> Dict[str, int]:
+    """Process-wide load and avoided-query counters, plus the current request's savings"""
+    with _stats_lock:
+        stats = dict(_stats)
+    if has_app_context():
+        stats['request_queries_avoided'] = g.get('_identity_map_avoided', 0)
+    return stats
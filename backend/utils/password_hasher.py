@@ -0,0 +1,161 @@
+"""
+Bounded bcrypt worker pool for InsightForge authentication
+Runs password hashing and checking on a small dedicated thread pool (bcrypt
+releases the GIL) with a cap on queued work, so a burst of logins is turned
+away with 503 instead of tying up every request thread
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+# Threads hashing passwords at once; each keeps one CPU core busy
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+# Hash jobs allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '16'))
+# Seconds a request waits for its hash job before giving up
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '5'))
+# Retry-After value (seconds) sent with 503 responses
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '2'))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or a job missed its timeout"""
+
+    def __init__(self, message: str, retry_after: int = PASSWORD_HASH_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+
+class PasswordHasher:
+    """
+    Size-limited bcrypt executor
+
+    At most workers + queue_limit jobs are admitted; a slot is released when
+    its job finishes (not when the caller stops waiting), so abandoned jobs
+    still count against the limit.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_limit: int = PASSWORD_HASH_QUEUE,
+                 timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._wait_ms = deque(maxlen=1000)
+        self._hash_ms = deque(maxlen=1000)
+        self._counters = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'failed': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hash')
+        return self._executor
+
+    def _job(self, func: Callable, args: tuple, submitted: float) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._wait_ms.append((started - submitted) * 1000)
+                self._hash_ms.append((finished - started) * 1000)
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._counters['failed'] += 1
+            else:
+                self._counters['completed'] += 1
+        self._slots.release()
+
+    def run(self, func: Callable, *args) -> Any:
+        """
+        Run a hashing function on the pool and wait for its result
+
+        Raises:
+            PasswordPoolBusy: If the queue is full or the job missed the timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise PasswordPoolBusy('Password hashing queue is full')
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(self._job, func, args, time.perf_counter())
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._counters['timeouts'] += 1
+            raise PasswordPoolBusy(f'Password hashing timed out after {self.timeout:g}s')
+
+    def hash(self, password: str) -> str:
+        """Hash a password with a new bcrypt salt"""
+        return self.run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'))
+
+    def check(self, password: str, password_hash: str) -> bool:
+        """Check a password against a bcrypt hash"""
+        return self.run(lambda: bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')))
+
+    def shutdown(self):
+        """Stop the worker threads (called at interpreter exit)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage and hash latency statistics"""
+        with self._lock:
+            wait_ms, hash_ms = list(self._wait_ms), list(self._hash_ms)
+            return {
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.workers),
+                **self._counters,
+                'wait_ms': {'p50': _percentile(wait_ms, 0.5), 'p95': _percentile(wait_ms, 0.95)},
+                'hash_ms': {'p50': _percentile(hash_ms, 0.5), 'p95': _percentile(hash_ms, 0.95),
+                            'max': round(max(hash_ms), 2) if hash_ms else 0},
+            }
+
+
+# Shared pool used by routes.auth and models.user
+password_hasher = PasswordHasher()
+
+atexit.register(password_hasher.shutdown)
+
+
+def get_password_hasher_stats() -> Dict[str, Any]:
+    """Get password hashing pool statistics"""
+    return password_hasher.stats()
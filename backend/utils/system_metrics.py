@@ -0,0 +1,108 @@
+"""
+Background system metrics sampler for InsightForge
+Samples CPU, memory, disk, connection pool usage and database latency on a
+fixed interval into a ring buffer, so the admin status endpoint reads the
+latest values without blocking
+"""
+
+import os
+import platform
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils import database as platform_db
+from utils.database import get_db_connection, get_connection_stats, release_thread_connection
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Seconds between samples (0 disables the background job)
+SYSTEM_METRICS_INTERVAL = float(os.getenv('SYSTEM_METRICS_INTERVAL', '5'))
+# Samples kept in the ring buffer (default: 10 minutes at 5s)
+SYSTEM_METRICS_HISTORY = int(os.getenv('SYSTEM_METRICS_HISTORY', '120'))
+
+_samples = deque(maxlen=max(1, SYSTEM_METRICS_HISTORY))
+_samples_lock = threading.Lock()
+
+
+def _disk_percent() -> float:
+    root = 'C:\\' if platform.system() == 'Windows' else '/'
+    return psutil.disk_usage(root).percent
+
+
+def _database_status() -> Dict[str, Any]:
+    """Time a trivial query on the platform database"""
+    started = time.perf_counter()
+    try:
+        with get_db_connection() as conn:
+            conn.execute("SELECT 1").fetchone()
+        return {'status': 'connected', 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+    finally:
+        # The sampler thread should not pin a connection between samples
+        release_thread_connection()
+
+
+def _pool_usage() -> Dict[str, Any]:
+    """Connection usage of every pool, without opening pools that are not in use"""
+    from connection import Database
+    from database import get_pool_stats
+    return {
+        'platform': get_connection_stats(),
+        'auth': Database.get_pool_stats(),
+        'analytics': get_pool_stats(),
+    }
+
+
+def take_sample() -> Dict[str, Any]:
+    """Collect one sample and append it to the ring buffer"""
+    sample = {'timestamp': datetime.now().isoformat(), 'database': _database_status()}
+    if psutil is not None:
+        # interval=None measures since the previous call instead of sleeping
+        sample['cpu_percent'] = psutil.cpu_percent(interval=None)
+        sample['memory_percent'] = psutil.virtual_memory().percent
+        sample['disk_percent'] = _disk_percent()
+    try:
+        sample['pools'] = _pool_usage()
+    except Exception as e:
+        sample['pools'] = {'error': str(e)}
+
+    with _samples_lock:
+        _samples.append(sample)
+    return sample
+
+
+def get_metrics(history: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get the latest sample and recent history without measuring anything new
+    (a sample is taken inline only if none exists yet)
+
+    Args:
+        history: Number of most recent samples to include (all kept samples if omitted)
+
+    Returns:
+        Dict with the current sample, its history oldest first and sampler settings
+    """
+    with _samples_lock:
+        samples: List[Dict[str, Any]] = list(_samples)
+    if not samples:
+        samples = [take_sample()]
+    current = samples[-1]
+    if history is not None:
+        samples = samples[-history:] if history > 0 else []
+
+    return {
+        'platform': platform.system(),
+        'python_version': platform.python_version(),
+        'database_path': platform_db.DB_PATH,
+        'psutil_available': psutil is not None,
+        'sample_interval': SYSTEM_METRICS_INTERVAL,
+        'current': current,
+        'history': samples,
+    }
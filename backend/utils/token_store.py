@@ -0,0 +1,216 @@
+"""
+JWT session and revocation store for InsightForge
+Records issued token jtis in user_sessions in batches and keeps revoked jtis
+in memory, so checking a token on the request path never touches the database
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Seconds between background flushes of issued sessions and revocation refreshes
+TOKEN_STORE_FLUSH_INTERVAL = float(os.getenv('TOKEN_STORE_FLUSH_INTERVAL', '2'))
+# Seconds between bulk purges of expired sessions
+TOKEN_STORE_PURGE_INTERVAL = float(os.getenv('TOKEN_STORE_PURGE_INTERVAL', '3600'))
+# Issued sessions buffered before a flush is forced
+TOKEN_STORE_BATCH_SIZE = int(os.getenv('TOKEN_STORE_BATCH_SIZE', '200'))
+
+
+class TokenStore:
+    """
+    Session store over a user_sessions table
+
+    Issued sessions are buffered and written as multi-row inserts. Revocations
+    are written through immediately and added to an in-memory map of jti to
+    expiry; a background thread picks up revocations made by other processes
+    incrementally (by revoked_at) and purges expired sessions in bulk.
+    """
+
+    def __init__(self, name: str, execute_query: Callable, execute_update: Callable, param: str = '?'):
+        self.name = name
+        self._execute_query = execute_query
+        self._execute_update = execute_update
+        self._param = param
+
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._revoked: Dict[str, datetime] = {}
+        self._revoked_cursor = None  # latest revoked_at seen in the table
+        self._loaded = False
+        self._last_purge = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counters = {'issued': 0, 'flushed': 0, 'revoked': 0, 'purged': 0, 'checks': 0, 'rejected': 0}
+
+    def _sql(self, query: str) -> str:
+        return query.replace('?', self._param)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name=f'token-store-{self.name}',
+                                                    daemon=True)
+                    self._thread.start()
+
+    def record_issued(self, jti: str, user_id: int, expires_at: datetime,
+                      ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+        """Queue a newly issued token's session for the next batch insert"""
+        self._ensure_started()
+        with self._lock:
+            self._pending.append((user_id, jti, expires_at, ip_address, user_agent))
+            self._counters['issued'] += 1
+            full = len(self._pending) >= TOKEN_STORE_BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered sessions to user_sessions; returns rows written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        placeholders = ', '.join(['(?, ?, ?, ?, ?)'] * len(pending))
+        params = tuple(value for row in pending for value in row)
+        try:
+            self._execute_update(self._sql(f"""
+                INSERT INTO user_sessions (user_id, token_jti, expires_at, ip_address, user_agent)
+                VALUES {placeholders}
+                ON CONFLICT (token_jti) DO NOTHING
+            """), params)
+        except Exception as e:
+            print(f"❌ Failed to record {len(pending)} sessions in '{self.name}' store: {e}")
+            return 0
+        with self._lock:
+            self._counters['flushed'] += len(pending)
+        return len(pending)
+
+    def revoke(self, jti: str, user_id: int, expires_at: datetime):
+        """Revoke a token now; effective in this process immediately"""
+        self._ensure_started()
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._counters['revoked'] += 1
+        self._execute_update(self._sql("""
+            INSERT INTO user_sessions (user_id, token_jti, expires_at, is_revoked, revoked_at)
+            VALUES (?, ?, ?, TRUE, ?)
+            ON CONFLICT (token_jti) DO UPDATE SET is_revoked = TRUE, revoked_at = EXCLUDED.revoked_at
+        """), (user_id, jti, expires_at, datetime.utcnow()))
+
+    def start(self):
+        """
+        Load live revocations, then start the background thread
+        Called once at startup so the request path never waits on the database;
+        if the load fails the background thread keeps retrying
+        """
+        if not self._loaded:
+            try:
+                self.refresh_revoked()
+            except Exception as e:
+                print(f"❌ Token store '{self.name}' could not load revocations: {e}")
+        self._ensure_started()
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Memory-only revocation check for the request path"""
+        self._ensure_started()
+        with self._lock:
+            self._counters['checks'] += 1
+            revoked = jti in self._revoked
+            if revoked:
+                self._counters['rejected'] += 1
+            return revoked
+
+    def refresh_revoked(self):
+        """Load revocations recorded since the last refresh (by any process)"""
+        if self._revoked_cursor is None:
+            # Until a revocation has been seen, reload the (small) set of live revocations
+            rows = self._execute_query(self._sql("""
+                SELECT token_jti, expires_at, revoked_at FROM user_sessions
+                WHERE is_revoked = TRUE AND expires_at > ?
+            """), (datetime.utcnow(),))
+        else:
+            # >= so revocations sharing the cursor's timestamp are not missed
+            rows = self._execute_query(self._sql("""
+                SELECT token_jti, expires_at, revoked_at FROM user_sessions
+                WHERE is_revoked = TRUE AND revoked_at >= ?
+            """), (self._revoked_cursor,))
+
+        with self._lock:
+            for row in rows:
+                self._revoked[row['token_jti']] = row['expires_at']
+                if row['revoked_at'] is not None and (self._revoked_cursor is None
+                                                      or row['revoked_at'] > self._revoked_cursor):
+                    self._revoked_cursor = row['revoked_at']
+            self._loaded = True
+
+    def purge_expired(self) -> int:
+        """Delete expired sessions in bulk and forget their revocations"""
+        now = datetime.utcnow()
+        deleted = self._execute_update(self._sql("DELETE FROM user_sessions WHERE expires_at < ?"), (now,))
+        with self._lock:
+            # Expiry values may come back as strings from SQLite; compare like with like
+            self._revoked = {
+                jti: expires_at for jti, expires_at in self._revoked.items()
+                if (expires_at > now if isinstance(expires_at, datetime) else expires_at > str(now))
+            }
+            self._counters['purged'] += deleted or 0
+        return deleted or 0
+
+    def _run(self):
+        while not self._stop.wait(TOKEN_STORE_FLUSH_INTERVAL):
+            try:
+                self.flush()
+                self.refresh_revoked()
+                if time.monotonic() - self._last_purge >= TOKEN_STORE_PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    self.purge_expired()
+            except Exception as e:
+                print(f"❌ Token store '{self.name}' maintenance failed: {e}")
+
+    def close(self):
+        """Stop the background thread and write any buffered sessions"""
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store statistics"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'loaded': self._loaded,
+                'pending': len(self._pending),
+                'revoked_in_memory': len(self._revoked),
+                **self._counters
+            }
+
+
+_stores: List[TokenStore] = []
+
+
+def create_token_store(name: str, execute_query: Callable, execute_update: Callable,
+                       param: str = '?') -> TokenStore:
+    """Create a store whose buffered sessions are flushed at interpreter exit"""
+    store = TokenStore(name, execute_query, execute_update, param)
+    _stores.append(store)
+    return store
+
+
+def start_token_stores():
+    """Preload revocations and start the background thread of every store"""
+    for store in _stores:
+        store.start()
+
+
+def _close_stores():
+    for store in _stores:
+        try:
+            store.close()
+        except Exception as e:
+            print(f"❌ Failed to flush token store '{store.name}': {e}")
+
+atexit.register(_close_stores)
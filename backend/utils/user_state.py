@@ -0,0 +1,83 @@
+"""
+Short-lived user state cache for InsightForge authorization
+Lets token checks confirm a user is still active and unchanged without a
+database read on every request; entries expire after a few seconds so
+deactivation or role changes made elsewhere still take effect quickly
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Seconds a cached user state is trusted before it is reloaded
+USER_STATE_TTL = float(os.getenv('USER_STATE_TTL', '5'))
+
+
+class UserStateCache:
+    """Thread-safe TTL cache of per-user authorization state"""
+
+    def __init__(self, ttl: float = USER_STATE_TTL, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, tuple] = {}
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id: Hashable, loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's state, calling loader() on a miss or after expiry
+
+        Args:
+            user_id: User to look up
+            loader: Reads the state from the database (None if the user is gone)
+
+        Returns:
+            The state dict, or None if the user does not exist
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._counters['hits'] += 1
+                return entry[0]
+            self._counters['misses'] += 1
+
+        state = loader()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then everything if still full
+                self._entries = {key: value for key, value in self._entries.items() if value[1] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[user_id] = (state, now + self.ttl)
+        return state
+
+    def invalidate(self, user_id: Hashable):
+        """Forget a user's state after their account changed"""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics"""
+        with self._lock:
+            return {'entries': len(self._entries), 'ttl': self.ttl, **self._counters}
+
+
+# State for users of the platform database (models.user.User)
+user_states = UserStateCache()
+
+
+def claims_match(claims: Dict[str, Any], state: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check token claims against current user state
+    A token is accepted only while the account is active and its version
+    matches; tokens issued before versions existed carry no 'ver' claim and
+    are checked for activity only
+    """
+    if not state or not state.get('is_active'):
+        return False
+    if 'ver' in claims and claims['ver'] != state.get('version'):
+        return False
+    return True
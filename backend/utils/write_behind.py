@@ -0,0 +1,145 @@
+"""
+Write-behind buffers for InsightForge bookkeeping writes
+Queues low-priority rows (activity logs, last-login stamps) in memory and
+writes them in multi-row statements from a background thread, so request
+latency does not depend on these writes
+"""
+
+import atexit
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Seconds between background flushes
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '1'))
+# Queued rows that trigger an early flush; also the rows per statement
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '100'))
+# Queued rows kept at most; writes beyond this are dropped and counted
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', '10000'))
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-memory queue flushed in batches by a background thread
+
+    write_batch receives up to batch_size queued rows and writes them in one
+    statement. A failed batch is retried row by row; rows are dropped (and
+    counted) when the queue is full or they fail on their own.
+    """
+
+    def __init__(self, name: str, write_batch: Callable[[List[Any]], Any],
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE, max_pending: int = WRITE_BEHIND_MAX_PENDING,
+                 interval: float = WRITE_BEHIND_FLUSH_INTERVAL):
+        self.name = name
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one flush at a time keeps rows in order
+        self._pending: List[Any] = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {'queued': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'failed_batches': 0}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name=f'write-behind-{self.name}',
+                                                    daemon=True)
+                    self._thread.start()
+
+    def put(self, row: Any) -> bool:
+        """Queue a row for writing; returns False if it was dropped"""
+        self._ensure_started()
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._counters['dropped'] += 1
+                return False
+            self._pending.append(row)
+            self._counters['queued'] += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write every queued row now; returns rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def _write(self, batch: List[Any]) -> int:
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            with self._lock:
+                self._counters['failed_batches'] += 1
+            if len(batch) > 1:
+                # Isolate the offending rows instead of losing the whole batch
+                return sum(self._write([row]) for row in batch)
+            print(f"❌ Write-behind '{self.name}' dropped a row: {e}")
+            with self._lock:
+                self._counters['dropped'] += 1
+            return 0
+        with self._lock:
+            self._counters['written'] += len(batch)
+            self._counters['batches'] += 1
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and write what is still queued"""
+        self._stop.set()
+        self._wakeup.set()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue statistics"""
+        with self._lock:
+            return {'name': self.name, 'pending': len(self._pending), **self._counters}
+
+
+_queues: List[WriteBehindQueue] = []
+
+
+def create_write_behind(name: str, write_batch: Callable[[List[Any]], Any], **options) -> WriteBehindQueue:
+    """Create a queue that is flushed at interpreter exit"""
+    queue = WriteBehindQueue(name, write_batch, **options)
+    _queues.append(queue)
+    return queue
+
+
+def flush_all() -> int:
+    """Flush every write-behind queue; returns rows written"""
+    return sum(queue.flush() for queue in _queues)
+
+
+def get_write_behind_stats() -> List[Dict[str, Any]]:
+    """Get statistics for every write-behind queue"""
+    return [queue.stats() for queue in _queues]
+
+
+def _close_queues():
+    for queue in _queues:
+        try:
+            queue.close()
+        except Exception as e:
+            print(f"❌ Failed to flush write-behind '{queue.name}': {e}")
+
+atexit.register(_close_queues)
@@ -41,11 +41,15 @@ CREATE TABLE IF NOT EXISTS users (
     avatar_url TEXT,
     phone VARCHAR(50),
     last_login TIMESTAMP,
+    token_version INTEGER NOT NULL DEFAULT 0, -- bumped when issued tokens must be re-checked
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE
 );
 
+-- Existing databases created before token_version was added
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
 -- 3. Room types table
 CREATE TABLE IF NOT EXISTS room_types (
     id SERIAL PRIMARY KEY,
@@ -122,6 +126,7 @@ CREATE TABLE IF NOT EXISTS bookings (
     adults INTEGER DEFAULT 1,
     children INTEGER DEFAULT 0,
     nights INTEGER GENERATED ALWAYS AS (check_out - check_in) STORED,
+    lead_time_days INTEGER GENERATED ALWAYS AS (ABS(check_in - booking_date::date)) STORED,
     room_rate DECIMAL(10,2) NOT NULL,
     total_amount DECIMAL(10,2) NOT NULL,
     paid_amount DECIMAL(10,2) DEFAULT 0,
@@ -262,9 +267,67 @@ CREATE TABLE IF NOT EXISTS settings (
     UNIQUE(hotel_id, setting_key)
 );
 
+-- 15. Room nights fact table (one row per occupied room-night, maintained from bookings)
+CREATE TABLE IF NOT EXISTS room_nights (
+    booking_id INTEGER NOT NULL,
+    hotel_id INTEGER NOT NULL,
+    room_id INTEGER,
+    date DATE NOT NULL,
+    revenue DECIMAL(12,4) NOT NULL DEFAULT 0, -- Share of the booking total for this night
+    PRIMARY KEY (booking_id, date),
+    FOREIGN KEY (booking_id) REFERENCES bookings(id) ON DELETE CASCADE,
+    FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE
+);
+
+-- 16. KPI snapshot dates waiting to be recomputed after bookings or reviews change
+CREATE TABLE IF NOT EXISTS kpi_snapshot_dirty_dates (
+    hotel_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hotel_id, date),
+    FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE
+);
+
+-- 17. Issued JWT sessions and revocations (jtis from /api/auth tokens)
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    token_jti VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    is_revoked BOOLEAN DEFAULT FALSE,
+    revoked_at TIMESTAMP,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- 18. Per-hotel activity feed, appended by triggers on bookings, payments and reviews
+CREATE TABLE IF NOT EXISTS activity_stream (
+    id BIGSERIAL PRIMARY KEY,
+    hotel_id INTEGER NOT NULL,
+    activity_type VARCHAR(50) NOT NULL, -- booking, cancellation, payment, review
+    source_id INTEGER NOT NULL, -- id of the booking, payment or review
+    description TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    UNIQUE (activity_type, source_id),
+    FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE
+);
+
 -- Indexes for performance optimization
 CREATE INDEX IF NOT EXISTS idx_bookings_dates ON bookings(check_in, check_out);
-CREATE INDEX IF NOT EXISTS idx_bookings_hotel_id ON bookings(hotel_id);
+-- Databases created before lead_time_days existed skip the CREATE TABLE above;
+-- add the column here so the covering index below can be built
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS lead_time_days INTEGER
+    GENERATED ALWAYS AS (ABS(check_in - booking_date::date)) STORED;
+
+-- Dashboard date ranges are half-open (col >= start AND col < end) per hotel;
+-- the leading hotel_id also serves plain per-hotel lookups. The included
+-- columns let booking histograms (get_booking_histogram) run as index-only scans
+DROP INDEX IF EXISTS idx_bookings_hotel_id;
+CREATE INDEX IF NOT EXISTS idx_bookings_hotel_booking_date ON bookings(hotel_id, booking_date)
+    INCLUDE (status, lead_time_days, nights, room_rate);
+CREATE INDEX IF NOT EXISTS idx_bookings_hotel_check_in ON bookings(hotel_id, check_in);
 CREATE INDEX IF NOT EXISTS idx_bookings_guest_id ON bookings(guest_id);
 CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status);
 CREATE INDEX IF NOT EXISTS idx_bookings_source ON bookings(source_id);
@@ -277,6 +340,8 @@ CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category);
 
 CREATE INDEX IF NOT EXISTS idx_kpi_hotel_date ON kpi_snapshots(hotel_id, date);
 
+CREATE INDEX IF NOT EXISTS idx_room_nights_hotel_date ON room_nights(hotel_id, date) INCLUDE (revenue);
+
 CREATE INDEX IF NOT EXISTS idx_reviews_hotel_rating ON reviews(hotel_id, rating);
 CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews(review_date);
 
@@ -286,6 +351,11 @@ CREATE INDEX IF NOT EXISTS idx_guests_email ON guests(email);
 CREATE INDEX IF NOT EXISTS idx_activity_logs_hotel_date ON activity_logs(hotel_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_activity_logs_type ON activity_logs(activity_type);
 
+CREATE INDEX IF NOT EXISTS idx_activity_stream_hotel_recent ON activity_stream(hotel_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions(expires_at);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_revoked_at ON user_sessions(revoked_at) WHERE is_revoked;
+
 -- Additional PostgreSQL-specific indexes for JSONB columns
 CREATE INDEX IF NOT EXISTS idx_room_types_amenities ON room_types USING GIN (amenities);
 CREATE INDEX IF NOT EXISTS idx_activity_logs_metadata ON activity_logs USING GIN (metadata);
@@ -308,6 +378,26 @@ CREATE TRIGGER update_users_timestamp
     BEFORE UPDATE ON users
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Invalidate issued tokens when anything they authorize changes (last_login does not count)
+CREATE OR REPLACE FUNCTION bump_user_token_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.token_version = OLD.token_version + 1;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bump_users_token_version ON users;
+CREATE TRIGGER bump_users_token_version
+    BEFORE UPDATE OF email, password_hash, role, hotel_id, is_active ON users
+    FOR EACH ROW
+    WHEN (OLD.email IS DISTINCT FROM NEW.email
+          OR OLD.password_hash IS DISTINCT FROM NEW.password_hash
+          OR OLD.role IS DISTINCT FROM NEW.role
+          OR OLD.hotel_id IS DISTINCT FROM NEW.hotel_id
+          OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+    EXECUTE FUNCTION bump_user_token_version();
+
 CREATE TRIGGER update_rooms_timestamp 
     BEFORE UPDATE ON rooms
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -324,6 +414,182 @@ CREATE TRIGGER update_settings_timestamp
     BEFORE UPDATE ON settings
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Keep room_nights in step with bookings
+CREATE OR REPLACE FUNCTION sync_room_nights()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM room_nights WHERE booking_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('confirmed', 'checked_in', 'checked_out') THEN
+        INSERT INTO room_nights (booking_id, hotel_id, room_id, date, revenue)
+        SELECT NEW.id, NEW.hotel_id, NEW.room_id, night::date,
+               NEW.total_amount / GREATEST(NEW.check_out - NEW.check_in, 1)
+        FROM generate_series(NEW.check_in, NEW.check_out - 1, INTERVAL '1 day') AS night;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_bookings_room_nights ON bookings;
+CREATE TRIGGER sync_bookings_room_nights
+    AFTER INSERT OR DELETE OR UPDATE OF hotel_id, room_id, check_in, check_out, status, total_amount ON bookings
+    FOR EACH ROW EXECUTE FUNCTION sync_room_nights();
+
+-- Queue the snapshot dates a booking or review touches for recomputation
+CREATE OR REPLACE FUNCTION mark_booking_snapshot_dates()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO kpi_snapshot_dirty_dates (hotel_id, date)
+        SELECT OLD.hotel_id, night::date
+        FROM generate_series(OLD.check_in, OLD.check_out - 1, INTERVAL '1 day') AS night
+        UNION
+        SELECT OLD.hotel_id, OLD.booking_date::date WHERE OLD.booking_date IS NOT NULL
+        ON CONFLICT (hotel_id, date) DO NOTHING;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO kpi_snapshot_dirty_dates (hotel_id, date)
+        SELECT NEW.hotel_id, night::date
+        FROM generate_series(NEW.check_in, NEW.check_out - 1, INTERVAL '1 day') AS night
+        UNION
+        SELECT NEW.hotel_id, NEW.booking_date::date WHERE NEW.booking_date IS NOT NULL
+        ON CONFLICT (hotel_id, date) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION mark_review_snapshot_dates()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.review_date IS NOT NULL THEN
+        INSERT INTO kpi_snapshot_dirty_dates (hotel_id, date)
+        VALUES (OLD.hotel_id, OLD.review_date)
+        ON CONFLICT (hotel_id, date) DO NOTHING;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.review_date IS NOT NULL THEN
+        INSERT INTO kpi_snapshot_dirty_dates (hotel_id, date)
+        VALUES (NEW.hotel_id, NEW.review_date)
+        ON CONFLICT (hotel_id, date) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS mark_bookings_kpi_snapshot_dates ON bookings;
+CREATE TRIGGER mark_bookings_kpi_snapshot_dates
+    AFTER INSERT OR DELETE OR UPDATE OF hotel_id, check_in, check_out, booking_date, status, total_amount ON bookings
+    FOR EACH ROW EXECUTE FUNCTION mark_booking_snapshot_dates();
+
+DROP TRIGGER IF EXISTS mark_reviews_kpi_snapshot_dates ON reviews;
+CREATE TRIGGER mark_reviews_kpi_snapshot_dates
+    AFTER INSERT OR DELETE OR UPDATE OF hotel_id, rating, review_date ON reviews
+    FOR EACH ROW EXECUTE FUNCTION mark_review_snapshot_dates();
+
+-- Append feed entries for new bookings, cancellations, payments and reviews
+CREATE OR REPLACE FUNCTION append_booking_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO activity_stream (hotel_id, activity_type, source_id, description, created_at)
+        SELECT NEW.hotel_id, 'booking', NEW.id,
+               CONCAT('New booking from ', g.first_name, ' ', g.last_name, ' - Room ', rt.name),
+               COALESCE(NEW.booking_date, CURRENT_TIMESTAMP)
+        FROM (SELECT 1) AS one
+        LEFT JOIN guests g ON g.id = NEW.guest_id
+        LEFT JOIN room_types rt ON rt.id = NEW.room_type_id
+        ON CONFLICT (activity_type, source_id) DO NOTHING;
+    END IF;
+    -- One cancellation entry per booking, however often its status is rewritten
+    IF NEW.status = 'cancelled' THEN
+        INSERT INTO activity_stream (hotel_id, activity_type, source_id, description, created_at)
+        VALUES (NEW.hotel_id, 'cancellation', NEW.id,
+                CONCAT('Booking cancelled - ', NEW.booking_reference),
+                COALESCE(NEW.cancellation_date, CURRENT_TIMESTAMP))
+        ON CONFLICT (activity_type, source_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION append_payment_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO activity_stream (hotel_id, activity_type, source_id, description, created_at)
+    SELECT b.hotel_id, 'payment', NEW.id,
+           CONCAT('Payment received - $', ROUND(NEW.amount, 2)),
+           COALESCE(NEW.payment_date, CURRENT_TIMESTAMP)
+    FROM bookings b
+    WHERE b.id = NEW.booking_id
+    ON CONFLICT (activity_type, source_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION append_review_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO activity_stream (hotel_id, activity_type, source_id, description, created_at)
+    VALUES (NEW.hotel_id, 'review', NEW.id,
+            CONCAT('Review submitted - ', NEW.rating, ' stars'),
+            COALESCE(NEW.review_date::timestamp, CURRENT_TIMESTAMP))
+    ON CONFLICT (activity_type, source_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS append_bookings_activity ON bookings;
+CREATE TRIGGER append_bookings_activity
+    AFTER INSERT OR UPDATE OF status ON bookings
+    FOR EACH ROW EXECUTE FUNCTION append_booking_activity();
+
+DROP TRIGGER IF EXISTS append_payments_activity ON payments;
+CREATE TRIGGER append_payments_activity
+    AFTER INSERT ON payments
+    FOR EACH ROW EXECUTE FUNCTION append_payment_activity();
+
+DROP TRIGGER IF EXISTS append_reviews_activity ON reviews;
+CREATE TRIGGER append_reviews_activity
+    AFTER INSERT ON reviews
+    FOR EACH ROW EXECUTE FUNCTION append_review_activity();
+
+-- Tell listening app processes (backend/database.py) which hotel's cached
+-- analytics to drop; identical notifications in one transaction are sent once
+CREATE OR REPLACE FUNCTION notify_hotel_analytics_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'payments' THEN
+        PERFORM pg_notify('hotel_analytics_changed', b.hotel_id::text)
+        FROM bookings b
+        WHERE b.id IN (NEW.booking_id, OLD.booking_id);
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('hotel_analytics_changed', OLD.hotel_id::text);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('hotel_analytics_changed', NEW.hotel_id::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_bookings_analytics_changed ON bookings;
+CREATE TRIGGER notify_bookings_analytics_changed
+    AFTER INSERT OR UPDATE OR DELETE ON bookings
+    FOR EACH ROW EXECUTE FUNCTION notify_hotel_analytics_changed();
+
+DROP TRIGGER IF EXISTS notify_reviews_analytics_changed ON reviews;
+CREATE TRIGGER notify_reviews_analytics_changed
+    AFTER INSERT OR UPDATE OR DELETE ON reviews
+    FOR EACH ROW EXECUTE FUNCTION notify_hotel_analytics_changed();
+
+DROP TRIGGER IF EXISTS notify_payments_analytics_changed ON payments;
+CREATE TRIGGER notify_payments_analytics_changed
+    AFTER INSERT OR UPDATE OR DELETE ON payments
+    FOR EACH ROW EXECUTE FUNCTION notify_hotel_analytics_changed();
+
 -- Views for common queries
 CREATE OR REPLACE VIEW booking_summary AS
 SELECT 
@@ -372,6 +638,23 @@ LEFT JOIN revenue r ON h.id = r.hotel_id
 GROUP BY h.id, h.name, DATE_TRUNC('month', r.date)
 ORDER BY h.id, month;
 
+-- Monthly booking rollups per hotel and status, refreshed concurrently by the backend
+CREATE MATERIALIZED VIEW IF NOT EXISTS monthly_booking_rollups AS
+SELECT 
+    hotel_id,
+    DATE_TRUNC('month', booking_date)::date as month,
+    status,
+    COUNT(*) as bookings,
+    COALESCE(SUM(total_amount), 0) as revenue,
+    COALESCE(SUM(room_rate), 0) as room_rate_sum,
+    COALESCE(SUM(nights), 0) as nights
+FROM bookings
+WHERE booking_date IS NOT NULL
+GROUP BY hotel_id, DATE_TRUNC('month', booking_date)::date, status;
+
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY requires a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_monthly_booking_rollups_key ON monthly_booking_rollups(hotel_id, month, status);
+
 -- Comments for documentation
 COMMENT ON DATABASE insightforgedb IS 'InsightForge Hotel Analytics Dashboard Database';
 COMMENT ON TABLE hotels IS 'Hotel properties and their basic information';
@@ -381,6 +664,8 @@ COMMENT ON TABLE guests IS 'Guest information and profiles';
 COMMENT ON TABLE revenue IS 'Revenue tracking by date and category';
 COMMENT ON TABLE expenses IS 'Expense tracking and management';
 COMMENT ON TABLE kpi_snapshots IS 'Daily KPI calculations and metrics';
+COMMENT ON TABLE room_nights IS 'Occupied room-nights derived from bookings for range aggregates';
+COMMENT ON MATERIALIZED VIEW monthly_booking_rollups IS 'Per-hotel monthly booking counts and sums by status';
 
 -- Grant permissions (adjust as needed for your setup)
 -- GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO insightforge_app;
@@ -94,11 +94,13 @@ export const dashboardApi = {
   // Get recent activity
   getRecentActivity: async (
     hotelId?: number,
-    limit?: number
+    limit?: number,
+    before?: string
   ): Promise<ApiResponse<unknown>> => {
     const params = new URLSearchParams();
     if (hotelId) params.append("hotel_id", hotelId.toString());
     if (limit) params.append("limit", limit.toString());
+    if (before) params.append("before", before);
     const queryString = params.toString() ? `?${params.toString()}` : "";
     return apiRequest<unknown>(`/recent-activity${queryString}`);
   },
@@ -175,6 +177,18 @@ export const dashboardApi = {
     const queryString = params.toString() ? `?${params.toString()}` : "";
     return apiRequest<unknown>(`/bookings-cancellations-trend${queryString}`);
   },
+
+  // Get a histogram of lead time, length of stay or room rate
+  getBookingDistribution: async (
+    attribute: "lead_time" | "length_of_stay" | "room_rate",
+    hotelId?: number,
+    edges?: number[]
+  ): Promise<ApiResponse<unknown>> => {
+    const params = new URLSearchParams({ attribute });
+    if (hotelId) params.append("hotel_id", hotelId.toString());
+    if (edges?.length) params.append("edges", edges.join(","));
+    return apiRequest<unknown>(`/booking-distribution?${params.toString()}`);
+  },
 };
 
 // Define a User interface for user objects